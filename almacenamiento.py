@@ -0,0 +1,803 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import date, datetime
+from functools import lru_cache
+
+import metricas
+
+# ============================
+#  BACKENDS DE ALMACENAMIENTO
+# ============================
+
+# "mysql" (RDS), "sqlite" (archivo embebido) o "memoria" (SQLite en RAM, se
+# pierde al reiniciar; útil para desarrollo y pruebas sin servidor)
+BACKEND = os.environ.get("ALMACENAMIENTO", "mysql")
+SQLITE_RUTA = os.environ.get("SQLITE_RUTA", "tareas.db")
+# Base SQLite de sólo lectura (p. ej. una réplica local para pruebas); vacío: sin lector
+SQLITE_LECTOR_RUTA = os.environ.get("SQLITE_LECTOR_RUTA", "")
+
+# Segundos que las lecturas van directo al escritor tras una falla de la réplica
+LECTOR_PAUSA = float(os.environ.get("LECTOR_PAUSA", "30"))
+
+# Filas pedidas al cursor por cada fetchmany al recorrer tablas completas
+LOTE_LECTURA = int(os.environ.get("LOTE_EXPORTACION", "5000"))
+
+log = logging.getLogger("tareas.almacenamiento")
+
+
+class Almacenamiento:
+    """Interfaz común de los backends.
+
+    Las sentencias se escriben en el SQL común a MySQL y SQLite con marcas
+    `%s`; cada backend las adapta. Lo que difiere entre dialectos (upsert,
+    instante actual, búsqueda de texto, inicio de periodo) se arma con
+    sql_upsert(), ahora(), sql_busqueda() y periodos.
+    """
+
+    nombre = ""
+    # Excepciones del driver que indican que la sentencia falló
+    errores = ()
+    # Las de `errores` (o del pool) que indican que el servidor no pudo atender,
+    # no que la sentencia estuviera mal
+    no_disponible = ()
+    # Sufijo de un SELECT que bloquea las filas leídas hasta el fin de la transacción
+    bloqueo = ""
+    # Expresión con la fecha de inicio del periodo que contiene la columna {c}
+    # (semanas desde el lunes), por granularidad
+    periodos = {}
+    # Si las lecturas sueltas pueden ir a una réplica (ver AlmacenamientoRuteado)
+    con_lector = False
+
+    def __init__(self):
+        self._upserts = {}
+        self._busquedas = {}
+
+    def consultar(self, sql, params=(), preparada=False):
+        """Retorna las filas como dicts. `preparada` sólo para SQL constante."""
+        raise NotImplementedError
+
+    def valor(self, sql, params=(), preparada=False):
+        """Primera columna de la primera fila."""
+        raise NotImplementedError
+
+    def transaccion(self):
+        """Context manager que entrega una transacción con ejecutar()/consultar()."""
+        raise NotImplementedError
+
+    def ejecutar(self, sql, params=(), preparada=False):
+        """Ejecuta una sentencia en su propia transacción; retorna las filas afectadas."""
+        with self.transaccion() as tx:
+            return tx.ejecutar(sql, params, preparada)
+
+    def iterar(self, sql, params=(), tamano=LOTE_LECTURA):
+        """Genera las filas como dicts sin cargar todo el resultado en memoria."""
+        raise NotImplementedError
+
+    def ahora(self):
+        """Instante actual según el backend (el mismo reloj que `modificada`)."""
+        raise NotImplementedError
+
+    def _clausula_upsert(self, nuevas, ahora, sumar, clave):
+        raise NotImplementedError
+
+    def sql_upsert(self, tabla, columnas, filas, nuevas=(), ahora=(), sumar=(), clave=("id",)):
+        """INSERT multi-fila que, si la `clave` ya existe, copia `nuevas`, marca
+        `ahora` y suma el valor nuevo a las columnas `sumar`.
+
+        Retorna siempre el mismo objeto str para los mismos argumentos.
+        """
+        argumentos = (tabla, columnas, filas, nuevas, ahora, sumar, clave)
+        sql = self._upserts.get(argumentos)
+        if sql is None:
+            fila = "(" + ", ".join(["%s"] * len(columnas)) + ")"
+            sql = (
+                f"INSERT INTO {tabla} ({', '.join(columnas)}) VALUES "
+                + ", ".join([fila] * filas)
+                + " " + self._clausula_upsert(nuevas, ahora, sumar, clave)
+            )
+            self._upserts[argumentos] = sql
+        return sql
+
+    def _sql_busqueda(self, condiciones):
+        raise NotImplementedError
+
+    def params_busqueda(self, terminos):
+        """Parámetros con que la sentencia de sql_busqueda() recibe los términos."""
+        raise NotImplementedError
+
+    def sql_busqueda(self, condiciones=()):
+        """SELECT de las tareas que contienen todos los términos, completos o como prefijo.
+
+        Usa el índice de texto completo del backend y ordena por relevancia
+        (columna `relevancia`). Sus parámetros son params_busqueda(), los de
+        `condiciones` (filtros extra sobre tareas), el límite y el
+        desplazamiento. Retorna siempre el mismo objeto str para las mismas
+        condiciones.
+        """
+        sql = self._busquedas.get(condiciones)
+        if sql is None:
+            sql = self._sql_busqueda(condiciones)
+            self._busquedas[condiciones] = sql
+        return sql
+
+    def lector(self):
+        """Backend de sólo lectura (réplica) para las lecturas sueltas, o None."""
+        return None
+
+    def cerrar(self):
+        pass
+
+
+# ----------------------------
+# MySQL
+# ----------------------------
+
+SQL_AHORA_MYSQL = "SELECT NOW(6)"
+
+
+class _TransaccionMySQL:
+    def __init__(self, conn):
+        self._conn = conn
+        self._cursor = None
+
+    def ejecutar(self, sql, params=(), preparada=False):
+        if preparada:
+            cursor = self._conn.preparado(sql)
+        else:
+            if self._cursor is None:
+                self._cursor = self._conn.cursor()
+            cursor = self._cursor
+        cursor.execute(sql, tuple(params))
+        return cursor.rowcount
+
+    def consultar(self, sql, params=()):
+        cursor = self._conn.cursor(dictionary=True)
+        try:
+            cursor.execute(sql, tuple(params))
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+
+    def cerrar(self):
+        if self._cursor is not None:
+            self._cursor.close()
+
+
+class AlmacenamientoMySQL(Almacenamiento):
+    """MySQL a través del pool del proceso (db.py)."""
+
+    nombre = "MySQL"
+    bloqueo = " FOR UPDATE"
+
+    def __init__(self, pool=None):
+        super().__init__()
+        # El conector sólo se importa cuando el backend es MySQL
+        import mysql.connector
+        import db
+
+        self.errores = (mysql.connector.Error,)
+        self.no_disponible = (mysql.connector.InterfaceError, mysql.connector.OperationalError, db.PoolAgotado)
+        self._pool = pool or db.get_pool()
+
+    def _cursor(self, conn, sql, preparada, dictionary):
+        if preparada:
+            return conn.preparado(sql, dictionary=dictionary), False
+        return conn.cursor(dictionary=dictionary), True
+
+    def consultar(self, sql, params=(), preparada=False):
+        conn = self._pool.obtener()
+        try:
+            cursor, cerrar = self._cursor(conn, sql, preparada, True)
+            cursor.execute(sql, tuple(params))
+            filas = cursor.fetchall()
+            if cerrar:
+                cursor.close()
+            return filas
+        finally:
+            conn.close()
+
+    def valor(self, sql, params=(), preparada=False):
+        conn = self._pool.obtener()
+        try:
+            cursor, cerrar = self._cursor(conn, sql, preparada, False)
+            cursor.execute(sql, tuple(params))
+            fila = cursor.fetchall()[0][0]
+            if cerrar:
+                cursor.close()
+            return fila
+        finally:
+            conn.close()
+
+    @contextmanager
+    def transaccion(self):
+        conn = self._pool.obtener()
+        tx = _TransaccionMySQL(conn)
+        try:
+            yield tx
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            tx.cerrar()
+            conn.close()
+
+    def iterar(self, sql, params=(), tamano=LOTE_LECTURA):
+        conn = self._pool.obtener()
+        try:
+            # Cursor no bufferizado: las filas se leen del socket bajo demanda
+            cursor = conn.cursor(dictionary=True, buffered=False)
+            cursor.execute(sql, tuple(params))
+            while True:
+                filas = cursor.fetchmany(tamano)
+                if not filas:
+                    break
+                yield from filas
+            cursor.close()
+        finally:
+            conn.close()
+
+    periodos = {
+        "dia": "{c}",
+        "semana": "DATE_SUB({c}, INTERVAL WEEKDAY({c}) DAY)",
+        "mes": "DATE_SUB({c}, INTERVAL DAYOFMONTH({c}) - 1 DAY)",
+        "trimestre": "MAKEDATE(YEAR({c}), 1) + INTERVAL QUARTER({c}) - 1 QUARTER",
+    }
+
+    def ahora(self):
+        return self.valor(SQL_AHORA_MYSQL, preparada=True)
+
+    def _clausula_upsert(self, nuevas, ahora, sumar, clave):
+        asignaciones = (
+            [f"{c}=VALUES({c})" for c in nuevas]
+            + [f"{c}=CURRENT_TIMESTAMP(6)" for c in ahora]
+            + [f"{c}={c}+VALUES({c})" for c in sumar]
+        )
+        return "ON DUPLICATE KEY UPDATE " + ", ".join(asignaciones)
+
+    def _sql_busqueda(self, condiciones):
+        coincide = "MATCH(titulo, descripcion) AGAINST (%s IN BOOLEAN MODE)"
+        filtros = "".join(f" AND {c}" for c in condiciones)
+        return (
+            f"SELECT *, {coincide} AS relevancia FROM tareas WHERE {coincide}{filtros} "
+            "ORDER BY relevancia DESC, creada DESC, id DESC LIMIT %s OFFSET %s"
+        )
+
+    def params_busqueda(self, terminos):
+        # Modo booleano: cada término obligatorio (+) y como prefijo (*). La
+        # expresión va dos veces: en la relevancia y en el WHERE (índice FULLTEXT)
+        expresion = " ".join(f"+{t}*" for t in terminos)
+        return expresion, expresion
+
+    def lector(self):
+        import db
+
+        pool = db.get_pool_lector()
+        return AlmacenamientoMySQL(pool) if pool is not None else None
+
+    def cerrar(self):
+        self._pool.cerrar()
+
+
+# ----------------------------
+# SQLite (archivo o memoria)
+# ----------------------------
+
+# Instante con milisegundos, en el mismo formato con que se guardan los DATETIME
+_AHORA_SQLITE = "strftime('%Y-%m-%d %H:%M:%f', 'now')"
+
+ESQUEMA_SQLITE = f"""
+CREATE TABLE IF NOT EXISTS tareas (
+    id          VARCHAR(36)  PRIMARY KEY,
+    titulo      VARCHAR(255) NOT NULL,
+    descripcion TEXT,
+    fecha       DATE         NOT NULL,
+    importancia VARCHAR(20)  NOT NULL,
+    completada  BOOLEAN      NOT NULL DEFAULT 0,
+    creada      DATETIME     NOT NULL,
+    modificada  DATETIME     NOT NULL DEFAULT ({_AHORA_SQLITE})
+);
+CREATE INDEX IF NOT EXISTS idx_tareas_creada      ON tareas (creada, id);
+CREATE INDEX IF NOT EXISTS idx_tareas_estado      ON tareas (completada, creada, id);
+CREATE INDEX IF NOT EXISTS idx_tareas_filtros     ON tareas (completada, importancia, creada, id);
+CREATE INDEX IF NOT EXISTS idx_tareas_importancia ON tareas (importancia, creada, id);
+CREATE INDEX IF NOT EXISTS idx_tareas_fecha       ON tareas (fecha);
+CREATE INDEX IF NOT EXISTS idx_tareas_modificada  ON tareas (modificada);
+
+-- Equivale al ON UPDATE CURRENT_TIMESTAMP(6) de MySQL
+CREATE TRIGGER IF NOT EXISTS tareas_modificada
+AFTER UPDATE OF titulo, descripcion, fecha, importancia, completada, creada ON tareas
+BEGIN
+    UPDATE tareas SET modificada = {_AHORA_SQLITE} WHERE id = NEW.id;
+END;
+
+CREATE TABLE IF NOT EXISTS tareas_eliminadas (
+    id        VARCHAR(36) PRIMARY KEY,
+    eliminada DATETIME    NOT NULL DEFAULT ({_AHORA_SQLITE})
+);
+CREATE INDEX IF NOT EXISTS idx_eliminadas_eliminada ON tareas_eliminadas (eliminada);
+
+-- Contadores materializados (contadores.py)
+CREATE TABLE IF NOT EXISTS tareas_contadores (
+    importancia VARCHAR(20) NOT NULL,
+    completada  BOOLEAN     NOT NULL,
+    n           INTEGER     NOT NULL DEFAULT 0,
+    PRIMARY KEY (importancia, completada)
+);
+CREATE TABLE IF NOT EXISTS tareas_por_fecha (
+    fecha DATE    NOT NULL PRIMARY KEY,
+    n     INTEGER NOT NULL DEFAULT 0
+);
+
+-- Versión de los datos (coherencia.py)
+CREATE TABLE IF NOT EXISTS tareas_version (
+    id      INTEGER NOT NULL PRIMARY KEY,
+    version INTEGER NOT NULL DEFAULT 0
+);
+INSERT OR IGNORE INTO tareas_version (id, version) VALUES (1, 0);
+
+-- Índice invertido de títulos y descripciones (equivale al FULLTEXT de MySQL).
+-- Guarda sólo los términos; el texto se lee de tareas por rowid. Un VACUUM
+-- puede renumerar los rowid: después, INSERT INTO tareas_texto(tareas_texto)
+-- VALUES ('rebuild').
+CREATE VIRTUAL TABLE IF NOT EXISTS tareas_texto USING fts5(
+    titulo, descripcion,
+    content = 'tareas', content_rowid = 'rowid',
+    tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+);
+CREATE TRIGGER IF NOT EXISTS tareas_texto_insertar AFTER INSERT ON tareas
+BEGIN
+    INSERT INTO tareas_texto (rowid, titulo, descripcion) VALUES (NEW.rowid, NEW.titulo, NEW.descripcion);
+END;
+CREATE TRIGGER IF NOT EXISTS tareas_texto_borrar AFTER DELETE ON tareas
+BEGIN
+    INSERT INTO tareas_texto (tareas_texto, rowid, titulo, descripcion)
+    VALUES ('delete', OLD.rowid, OLD.titulo, OLD.descripcion);
+END;
+CREATE TRIGGER IF NOT EXISTS tareas_texto_actualizar AFTER UPDATE OF titulo, descripcion ON tareas
+BEGIN
+    INSERT INTO tareas_texto (tareas_texto, rowid, titulo, descripcion)
+    VALUES ('delete', OLD.rowid, OLD.titulo, OLD.descripcion);
+    INSERT INTO tareas_texto (rowid, titulo, descripcion) VALUES (NEW.rowid, NEW.titulo, NEW.descripcion);
+END;
+"""
+
+sqlite3.register_adapter(date, date.isoformat)
+sqlite3.register_adapter(datetime, lambda d: d.isoformat(" ", timespec="microseconds"))
+sqlite3.register_converter("DATE", lambda b: date.fromisoformat(b.decode()))
+sqlite3.register_converter("DATETIME", lambda b: datetime.fromisoformat(b.decode()))
+
+
+@lru_cache(maxsize=1024)
+def _sql_sqlite(sql):
+    return sql.replace("%s", "?")
+
+
+def _dicts(cursor, filas):
+    columnas = [d[0] for d in cursor.description]
+    return [dict(zip(columnas, f)) for f in filas]
+
+
+class _TransaccionSQLite:
+    def __init__(self, conn):
+        self._conn = conn
+
+    def ejecutar(self, sql, params=(), preparada=False):
+        return self._conn.execute(_sql_sqlite(sql), tuple(params)).rowcount
+
+    def consultar(self, sql, params=()):
+        cursor = self._conn.execute(_sql_sqlite(sql), tuple(params))
+        return _dicts(cursor, cursor.fetchall())
+
+
+class AlmacenamientoSQLite(Almacenamiento):
+    """SQLite embebido: una conexión compartida y serializada con un lock.
+
+    Las sentencias preparadas las reutiliza la caché del propio módulo sqlite3.
+    """
+
+    nombre = "SQLite"
+    errores = (sqlite3.Error,)
+    no_disponible = (sqlite3.OperationalError,)
+
+    def __init__(self, ruta=SQLITE_RUTA):
+        super().__init__()
+        self.ruta = ruta
+        self._lock = threading.RLock()
+        self._conn = self._conectar()
+        if not self._uri:
+            # Los lectores de iterar() no bloquean al escritor
+            self._conn.execute("PRAGMA journal_mode = WAL")
+            self._conn.execute("PRAGMA synchronous = NORMAL")
+        previas = {f[0] for f in self._conn.execute("SELECT name FROM sqlite_master")}
+        self._conn.executescript(ESQUEMA_SQLITE)
+        # Base creada antes del índice de texto o de los contadores: se calculan
+        # a partir de las tareas que ya tenía
+        if "tareas_texto" not in previas:
+            self._conn.execute("INSERT INTO tareas_texto (tareas_texto) VALUES ('rebuild')")
+        if "tareas_contadores" not in previas:
+            import contadores
+
+            contadores.reconstruir(self)
+
+    @property
+    def _uri(self):
+        return self.ruta.startswith("file:")
+
+    def _conectar(self):
+        return sqlite3.connect(
+            self.ruta,
+            uri=self._uri,
+            detect_types=sqlite3.PARSE_DECLTYPES,
+            check_same_thread=False,
+            # Transacciones explícitas con BEGIN/COMMIT en transaccion()
+            isolation_level=None,
+            cached_statements=256
+        )
+
+    def consultar(self, sql, params=(), preparada=False):
+        with self._lock:
+            cursor = self._conn.execute(_sql_sqlite(sql), tuple(params))
+            return _dicts(cursor, cursor.fetchall())
+
+    def valor(self, sql, params=(), preparada=False):
+        with self._lock:
+            return self._conn.execute(_sql_sqlite(sql), tuple(params)).fetchone()[0]
+
+    @contextmanager
+    def transaccion(self):
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                yield _TransaccionSQLite(self._conn)
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def iterar(self, sql, params=(), tamano=LOTE_LECTURA):
+        if self._uri:
+            # Base en memoria: otra conexión sólo la ve por la caché compartida,
+            # donde chocaría con los bloqueos de tabla del escritor. Se lee todo
+            # con la conexión compartida (bases chicas, de desarrollo y pruebas)
+            with self._lock:
+                cursor = self._conn.execute(_sql_sqlite(sql), tuple(params))
+                filas = cursor.fetchall()
+            yield from _dicts(cursor, filas)
+            return
+        # Conexión propia: el recorrido no retiene el lock de la compartida y, con
+        # WAL, lee una instantánea de lo confirmado sin bloquear al escritor
+        conn = self._conectar()
+        try:
+            cursor = conn.execute(_sql_sqlite(sql), tuple(params))
+            while True:
+                filas = cursor.fetchmany(tamano)
+                if not filas:
+                    break
+                yield from _dicts(cursor, filas)
+        finally:
+            conn.close()
+
+    # Devuelven texto ISO 'AAAA-MM-DD' salvo "dia", que conserva el tipo DATE
+    periodos = {
+        "dia": "{c}",
+        "semana": "date({c}, '-6 days', 'weekday 1')",
+        "mes": "date({c}, 'start of month')",
+        "trimestre": "date({c}, 'start of month', printf('-%d months', (CAST(strftime('%m', {c}) AS INTEGER) - 1) % 3))",
+    }
+
+    def ahora(self):
+        with self._lock:
+            texto = self._conn.execute(f"SELECT {_AHORA_SQLITE}").fetchone()[0]
+        return datetime.fromisoformat(texto)
+
+    def _clausula_upsert(self, nuevas, ahora, sumar, clave):
+        asignaciones = (
+            [f"{c}=excluded.{c}" for c in nuevas]
+            + [f"{c}={_AHORA_SQLITE}" for c in ahora]
+            + [f"{c}={c}+excluded.{c}" for c in sumar]
+        )
+        return f"ON CONFLICT({', '.join(clave)}) DO UPDATE SET " + ", ".join(asignaciones)
+
+    def _sql_busqueda(self, condiciones):
+        # bm25() es menor cuanto más relevante; el título pesa más que la descripción
+        relevancia = "-bm25(tareas_texto, 4.0, 1.0)"
+        if not condiciones:
+            # Sin filtros se ordena dentro del índice y sólo se leen de tareas las filas de la página
+            return (
+                "SELECT tareas.*, mejores.relevancia FROM ("
+                f"SELECT rowid, {relevancia} AS relevancia FROM tareas_texto WHERE tareas_texto MATCH %s "
+                "ORDER BY relevancia DESC, rowid DESC LIMIT %s OFFSET %s"
+                ") AS mejores JOIN tareas ON tareas.rowid = mejores.rowid "
+                "ORDER BY mejores.relevancia DESC, mejores.rowid DESC"
+            )
+        filtros = "".join(f" AND {c}" for c in condiciones)
+        return (
+            f"SELECT tareas.*, {relevancia} AS relevancia "
+            "FROM tareas_texto JOIN tareas ON tareas.rowid = tareas_texto.rowid "
+            f"WHERE tareas_texto MATCH %s{filtros} "
+            "ORDER BY relevancia DESC, creada DESC, id DESC LIMIT %s OFFSET %s"
+        )
+
+    def params_busqueda(self, terminos):
+        # Cada término entre comillas (sin operadores de FTS5) y como prefijo
+        return (" ".join(f'"{t}"*' for t in terminos),)
+
+    def lector(self):
+        return AlmacenamientoSQLite(SQLITE_LECTOR_RUTA) if SQLITE_LECTOR_RUTA else None
+
+    def cerrar(self):
+        with self._lock:
+            self._conn.close()
+
+
+class AlmacenamientoMemoria(AlmacenamientoSQLite):
+    """SQLite en memoria; la caché compartida permite que iterar() abra su propia conexión.
+
+    No tiene réplica: SQLITE_LECTOR_RUTA no aplica.
+    """
+
+    nombre = "memoria"
+
+    def __init__(self):
+        super().__init__(f"file:tareas-{uuid.uuid4().hex}?mode=memory&cache=shared")
+
+    def lector(self):
+        return None
+
+
+# ----------------------------
+# Envoltorios
+# ----------------------------
+
+class AlmacenamientoEnvuelto(Almacenamiento):
+    """Base de los backends que envuelven a otro: delega todo en `interno`.
+
+    Los atributos de dialecto se leen siempre del envuelto; las subclases
+    redefinen sólo los métodos que instrumentan o desvían.
+    """
+
+    def __init__(self, interno):
+        super().__init__()
+        self._interno = interno
+
+    @property
+    def nombre(self):
+        return self._interno.nombre
+
+    @property
+    def errores(self):
+        return self._interno.errores
+
+    @property
+    def no_disponible(self):
+        return self._interno.no_disponible
+
+    @property
+    def bloqueo(self):
+        return self._interno.bloqueo
+
+    @property
+    def periodos(self):
+        return self._interno.periodos
+
+    @property
+    def con_lector(self):
+        return self._interno.con_lector
+
+    def consultar(self, sql, params=(), preparada=False):
+        return self._interno.consultar(sql, params, preparada)
+
+    def valor(self, sql, params=(), preparada=False):
+        return self._interno.valor(sql, params, preparada)
+
+    def transaccion(self):
+        return self._interno.transaccion()
+
+    def iterar(self, sql, params=(), tamano=LOTE_LECTURA):
+        return self._interno.iterar(sql, params, tamano)
+
+    def ahora(self):
+        return self._interno.ahora()
+
+    def sql_upsert(self, *args, **kwargs):
+        return self._interno.sql_upsert(*args, **kwargs)
+
+    def sql_busqueda(self, condiciones=()):
+        return self._interno.sql_busqueda(condiciones)
+
+    def params_busqueda(self, terminos):
+        return self._interno.params_busqueda(terminos)
+
+    def cerrar(self):
+        self._interno.cerrar()
+
+
+# ----------------------------
+# Instrumentación (METRICAS=1)
+# ----------------------------
+
+@lru_cache(maxsize=512)
+def _etiqueta_sql(sql):
+    """Nombre corto de una sentencia para las métricas: verbo, tabla y agrupación."""
+    palabras = sql.split()
+    claves = [p.upper() for p in palabras]
+    etiqueta = claves[0]
+    for i, clave in enumerate(claves[:-1]):
+        if clave in ("FROM", "INTO", "UPDATE"):
+            etiqueta += " " + palabras[i + 1]
+            break
+    if "GROUP" in claves:
+        i = claves.index("GROUP")
+        etiqueta += " GROUP BY " + " ".join(palabras[i + 2:i + 3])
+    elif "WHERE" in claves:
+        etiqueta += " WHERE"
+    return etiqueta
+
+
+class _TransaccionMedida:
+    def __init__(self, tx):
+        self._tx = tx
+
+    def ejecutar(self, sql, params=(), preparada=False):
+        with metricas.medir("db", _etiqueta_sql(sql)) as m:
+            m.filas = self._tx.ejecutar(sql, params, preparada)
+        return m.filas
+
+    def consultar(self, sql, params=()):
+        with metricas.medir("db", _etiqueta_sql(sql)) as m:
+            filas = self._tx.consultar(sql, params)
+            m.filas = len(filas)
+        return filas
+
+
+class AlmacenamientoMedido(AlmacenamientoEnvuelto):
+    """Envuelve un backend y registra tiempo y filas de cada sentencia."""
+
+    def consultar(self, sql, params=(), preparada=False):
+        with metricas.medir("db", _etiqueta_sql(sql)) as m:
+            filas = self._interno.consultar(sql, params, preparada)
+            m.filas = len(filas)
+        return filas
+
+    def valor(self, sql, params=(), preparada=False):
+        with metricas.medir("db", _etiqueta_sql(sql)) as m:
+            m.filas = 1
+            return self._interno.valor(sql, params, preparada)
+
+    @contextmanager
+    def transaccion(self):
+        with metricas.medir("db", "transaccion"):
+            with self._interno.transaccion() as tx:
+                yield _TransaccionMedida(tx)
+
+    def iterar(self, sql, params=(), tamano=LOTE_LECTURA):
+        # Sólo cuenta el tiempo dentro del cursor, no el del consumidor
+        etiqueta = _etiqueta_sql(sql)
+        filas = self._interno.iterar(sql, params, tamano)
+        segundos, n = 0.0, 0
+        try:
+            while True:
+                inicio = time.perf_counter()
+                try:
+                    fila = next(filas)
+                except StopIteration:
+                    break
+                finally:
+                    segundos += time.perf_counter() - inicio
+                n += 1
+                yield fila
+        finally:
+            filas.close()
+            metricas.registrar("db", etiqueta, segundos, n)
+
+    def ahora(self):
+        with metricas.medir("db", "SELECT ahora"):
+            return self._interno.ahora()
+
+
+# ----------------------------
+# Ruteo escritor / lector
+# ----------------------------
+
+_ruta = threading.local()
+
+
+@contextmanager
+def leer_del_escritor(activo=True):
+    """Dentro del bloque, las lecturas de este hilo van al escritor aunque haya lector.
+
+    Para leer lo que la sesión acaba de escribir sin esperar a la réplica.
+    """
+    anterior = getattr(_ruta, "escritor", False)
+    _ruta.escritor = anterior or activo
+    try:
+        yield
+    finally:
+        _ruta.escritor = anterior
+
+
+class AlmacenamientoRuteado(AlmacenamientoEnvuelto):
+    """Transacciones, escrituras y ahora() al escritor; lecturas sueltas al lector.
+
+    Las lecturas dentro de leer_del_escritor() también van al escritor. Si
+    el lector no está disponible, consultar() y valor() se reintentan en el
+    escritor y durante LECTOR_PAUSA segundos todas las lecturas van directo
+    al escritor, sin esperar el timeout de la réplica en cada una.
+    """
+
+    con_lector = True
+
+    def __init__(self, escritor, lector):
+        super().__init__(escritor)
+        self._escritor = escritor
+        self._lector = lector
+        self.pausa = LECTOR_PAUSA
+        self._pausado_hasta = float("-inf")
+
+    def _origen(self):
+        if getattr(_ruta, "escritor", False) or time.monotonic() < self._pausado_hasta:
+            return self._escritor
+        return self._lector
+
+    def _leer(self, metodo, sql, params, preparada):
+        origen = self._origen()
+        if origen is self._escritor:
+            return getattr(origen, metodo)(sql, params, preparada)
+        try:
+            return getattr(origen, metodo)(sql, params, preparada)
+        except self._lector.no_disponible as e:
+            log.warning("Réplica no disponible, se lee del escritor por %.0f s: %s", self.pausa, e)
+            self._pausado_hasta = time.monotonic() + self.pausa
+            return getattr(self._escritor, metodo)(sql, params, preparada)
+
+    def consultar(self, sql, params=(), preparada=False):
+        return self._leer("consultar", sql, params, preparada)
+
+    def valor(self, sql, params=(), preparada=False):
+        return self._leer("valor", sql, params, preparada)
+
+    def iterar(self, sql, params=(), tamano=LOTE_LECTURA):
+        return self._origen().iterar(sql, params, tamano)
+
+    def cerrar(self):
+        self._lector.cerrar()
+        self._escritor.cerrar()
+
+
+BACKENDS = {
+    "mysql": AlmacenamientoMySQL,
+    "sqlite": AlmacenamientoSQLite,
+    "memoria": AlmacenamientoMemoria,
+}
+
+_almacenamiento = None
+_almacenamiento_lock = threading.Lock()
+
+
+def get_almacenamiento():
+    """Backend único del proceso, elegido con la variable ALMACENAMIENTO."""
+    global _almacenamiento
+    if _almacenamiento is None:
+        with _almacenamiento_lock:
+            if _almacenamiento is None:
+                if BACKEND not in BACKENDS:
+                    raise ValueError(f"ALMACENAMIENTO desconocido: {BACKEND!r} (use {', '.join(BACKENDS)})")
+                backend = BACKENDS[BACKEND]()
+                lector = backend.lector()
+                if lector is not None:
+                    backend = AlmacenamientoRuteado(backend, lector)
+                _almacenamiento = AlmacenamientoMedido(backend) if metricas.ACTIVAS else backend
+    return _almacenamiento
+
+
+def usar_almacenamiento(almacenamiento):
+    """Reemplaza el backend del proceso (scripts y herramientas fuera de la app)."""
+    global _almacenamiento
+    with _almacenamiento_lock:
+        _almacenamiento = almacenamiento
@@ -1,85 +1,257 @@
 import streamlit as st
 from datetime import datetime, date
-import boto3
-import json
 import uuid
-import altair as alt
-import pandas as pd
-import mysql.connector
+import os
+import time
+import coherencia
+import escritura_diferida
+import estadisticas
+import metricas
+import repositorio
+import respaldo
+import trabajos
+from almacenamiento import get_almacenamiento, leer_del_escritor
 
 # ============================
-#  CONFIGURACIÓN MYSQL (RDS)
+#  ACCESO A DATOS (CACHÉ SOBRE EL REPOSITORIO)
 # ============================
 
-MYSQL_HOST = "proyectoaws-db.ckiyq9fa3mxc.us-east-1.rds.amazonaws.com"
-MYSQL_USER = "admin"
-MYSQL_PASS = "Camilo9408"
-MYSQL_DB   = "proyectoaws"
+# Caché de la lista de tareas (compartida por sesiones del mismo proceso)
+CACHE_TAREAS_TTL = int(os.environ.get("CACHE_TAREAS_TTL", "300"))
+CACHE_TAREAS_MAX = int(os.environ.get("CACHE_TAREAS_MAX", "4"))
+CACHE_PAGINAS_MAX = int(os.environ.get("CACHE_PAGINAS_MAX", "64"))
+# Línea de tiempo: 5 agrupaciones (automático + 4 periodos) por 2 orígenes de lectura
+CACHE_LINEA_MAX = int(os.environ.get("CACHE_LINEA_MAX", "10"))
 
+# Paginación de "Todas las Tareas"
+TAMANOS_PAGINA = [10, 25, 50, 100]
+TAMANO_PAGINA = int(os.environ.get("TAMANO_PAGINA", "25"))
+# Modo tabla (alto volumen): una grilla por página en vez de widgets por tarea
+TAMANOS_PAGINA_TABLA = [100, 250, 500, 1000]
 
-def get_mysql_conn():
-    return mysql.connector.connect(
-        host=MYSQL_HOST,
-        user=MYSQL_USER,
-        password=MYSQL_PASS,
-        database=MYSQL_DB
-    )
+# Segundos entre refrescos del progreso de respaldos y restauraciones en curso
+REFRESCO_TRABAJOS = float(os.environ.get("TRABAJOS_REFRESCO", "1"))
+
+# Con réplica de lectura: segundos tras una escritura de la sesión en que sus
+# lecturas van al escritor (leer lo propio aunque la réplica vaya atrasada)
+VENTANA_ESCRITOR = float(os.environ.get("LECTURA_ESCRITOR_VENTANA", "5"))
+
+
+def origen_lectura():
+    """De dónde lee esta sesión: "escritor" si escribió hace menos de VENTANA_ESCRITOR s
+    y hay réplica; si no, "lector".
+
+    Va como argumento de las lecturas cacheadas: lo leído del escritor se
+    cachea aparte y no se mezcla con lo leído de la réplica.
+    """
+    reciente = time.time() - st.session_state.get("ultima_escritura", 0) < VENTANA_ESCRITOR
+    return "escritor" if reciente and get_almacenamiento().con_lector else "lector"
 
 
-def cargar_tareas_mysql():
-    """Lee las tareas desde la tabla tareas en RDS MySQL."""
-    conn = get_mysql_conn()
-    cursor = conn.cursor(dictionary=True)
-    cursor.execute("SELECT * FROM tareas ORDER BY creada DESC")
-    tareas = cursor.fetchall()
-    cursor.close()
-    conn.close()
-    return tareas
+def marcar_escritura():
+    st.session_state["ultima_escritura"] = time.time()
 
 
-def guardar_tarea_mysql(tarea):
-    """Inserta una tarea nueva en MySQL."""
-    conn = get_mysql_conn()
-    cursor = conn.cursor()
+@st.cache_data(ttl=CACHE_TAREAS_TTL, max_entries=CACHE_PAGINAS_MAX, show_spinner=False)
+def cargar_pagina(estado, importancia, ancla, direccion, limite, origen="lector", tabla=False):
+    """Página cacheada de tareas; se invalida junto con la instantánea.
 
-    query = """
-    INSERT INTO tareas (id, titulo, descripcion, fecha, importancia, completada, creada)
-    VALUES (%s, %s, %s, %s, %s, %s, %s)
+    Con `tabla` (modo tabla) la página es una tabla columnar; si no, una
+    lista de dicts, que es lo que dibuja la vista fila por fila.
     """
+    with leer_del_escritor(origen == "escritor"):
+        tareas, hay_anterior, hay_siguiente = repositorio.cargar_pagina(estado, importancia, ancla, direccion, limite)
+    return como_pagina(tareas, tabla), hay_anterior, hay_siguiente
+
+
+@st.cache_data(ttl=CACHE_TAREAS_TTL, max_entries=CACHE_PAGINAS_MAX, show_spinner=False)
+def buscar_tareas(texto, estado, importancia, pagina, limite, origen="lector", tabla=False):
+    """Página cacheada de resultados de búsqueda, como en cargar_pagina()."""
+    with leer_del_escritor(origen == "escritor"):
+        tareas, hay_siguiente = repositorio.buscar_tareas(texto, estado, importancia, pagina, limite)
+    return como_pagina(tareas, tabla), pagina > 0, hay_siguiente
+
+
+def como_pagina(tareas, tabla):
+    if not tabla:
+        return tareas
+    # pandas y pyarrow sólo se importan en modo tabla
+    import tabla_tareas
+
+    return tabla_tareas.desde_registros(tareas)
+
+
+def clave_pagina(tareas, posicion):
+    """Clave keyset (creada, id) de la fila en `posicion`, de una lista o de una tabla columnar."""
+    if isinstance(tareas, list):
+        return tareas[posicion]["creada"], tareas[posicion]["id"]
+    import tabla_tareas
+
+    return tabla_tareas.clave(tareas, posicion)
+
+
+@st.cache_data(ttl=CACHE_TAREAS_TTL, max_entries=CACHE_TAREAS_MAX, show_spinner=False)
+def cargar_resumen(origen="lector"):
+    """KPIs cacheados (total, completadas, pendientes) calculados en la base."""
+    with leer_del_escritor(origen == "escritor"):
+        return estadisticas.resumen_tareas()
+
+
+@st.cache_data(ttl=CACHE_TAREAS_TTL, max_entries=CACHE_TAREAS_MAX, show_spinner=False)
+def cargar_conteos(origen="lector"):
+    """Conteos cacheados por importancia para la gráfica circular."""
+    with leer_del_escritor(origen == "escritor"):
+        return estadisticas.conteo_por_importancia()
+
+
+@st.cache_data(ttl=CACHE_TAREAS_TTL, max_entries=CACHE_LINEA_MAX, show_spinner=False)
+def cargar_linea_tiempo(granularidad, origen="lector"):
+    """Tareas por fecha límite agrupadas por periodo (None: automático), cacheadas."""
+    with leer_del_escritor(origen == "escritor"):
+        return estadisticas.linea_tiempo(granularidad)
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def cargar_manifiesto():
+    """Manifiesto de respaldos (base y deltas), cacheado un minuto."""
+    return respaldo.leer_manifiesto()
+
 
-    cursor.execute(query, (
-        tarea['id'],
-        tarea['titulo'],
-        tarea['descripcion'],
-        tarea['fecha'],      # date
-        tarea['importancia'],
-        tarea['completada'],
-        tarea['creada']      # datetime
-    ))
-
-    conn.commit()
-    cursor.close()
-    conn.close()
-
-
-def actualizar_estado_mysql(tarea_id, estado):
-    """Actualiza el estado completada de una tarea en MySQL."""
-    conn = get_mysql_conn()
-    cursor = conn.cursor()
-    cursor.execute("UPDATE tareas SET completada=%s WHERE id=%s", (estado, tarea_id))
-    conn.commit()
-    cursor.close()
-    conn.close()
-
-
-def eliminar_tarea_mysql(tarea_id):
-    """Elimina una tarea de MySQL por id."""
-    conn = get_mysql_conn()
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM tareas WHERE id=%s", (tarea_id,))
-    conn.commit()
-    cursor.close()
-    conn.close()
+def invalidar_cache_tareas():
+    """Descarta páginas y estadísticas para que la próxima lectura vaya a la base."""
+    cargar_pagina.clear()
+    buscar_tareas.clear()
+    cargar_resumen.clear()
+    cargar_conteos.clear()
+    cargar_linea_tiempo.clear()
+
+
+def get_coherencia():
+    comprobador = coherencia.get_coherencia()
+    comprobador.al_cambiar = invalidar_cache_tareas
+    return comprobador
+
+
+# ============================
+#  MUTACIONES (DIRECTAS O DIFERIDAS)
+# ============================
+
+def get_sesion_id():
+    """Identificador de la sesión, para devolverle los errores de escritura diferida."""
+    if "sesion_id" not in st.session_state:
+        st.session_state["sesion_id"] = str(uuid.uuid4())
+    return st.session_state["sesion_id"]
+
+
+def get_cola():
+    cola = escritura_diferida.get_cola()
+    cola.al_escribir = invalidar_cache_tareas
+    return cola
+
+
+# ============================
+#  RESPALDOS EN SEGUNDO PLANO
+# ============================
+
+def al_terminar_trabajo(trabajo):
+    """Invalida lo que el trabajo dejó viejo (corre en el hilo del pool)."""
+    if trabajo.clave == "respaldo":
+        cargar_manifiesto.clear()
+    else:
+        invalidar_cache_tareas()
+
+
+def get_registro():
+    registro = trabajos.get_registro()
+    registro.al_terminar = al_terminar_trabajo
+    return registro
+
+
+def trabajo_respaldo(funcion):
+    """Respaldo completo o incremental con el progreso en el Trabajo."""
+    def ejecutar(trabajo):
+        # Lo encolado también entra en el respaldo
+        if escritura_diferida.ACTIVA:
+            get_cola().vaciar()
+        return funcion(progreso=trabajo.avance)
+    return ejecutar
+
+
+def trabajo_restauracion(punto):
+    """Restauración hasta `punto` (None: el último respaldo); retorna None si no hay respaldo."""
+    def ejecutar(trabajo):
+        if escritura_diferida.ACTIVA:
+            get_cola().vaciar()
+        abierto = respaldo.abrir_respaldo(hasta=punto)
+        if not abierto:
+            return None
+        total, tareas = abierto
+        trabajo.total = total
+        try:
+            # Un punto anterior reemplaza la tabla; el último respaldo se fusiona con ella
+            return respaldo.restaurar_tareas(tareas, progreso=trabajo.avance, total=total,
+                                             exacta=punto is not None)
+        finally:
+            # Al cancelar, detiene la descarga en curso
+            if hasattr(tareas, "close"):
+                tareas.close()
+    return ejecutar
+
+
+def crear_tarea(tarea):
+    marcar_escritura()
+    if escritura_diferida.ACTIVA:
+        get_cola().crear(tarea, get_sesion_id())
+    else:
+        repositorio.guardar_tarea(tarea)
+        invalidar_cache_tareas()
+
+
+def cambiar_estado_tarea(tarea_id, estado, anterior=None):
+    marcar_escritura()
+    if escritura_diferida.ACTIVA:
+        get_cola().cambiar_estado(tarea_id, estado, get_sesion_id(), anterior=anterior)
+    else:
+        repositorio.actualizar_estado(tarea_id, estado)
+        invalidar_cache_tareas()
+
+
+def eliminar_tarea(tarea_id):
+    marcar_escritura()
+    if escritura_diferida.ACTIVA:
+        get_cola().eliminar(tarea_id, get_sesion_id())
+    else:
+        repositorio.eliminar_tarea(tarea_id)
+        invalidar_cache_tareas()
+
+
+def cambiar_estado_lote(ids, estado):
+    marcar_escritura()
+    if escritura_diferida.ACTIVA:
+        for tarea_id in ids:
+            get_cola().cambiar_estado(tarea_id, estado, get_sesion_id())
+    else:
+        repositorio.actualizar_estado_lote(ids, estado)
+        invalidar_cache_tareas()
+
+
+def cambiar_importancia_lote(ids, importancia):
+    marcar_escritura()
+    # La cola no encola cambios de importancia: se escribe lo pendiente antes
+    if escritura_diferida.ACTIVA:
+        get_cola().vaciar()
+    repositorio.actualizar_importancia_lote(ids, importancia)
+    invalidar_cache_tareas()
+
+
+def eliminar_tareas_lote(ids):
+    marcar_escritura()
+    if escritura_diferida.ACTIVA:
+        for tarea_id in ids:
+            get_cola().eliminar(tarea_id, get_sesion_id())
+    else:
+        repositorio.eliminar_tareas_lote(ids)
+        invalidar_cache_tareas()
 
 
 # ============================
@@ -93,11 +265,19 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Métricas (METRICAS=1): cronometra este rerun y abre /metrics si hay puerto
+metricas.iniciar_rerun()
+metricas.servir_prometheus()
+
+# Escrituras de otras instancias: si la versión de los datos cambió, las
+# cachés se descartan antes de leer nada
+get_coherencia().comprobar()
+
 # ============================
 #  ESTILOS CSS PERSONALIZADOS
 # ============================
 
-st.markdown("""
+ESTILOS_CSS = """
 <style>
     /* Tema oscuro global */
     .main {
@@ -278,52 +458,10 @@ st.markdown("""
         display: block;
     }
 </style>
-""", unsafe_allow_html=True)
-
-# ============================
-#  CONFIGURAR S3 (BACKUP)
-# ============================
-
-BUCKET = "proyecto-aws-camilo"
-ARCHIVO = "tareas.json"
-
-s3 = boto3.client("s3", region_name="us-east-1")
-
-
-def cargar_tareas_s3():
-    """Lee las tareas desde el archivo JSON en S3."""
-    try:
-        obj = s3.get_object(Bucket=BUCKET, Key=ARCHIVO)
-        data = obj["Body"].read().decode("utf-8")
-        return json.loads(data)
-    except s3.exceptions.NoSuchKey:
-        return []
-    except Exception as e:
-        st.error(f"Error al cargar tareas desde S3: {e}")
-        return []
-
-
-def guardar_tareas_s3(tareas):
-    """Guarda la lista de tareas en S3 en formato JSON."""
-    try:
-        s3.put_object(
-            Bucket=BUCKET,
-            Key=ARCHIVO,
-            Body=json.dumps(tareas, default=str),
-            ContentType="application/json"
-        )
-    except Exception as e:
-        st.error(f"Error al guardar tareas en S3: {e}")
-
-
-def probar_conexion():
-    """Prueba si el bucket es accesible."""
-    try:
-        s3.list_objects_v2(Bucket=BUCKET)
-        return True
-    except Exception as e:
-        return str(e)
+"""
 
+with metricas.medir("estilos", "css"):
+    st.markdown(ESTILOS_CSS, unsafe_allow_html=True)
 
 # ----------------------------
 # Funciones auxiliares
@@ -355,19 +493,16 @@ st.markdown('<h1> Sistema de Gestión de Tareas UAO</h1>', unsafe_allow_html=Tru
 st.markdown('<h2 style="color: white;"> Proyecto Final AWS </h2>', unsafe_allow_html=True)
 st.markdown('<p class="subtitle"> Camilo Velasco, Bradley Campo, Santiago Barriga, Manuel Luna</p>', unsafe_allow_html=True)
 
-# ============================
-#  TABS PRINCIPALES
-# ============================
-
-tab0, tab1, tab2, tab3, tab4 = st.tabs(
-    ["Descipcion proyecto", "➕ Nueva Tarea", "📋 Todas las Tareas", "📊 Estadísticas", " 🖥️ Conexion instancia EC2 B"]
-)
+# Errores de la escritura diferida que afectan a cambios hechos en esta sesión
+if escritura_diferida.ACTIVA:
+    for error in get_cola().errores(get_sesion_id()):
+        st.error(error)
 
 # ===================================
 # TAB 0 – Descripción del proyecto
 # ===================================
 
-with tab0:
+def mostrar_descripcion():
     st.header("Descripción General del Proyecto")
     st.markdown("""
 **Sistema de Gestión de Tareas en AWS**
@@ -375,7 +510,7 @@ with tab0:
 Este proyecto es una aplicación web desarrollada con **Python y Streamlit**, desplegada en una instancia **Amazon EC2 (t3.micro)**.
 
 Actualmente, las tareas se almacenan de manera persistente en una **base de datos MySQL gestionada por Amazon RDS**, ubicada en subred privada dentro de la VPC del proyecto.  
-Adicionalmente, se implementa un **mecanismo de respaldo en Amazon S3**, donde se guarda un archivo `tareas.json` con una copia de las tareas.
+Adicionalmente, se implementa un **mecanismo de respaldo en Amazon S3**, donde se guarda un archivo `tareas.ndjson.gz` (NDJSON comprimido) con una copia de las tareas.
 
 La arquitectura utiliza un **Rol de IAM (LabRole)**, el cual permite que la instancia EC2 acceda al Bucket de S3 para respaldos.
 
@@ -386,7 +521,7 @@ La arquitectura utiliza un **Rol de IAM (LabRole)**, el cual permite que la inst
 - Eliminar tareas con confirmación.
 - Mostrar estadísticas y gráficas del uso.
 - Persistencia de datos en **Amazon RDS (MySQL)**.
-- Respaldo opcional de datos en **Amazon S3 (JSON)**.
+- Respaldo opcional de datos en **Amazon S3 (NDJSON + gzip)**.
 
 ### **Componentes del despliegue:**
 
@@ -408,7 +543,7 @@ La arquitectura utiliza un **Rol de IAM (LabRole)**, el cual permite que la inst
 
 • **Amazon S3**
    - Bucket: `proyecto-aws-camilo`  
-   - Archivo de respaldo: `tareas.json`  
+   - Archivo de respaldo: `tareas.ndjson.gz`  
 
 • **Security Group**
    - SSH → 22/TCP  
@@ -427,7 +562,7 @@ La arquitectura utiliza un **Rol de IAM (LabRole)**, el cual permite que la inst
 # TAB 1 – Crear nueva tarea
 # ===================================
 
-with tab1:
+def mostrar_nueva_tarea():
     st.header("Crear Nueva Tarea")
     
     with st.form("nueva_tarea"):
@@ -440,7 +575,7 @@ with tab1:
         with col2:
             importancia = st.selectbox(" Importancia", ["🟢 Baja", "🟡 Media", "🔴 Alta"])
 
-        submit = st.form_submit_button(" Crear Tarea", use_container_width=True)
+        submit = st.form_submit_button(" Crear Tarea", width="stretch")
 
         if submit:
             if titulo.strip() == "":
@@ -455,7 +590,7 @@ with tab1:
                     "completada": False,
                     "creada": datetime.now()      # datetime object
                 }
-                guardar_tarea_mysql(nueva)
+                crear_tarea(nueva)
                 st.success(" Tarea creada correctamente")
                 st.rerun()
 
@@ -463,109 +598,350 @@ with tab1:
 # TAB 2 – Listar tareas
 # ===================================
 
-with tab2:
+def mostrar_fila_tarea(tarea):
+    """Fila de una tarea; se ejecuta como fragmento con clave fila_{id}."""
+    fila = f"fila_{tarea['id']}"
+    clave_confirmar = f"confirm_delete_{tarea['id']}"
+
+    def cambiar_estado():
+        anterior = tarea["completada"]
+        tarea["completada"] = not anterior
+        cambiar_estado_tarea(tarea["id"], tarea["completada"], anterior=anterior)
+        st.rerun([fila, "kpis"])
+
+    def pedir_confirmacion(valor):
+        st.session_state[clave_confirmar] = valor
+        st.rerun(fila)
+
+    def eliminar():
+        eliminar_tarea(tarea["id"])
+        del st.session_state[clave_confirmar]
+        tarea["eliminada"] = True
+        st.rerun([fila, "kpis"])
+
+    def cambiar_seleccion():
+        seleccion = st.session_state["seleccion_tareas"]
+        if tarea["id"] in seleccion:
+            seleccion.discard(tarea["id"])
+        else:
+            seleccion.add(tarea["id"])
+        st.rerun([fila, "acciones_lote"])
+
+    if tarea.get("eliminada"):
+        return
+
+    with st.container():
+        col1, col2, col3, col4 = st.columns([3, 2, 1, 1])
+
+        # Información de la tarea
+        with col1:
+            if tarea["completada"]:
+                estado = f"~~{tarea['titulo']}~~"
+            else:
+                estado = tarea["titulo"]
+
+            st.subheader(estado)
+            if tarea["descripcion"]:
+                st.write(tarea["descripcion"])
+
+        # Info de estado
+        with col2:
+            # fecha viene como date
+            fecha_str = tarea["fecha"].strftime("%Y-%m-%d") if isinstance(tarea["fecha"], (datetime, date)) else str(tarea["fecha"])
+            st.write(f"📅 **Fecha límite:** {fecha_str}")
+            st.markdown(f" **Importancia:** {get_badge_html(tarea['importancia'])}", unsafe_allow_html=True)
+            estado_emoji = "✅" if tarea['completada'] else "⏳"
+            estado_texto = "Completada" if tarea['completada'] else "Pendiente"
+            st.write(f"{estado_emoji} **Estado:** {estado_texto}")
+
+        # Seleccionar para acciones en lote / Completar / Reabrir
+        with col3:
+            st.checkbox("Seleccionar", value=tarea["id"] in st.session_state["seleccion_tareas"],
+                        key=f"sel_{tarea['id']}_{st.session_state['seleccion_version']}",
+                        on_change=cambiar_seleccion)
+            boton_texto = "↩️" if tarea["completada"] else "✅"
+            st.button(boton_texto, key=f"comp_{tarea['id']}", help="Cambiar estado", on_click=cambiar_estado)
+
+        # Eliminar con confirmación
+        with col4:
+            if clave_confirmar not in st.session_state:
+                st.session_state[clave_confirmar] = False
+
+            if not st.session_state[clave_confirmar]:
+                st.button("🗑️", key=f"elim_{tarea['id']}", help="Eliminar tarea",
+                          on_click=pedir_confirmacion, args=(True,))
+            else:
+                col_si, col_no = st.columns(2)
+                with col_si:
+                    st.button("✓", key=f"conf_si_{tarea['id']}", help="Confirmar", on_click=eliminar)
+                with col_no:
+                    st.button("✗", key=f"conf_no_{tarea['id']}", help="Cancelar",
+                              on_click=pedir_confirmacion, args=(False,))
+
+        st.divider()
+
+
+def mostrar_tabla_tareas(tabla):
+    """Página de tareas como una sola grilla editable; se ejecuta como fragmento.
+
+    Sólo viaja al navegador la página actual. La columna completada se edita
+    en la grilla y la columna seleccionar alimenta las acciones en lote.
+    """
+    if "tabla_version" not in st.session_state:
+        st.session_state["tabla_version"] = 0
+    # Cambiar la clave tras aplicar cambios descarta las ediciones ya guardadas
+    clave = f"tabla_tareas_{st.session_state['tabla_version']}"
+
+    def aplicar_cambios():
+        cambios = st.session_state[clave]["edited_rows"]
+        seleccion = st.session_state["seleccion_tareas"]
+        hubo_cambios = False
+        columna_completada = tabla.columns.get_loc("completada")
+        for fila, cambio in cambios.items():
+            tarea_id = tabla["id"].iloc[fila]
+            if "seleccionar" in cambio:
+                if cambio["seleccionar"]:
+                    seleccion.add(tarea_id)
+                else:
+                    seleccion.discard(tarea_id)
+            anterior = bool(tabla["completada"].iloc[fila])
+            if "completada" in cambio and bool(cambio["completada"]) != anterior:
+                tabla.iat[fila, columna_completada] = bool(cambio["completada"])
+                cambiar_estado_tarea(tarea_id, bool(cambio["completada"]), anterior=anterior)
+                hubo_cambios = True
+        if hubo_cambios:
+            st.session_state["tabla_version"] += 1
+            st.rerun(["tabla_tareas", "acciones_lote", "kpis"])
+        st.rerun(["tabla_tareas", "acciones_lote"])
+
+    df = tabla[["titulo", "descripcion", "fecha", "importancia", "completada"]].assign(
+        seleccionar=tabla["id"].isin(st.session_state["seleccion_tareas"])
+    )
+
+    st.data_editor(
+        df,
+        key=clave,
+        hide_index=True,
+        width="stretch",
+        num_rows="fixed",
+        disabled=["titulo", "descripcion", "fecha", "importancia"],
+        column_config={
+            "titulo": st.column_config.TextColumn("📝 Título"),
+            "descripcion": st.column_config.TextColumn("📄 Descripción"),
+            "fecha": st.column_config.DateColumn("📅 Fecha límite", format="YYYY-MM-DD"),
+            "importancia": st.column_config.TextColumn("Importancia"),
+            "completada": st.column_config.CheckboxColumn("✅ Completada"),
+            "seleccionar": st.column_config.CheckboxColumn("☑️ Seleccionar"),
+        },
+        on_change=aplicar_cambios,
+    )
+
+
+def limpiar_seleccion():
+    st.session_state["seleccion_tareas"] = set()
+    st.session_state["confirmar_lote"] = False
+    # Claves nuevas para que las casillas y la grilla se redibujen desmarcadas
+    st.session_state["seleccion_version"] += 1
+    st.session_state["tabla_version"] = st.session_state.get("tabla_version", 0) + 1
+
+
+def mostrar_acciones_lote():
+    """Acciones sobre las tareas seleccionadas; se ejecuta como fragmento.
+
+    Cada acción es una única sentencia en una transacción, seguida de una
+    sola recarga completa de la página.
+    """
+    seleccion = st.session_state["seleccion_tareas"]
+    if not seleccion:
+        st.caption("Selecciona tareas para completarlas, reabrirlas, eliminarlas o cambiar su importancia en lote.")
+        return
+
+    def aplicar(accion, *args):
+        ids = list(st.session_state["seleccion_tareas"])
+        accion(ids, *args)
+        limpiar_seleccion()
+        st.rerun()
+
+    def pedir_confirmacion(valor):
+        st.session_state["confirmar_lote"] = valor
+        st.rerun("acciones_lote")
+
+    st.write(f"☑️ **{len(seleccion)} tareas seleccionadas**")
+    col_a, col_b, col_c, col_d, col_e = st.columns([1, 1, 1, 2, 1])
+    with col_a:
+        st.button("✅ Completar", key="lote_completar", width="stretch",
+                  on_click=aplicar, args=(cambiar_estado_lote, True))
+    with col_b:
+        st.button("↩️ Reabrir", key="lote_reabrir", width="stretch",
+                  on_click=aplicar, args=(cambiar_estado_lote, False))
+    with col_c:
+        if not st.session_state.get("confirmar_lote"):
+            st.button("🗑️ Eliminar", key="lote_eliminar", width="stretch",
+                      on_click=pedir_confirmacion, args=(True,))
+        else:
+            col_si, col_no = st.columns(2)
+            with col_si:
+                st.button("✓", key="lote_conf_si", help="Confirmar",
+                          on_click=aplicar, args=(eliminar_tareas_lote,))
+            with col_no:
+                st.button("✗", key="lote_conf_no", help="Cancelar",
+                          on_click=pedir_confirmacion, args=(False,))
+    with col_d:
+        nueva_importancia = st.selectbox("Importancia", ["🟢 Baja", "🟡 Media", "🔴 Alta"],
+                                         key="lote_importancia", label_visibility="collapsed")
+        st.button("Cambiar importancia", key="lote_cambiar_importancia", width="stretch",
+                  on_click=aplicar, args=(cambiar_importancia_lote, nueva_importancia))
+    with col_e:
+        st.button("Limpiar", key="lote_limpiar", width="stretch",
+                  on_click=lambda: (limpiar_seleccion(), st.rerun()))
+
+
+def mostrar_tareas():
     st.header("Tareas Registradas")
 
-    tareas = cargar_tareas_mysql()
-    
-    # Filtros
-    col_f1, col_f2 = st.columns(2)
+    def reiniciar_paginacion():
+        st.session_state["pagina_ancla"] = None
+        st.session_state["pagina_direccion"] = None
+        st.session_state["busqueda_pagina"] = 0
+
+    if "pagina_ancla" not in st.session_state:
+        reiniciar_paginacion()
+    if "seleccion_tareas" not in st.session_state:
+        st.session_state["seleccion_tareas"] = set()
+        st.session_state["seleccion_version"] = 0
+
+    # Búsqueda por texto (índice de texto completo) y filtros, ambos en la base
+    busqueda = st.text_input("🔎 Buscar en títulos y descripciones", key="busqueda",
+                             placeholder="p. ej. informe cliente", on_change=reiniciar_paginacion)
+    terminos = " ".join(repositorio.terminos_busqueda(busqueda))
+
+    col_f1, col_f2, col_f3 = st.columns([2, 2, 1])
     with col_f1:
-        filtro_estado = st.selectbox("🔍 Filtrar por estado", ["Todas", "Pendientes", "Completadas"])
+        filtro_estado = st.selectbox("🔍 Filtrar por estado", ["Todas", "Pendientes", "Completadas"],
+                                     on_change=reiniciar_paginacion)
     with col_f2:
-        filtro_importancia = st.selectbox("🔍 Filtrar por importancia", ["Todas", "🔴 Alta", "🟡 Media", "🟢 Baja"])
-    
-    # Aplicar filtros
-    tareas_filtradas = tareas.copy()
-    
-    # Convertir completada a bool por seguridad
-    for t in tareas_filtradas:
-        t["completada"] = bool(t["completada"])
-
-    if filtro_estado == "Pendientes":
-        tareas_filtradas = [t for t in tareas_filtradas if not t["completada"]]
-    elif filtro_estado == "Completadas":
-        tareas_filtradas = [t for t in tareas_filtradas if t["completada"]]
-    
-    if filtro_importancia != "Todas":
-        tareas_filtradas = [t for t in tareas_filtradas if t["importancia"] == filtro_importancia]
+        filtro_importancia = st.selectbox("🔍 Filtrar por importancia", ["Todas", "🔴 Alta", "🟡 Media", "🟢 Baja"],
+                                          on_change=reiniciar_paginacion)
+    with col_f3:
+        modo_tabla = st.toggle("Modo tabla", key="modo_tabla", on_change=reiniciar_paginacion,
+                               help="Una sola grilla editable por página, para listas muy grandes")
+        if modo_tabla:
+            tamano_pagina = st.selectbox("Por página", TAMANOS_PAGINA_TABLA, key="tamano_pagina_tabla",
+                                         on_change=reiniciar_paginacion)
+        else:
+            tamano_pagina = st.selectbox("Por página", TAMANOS_PAGINA, key="tamano_pagina",
+                                         index=TAMANOS_PAGINA.index(TAMANO_PAGINA) if TAMANO_PAGINA in TAMANOS_PAGINA else 0,
+                                         on_change=reiniciar_paginacion)
+
+    if terminos:
+        tareas, hay_anterior, hay_siguiente = buscar_tareas(
+            terminos,
+            filtro_estado,
+            filtro_importancia,
+            st.session_state["busqueda_pagina"],
+            tamano_pagina,
+            origen_lectura(),
+            modo_tabla
+        )
+    else:
+        tareas, hay_anterior, hay_siguiente = cargar_pagina(
+            filtro_estado,
+            filtro_importancia,
+            st.session_state["pagina_ancla"],
+            st.session_state["pagina_direccion"],
+            tamano_pagina,
+            origen_lectura(),
+            modo_tabla
+        )
+    en_primera = st.session_state["pagina_ancla"] is None and st.session_state["busqueda_pagina"] == 0
+
+    # Modo diferido: la vista muestra ya los cambios que aún no llegan a la base
+    if escritura_diferida.ACTIVA:
+        cola = get_cola()
+        nuevas = [
+            t for t in (cola.creadas_pendientes() if en_primera and not terminos else [])
+            if (filtro_estado == "Todas" or t["completada"] == (filtro_estado == "Completadas"))
+            and (filtro_importancia == "Todas" or t["importancia"] == filtro_importancia)
+        ]
+        if modo_tabla:
+            import tabla_tareas
+
+            tareas = cola.superponer(tareas)
+            if nuevas:
+                tareas = tabla_tareas.unir(tabla_tareas.desde_registros(nuevas), tareas)
+        else:
+            tareas = nuevas + cola.superponer_registros(tareas)
+        if cola.pendientes():
+            st.caption(f"⏳ {cola.pendientes()} cambios pendientes de guardar")
+
+    # Si la página quedó vacía (p. ej. tras borrar su última tarea) se vuelve al inicio
+    if len(tareas) == 0 and not en_primera:
+        reiniciar_paginacion()
+        st.rerun()
+
+    st.fragment(mostrar_acciones_lote, key="acciones_lote")()
 
     st.divider()
 
-    if not tareas_filtradas:
-        st.info("📭 No hay tareas que coincidan con los filtros.")
+    if len(tareas) == 0:
+        if terminos:
+            st.info("📭 No hay tareas que coincidan con la búsqueda y los filtros.")
+        else:
+            st.info("📭 No hay tareas que coincidan con los filtros.")
     else:
-        for tarea in tareas_filtradas:
-            with st.container():
-                col1, col2, col3, col4 = st.columns([3, 2, 1, 1])
-
-                # Información de la tarea
-                with col1:
-                    if tarea["completada"]:
-                        estado = f"~~{tarea['titulo']}~~"
-                    else:
-                        estado = tarea["titulo"]
-
-                    st.subheader(estado)
-                    if tarea["descripcion"]:
-                        st.write(tarea["descripcion"])
-
-                # Info de estado
-                with col2:
-                    # fecha viene como date
-                    fecha_str = tarea["fecha"].strftime("%Y-%m-%d") if isinstance(tarea["fecha"], (datetime, date)) else str(tarea["fecha"])
-                    st.write(f"📅 **Fecha límite:** {fecha_str}")
-                    st.markdown(f" **Importancia:** {get_badge_html(tarea['importancia'])}", unsafe_allow_html=True)
-                    estado_emoji = "✅" if tarea['completada'] else "⏳"
-                    estado_texto = "Completada" if tarea['completada'] else "Pendiente"
-                    st.write(f"{estado_emoji} **Estado:** {estado_texto}")
-
-                # Completar / Reabrir
-                with col3:
-                    boton_texto = "↩️" if tarea["completada"] else "✅"
-                    if st.button(boton_texto, key=f"comp_{tarea['id']}", help="Cambiar estado"):
-                        nuevo_estado = not tarea["completada"]
-                        actualizar_estado_mysql(tarea["id"], nuevo_estado)
-                        st.rerun()
-
-                # Eliminar con confirmación
-                with col4:
-                    if f"confirm_delete_{tarea['id']}" not in st.session_state:
-                        st.session_state[f"confirm_delete_{tarea['id']}"] = False
-                    
-                    if not st.session_state[f"confirm_delete_{tarea['id']}"]:
-                        if st.button("🗑️", key=f"elim_{tarea['id']}", help="Eliminar tarea"):
-                            st.session_state[f"confirm_delete_{tarea['id']}"] = True
-                            st.rerun()
-                    else:
-                        col_si, col_no = st.columns(2)
-                        with col_si:
-                            if st.button("✓", key=f"conf_si_{tarea['id']}", help="Confirmar"):
-                                eliminar_tarea_mysql(tarea["id"])
-                                del st.session_state[f"confirm_delete_{tarea['id']}"]
-                                st.rerun()
-                        with col_no:
-                            if st.button("✗", key=f"conf_no_{tarea['id']}", help="Cancelar"):
-                                st.session_state[f"confirm_delete_{tarea['id']}"] = False
-                                st.rerun()
-
-                st.divider()
+        if modo_tabla:
+            st.fragment(mostrar_tabla_tareas, key="tabla_tareas")(tareas)
+        else:
+            for tarea in tareas:
+                # Cada fila es un fragmento: sus acciones la redibujan sólo a ella
+                st.fragment(mostrar_fila_tarea, key=f"fila_{tarea['id']}")(tarea)
+
+        # Navegación por páginas: keyset sobre (creada, id) en el listado y
+        # número de página en los resultados de búsqueda (van por relevancia)
+        def ir_a_pagina(ancla, direccion):
+            st.session_state["pagina_ancla"] = ancla
+            st.session_state["pagina_direccion"] = direccion
+
+        def ir_a_resultados(pagina):
+            st.session_state["busqueda_pagina"] = pagina
+
+        if terminos:
+            pagina = st.session_state["busqueda_pagina"]
+            anterior = {"on_click": ir_a_resultados, "args": (pagina - 1,)}
+            siguiente = {"on_click": ir_a_resultados, "args": (pagina + 1,)}
+        else:
+            anterior = {"on_click": ir_a_pagina, "args": (clave_pagina(tareas, 0), "ant")}
+            siguiente = {"on_click": ir_a_pagina, "args": (clave_pagina(tareas, -1), "sig")}
+        col_ant, col_sig = st.columns(2)
+        with col_ant:
+            st.button("⬅️ Anterior", key="pagina_anterior", disabled=not hay_anterior,
+                      width="stretch", **anterior)
+        with col_sig:
+            st.button("Siguiente ➡️", key="pagina_siguiente", disabled=not hay_siguiente,
+                      width="stretch", **siguiente)
 
 # ===================================
 # TAB 3 – Estadísticas
 # ===================================
 
-with tab3:
-    st.header(" Estadísticas y Análisis")
+# Opciones de agrupación de la línea de tiempo (None: según el rango de fechas)
+AGRUPACIONES = {"Automático": None, "Día": "dia", "Semana": "semana", "Mes": "mes", "Trimestre": "trimestre"}
+NOMBRES_PERIODO = {"dia": "día", "semana": "semana", "mes": "mes", "trimestre": "trimestre"}
+# Formato d3 de las fechas del eje y del tooltip según el periodo
+FORMATOS_PERIODO = {"dia": "%d/%m/%Y", "semana": "%d/%m/%Y", "mes": "%m/%Y", "trimestre": "T%q %Y"}
+
+
+def mostrar_estadisticas():
+    # Sólo esta pestaña dibuja gráficas: pandas y altair se importan al abrirla
+    import altair as alt
+    import pandas as pd
 
-    tareas = cargar_tareas_mysql()
-    # asegurar bool
-    for t in tareas:
-        t["completada"] = bool(t["completada"])
+    st.header(" Estadísticas y Análisis")
 
-    total = len(tareas)
-    completadas = sum(1 for t in tareas if t["completada"])
-    pendientes = total - completadas
+    resumen = cargar_resumen(origen_lectura())
+    total = resumen["total"]
+    completadas = resumen["completadas"]
+    pendientes = resumen["pendientes"]
 
     # KPIs principales
     col1, col2, col3, col4 = st.columns(4)
@@ -577,92 +953,102 @@ with tab3:
     st.divider()
 
     if total > 0:
-        # Preparar datos para visualizaciones
+        # Conteos agregados en la base para las visualizaciones
+        por_importancia = cargar_conteos(origen_lectura())
         col_viz1, col_viz2 = st.columns(2)
         
         with col_viz1:
             st.subheader("📊 Estado de Tareas")
             
-            # Gráfico de barras - Estado
-            df_estado = pd.DataFrame({
-                'Estado': ['Completadas', 'Pendientes'],
-                'Cantidad': [completadas, pendientes]
-            })
+            with metricas.medir("grafica", "estado"):
+                # Gráfico de barras - Estado
+                df_estado = pd.DataFrame({
+                    'Estado': ['Completadas', 'Pendientes'],
+                    'Cantidad': [completadas, pendientes]
+                })
             
-            chart_estado = alt.Chart(df_estado).mark_bar(cornerRadiusTopLeft=10, cornerRadiusTopRight=10).encode(
-                x=alt.X('Estado:N', axis=alt.Axis(labelAngle=0, labelFontSize=12)),
-                y=alt.Y('Cantidad:Q', title='Número de Tareas'),
-                color=alt.Color('Estado:N', 
-                    scale=alt.Scale(domain=['Completadas', 'Pendientes'], 
-                                  range=['#43a047', '#ffa726']),
-                    legend=None),
-                tooltip=['Estado', 'Cantidad']
-            ).properties(
-                height=300
-            ).configure_view(
-                strokeWidth=0
-            ).configure_axis(
-                labelColor='#b0bec5',
-                titleColor='#00d4ff',
-                gridColor='rgba(255,255,255,0.1)'
-            )
+                chart_estado = alt.Chart(df_estado).mark_bar(cornerRadiusTopLeft=10, cornerRadiusTopRight=10).encode(
+                    x=alt.X('Estado:N', axis=alt.Axis(labelAngle=0, labelFontSize=12)),
+                    y=alt.Y('Cantidad:Q', title='Número de Tareas'),
+                    color=alt.Color('Estado:N', 
+                        scale=alt.Scale(domain=['Completadas', 'Pendientes'], 
+                                      range=['#43a047', '#ffa726']),
+                        legend=None),
+                    tooltip=['Estado', 'Cantidad']
+                ).properties(
+                    height=300
+                ).configure_view(
+                    strokeWidth=0
+                ).configure_axis(
+                    labelColor='#b0bec5',
+                    titleColor='#00d4ff',
+                    gridColor='rgba(255,255,255,0.1)'
+                )
             
-            st.altair_chart(chart_estado, use_container_width=True)
+                st.altair_chart(chart_estado, width="stretch")
         
         with col_viz2:
             st.subheader(" Distribución por Importancia")
             
-            # Gráfico circular - Importancia
-            importancia_count = {}
-            for t in tareas:
-                imp = t['importancia']
-                importancia_count[imp] = importancia_count.get(imp, 0) + 1
+            with metricas.medir("grafica", "importancia"):
+                # Gráfico circular - Importancia
+                df_importancia = pd.DataFrame({
+                    'Importancia': [c['importancia'] for c in por_importancia],
+                    'Cantidad': [c['cantidad'] for c in por_importancia]
+                })
             
-            df_importancia = pd.DataFrame({
-                'Importancia': list(importancia_count.keys()),
-                'Cantidad': list(importancia_count.values())
-            })
+                chart_pie = alt.Chart(df_importancia).mark_arc(innerRadius=50).encode(
+                    theta=alt.Theta('Cantidad:Q'),
+                    color=alt.Color('Importancia:N', 
+                        scale=alt.Scale(domain=['🟢 Baja', '🟡 Media', '🔴 Alta'],
+                                      range=['#43a047', '#ffa726', '#ff1744'])),
+                    tooltip=['Importancia', 'Cantidad']
+                ).properties(
+                    height=300
+                )
             
-            chart_pie = alt.Chart(df_importancia).mark_arc(innerRadius=50).encode(
-                theta=alt.Theta('Cantidad:Q'),
-                color=alt.Color('Importancia:N', 
-                    scale=alt.Scale(domain=['🟢 Baja', '🟡 Media', '🔴 Alta'],
-                                  range=['#43a047', '#ffa726', '#ff1744'])),
-                tooltip=['Importancia', 'Cantidad']
-            ).properties(
-                height=300
-            )
-            
-            st.altair_chart(chart_pie, use_container_width=True)
+                st.altair_chart(chart_pie, width="stretch")
         
         st.divider()
         
         # Gráfico de línea temporal
         st.subheader("📈 Tareas por Fecha Límite")
+
+        pedida = st.selectbox("Agrupar por", list(AGRUPACIONES), key="linea_agrupacion")
+        linea = cargar_linea_tiempo(AGRUPACIONES[pedida], origen_lectura())
+        granularidad = linea["granularidad"]
+        if AGRUPACIONES[pedida] not in (None, granularidad):
+            st.caption(f"Demasiados puntos para agrupar por {pedida.lower()}: se agrupó por "
+                       f"{NOMBRES_PERIODO[granularidad]}.")
+        if linea["recortada"]:
+            st.caption(f"Se muestran los últimos {len(linea['puntos'])} periodos.")
+
+        with metricas.medir("grafica", "linea_tiempo") as m:
+            df_fechas_agrupadas = pd.DataFrame(linea["puntos"], columns=['fecha', 'cantidad'])
+            df_fechas_agrupadas['fecha'] = pd.to_datetime(df_fechas_agrupadas['fecha'])
+            m.filas = len(df_fechas_agrupadas)
+            formato = FORMATOS_PERIODO[granularidad]
+
+            chart_timeline = alt.Chart(df_fechas_agrupadas).mark_line(
+                point=alt.OverlayMarkDef(filled=True, size=100),
+                strokeWidth=3
+            ).encode(
+                x=alt.X('fecha:T', title='Fecha', axis=alt.Axis(labelAngle=-45, format=formato)),
+                y=alt.Y('cantidad:Q', title='Número de Tareas'),
+                color=alt.value('#00d4ff'),
+                tooltip=[alt.Tooltip('fecha:T', title=NOMBRES_PERIODO[granularidad].capitalize(), format=formato),
+                         alt.Tooltip('cantidad:Q', title='Tareas')]
+            ).properties(
+                height=300
+            ).configure_view(
+                strokeWidth=0
+            ).configure_axis(
+                labelColor='#b0bec5',
+                titleColor='#00d4ff',
+                gridColor='rgba(255,255,255,0.1)'
+            )
         
-        df_fechas = pd.DataFrame(tareas)
-        df_fechas['fecha'] = pd.to_datetime(df_fechas['fecha'])
-        df_fechas_agrupadas = df_fechas.groupby('fecha').size().reset_index(name='cantidad')
-        
-        chart_timeline = alt.Chart(df_fechas_agrupadas).mark_line(
-            point=alt.OverlayMarkDef(filled=True, size=100),
-            strokeWidth=3
-        ).encode(
-            x=alt.X('fecha:T', title='Fecha', axis=alt.Axis(labelAngle=-45)),
-            y=alt.Y('cantidad:Q', title='Número de Tareas'),
-            color=alt.value('#00d4ff'),
-            tooltip=[alt.Tooltip('fecha:T', title='Fecha'), alt.Tooltip('cantidad:Q', title='Tareas')]
-        ).properties(
-            height=300
-        ).configure_view(
-            strokeWidth=0
-        ).configure_axis(
-            labelColor='#b0bec5',
-            titleColor='#00d4ff',
-            gridColor='rgba(255,255,255,0.1)'
-        )
-        
-        st.altair_chart(chart_timeline, use_container_width=True)
+            st.altair_chart(chart_timeline, width="stretch")
         
     else:
         st.info(" No hay datos suficientes para mostrar estadísticas. ¡Crea tu primera tarea!")
@@ -671,10 +1057,99 @@ with tab3:
 # TAB 4 – Conexión EC2 B (placeholder)
 # ===================================
 
-with tab4:  
+def mostrar_conexion_ec2():
     st.header(" Conexión desde Instancia EC2 - Prueba B")
     st.markdown("**Aquí podemos poner información sobre la conexión desde la instancia EC2 secundaria o pruebas adicionales.**")
 
+# ===================================
+# Trabajos del sidebar
+# ===================================
+
+def mostrar_resultado(trabajo):
+    """Mensaje final de un respaldo o una restauración."""
+    hora = datetime.fromtimestamp(trabajo.fin).strftime("%H:%M:%S")
+    r = trabajo.resultado
+    if trabajo.estado == trabajos.FALLIDO:
+        st.error(f"{trabajo.descripcion} falló ({hora}): {trabajo.error}")
+    elif trabajo.estado == trabajos.CANCELADO:
+        conservados = " Los lotes ya aplicados se conservan." if trabajo.clave == "restauracion" else ""
+        st.warning(f"Cancelado tras {trabajo.hechos} tareas ({hora}): {trabajo.descripcion}.{conservados}")
+    elif trabajo.clave == "respaldo":
+        if r["key"] is None:
+            st.info(f"No hay cambios desde el último respaldo ({hora})")
+        else:
+            tipo = "completo" if r["tipo"] == "base" else "incremental"
+            st.success(f"Respaldo {tipo} guardado correctamente ({r['tareas']} tareas, "
+                       f"{r['bytes'] / 1024:.1f} KiB, {trabajo.segundos:.1f} s, {hora})")
+    elif r is None:
+        st.info(f"No se encontraron tareas para restaurar ({hora}).")
+    else:
+        for error in r["errores"]:
+            st.error(f"Error restaurando tareas: {error}")
+        st.success(
+            f"Tareas restauradas ({hora}): {r['insertadas']} nuevas, {r['actualizadas']} actualizadas, "
+            f"{r['eliminadas']} eliminadas, {r['rechazadas']} rechazadas"
+        )
+
+
+def mostrar_trabajos():
+    """Progreso de los trabajos activos (con cancelación) y el último resultado de cada tipo."""
+    registro = get_registro()
+    activos = registro.activos()
+    for trabajo in activos:
+        if trabajo.cancelado:
+            texto = f"{trabajo.descripcion}: cancelando..."
+        elif trabajo.estado == trabajos.EN_COLA:
+            texto = f"{trabajo.descripcion}: en cola"
+        else:
+            texto = (f"{trabajo.descripcion}: {trabajo.hechos} de {trabajo.total if trabajo.total else '?'} "
+                     f"tareas · {trabajo.velocidad:.0f} tareas/s")
+        st.progress(trabajo.fraccion or 0.0, text=texto)
+        if st.button("Cancelar", key=f"cancelar_{trabajo.id}", disabled=trabajo.cancelado,
+                     width="stretch"):
+            trabajo.cancelar()
+
+    mostrados = {t.clave for t in activos}
+    for trabajo in registro.terminados():
+        if trabajo.clave not in mostrados:
+            mostrados.add(trabajo.clave)
+            mostrar_resultado(trabajo)
+
+    # El último trabajo terminó: un rerun completo refresca las vistas y deja de sondear
+    if st.session_state.get("trabajos_activos") and not activos:
+        st.session_state["trabajos_activos"] = False
+        st.rerun()
+
+# ===================================
+# KPIs del sidebar
+# ===================================
+
+@st.fragment(key="kpis")
+def mostrar_kpis():
+    """Métricas rápidas del sidebar; las acciones de una fila lo refrescan."""
+    resumen_sidebar = cargar_resumen(origen_lectura())
+    st.metric("Total de tareas", resumen_sidebar["total"])
+    st.metric("Tareas activas", resumen_sidebar["pendientes"])
+
+# ============================
+#  TABS PRINCIPALES
+# ============================
+
+VISTAS = {
+    "Descipcion proyecto": mostrar_descripcion,
+    "➕ Nueva Tarea": mostrar_nueva_tarea,
+    "📋 Todas las Tareas": mostrar_tareas,
+    "📊 Estadísticas": mostrar_estadisticas,
+    " 🖥️ Conexion instancia EC2 B": mostrar_conexion_ec2,
+}
+
+# Tabs con estado: sólo la pestaña abierta ejecuta sus consultas y gráficas
+tabs = st.tabs(list(VISTAS), key="tab_activa", on_change="rerun")
+for tab, (etiqueta, mostrar) in zip(tabs, VISTAS.items()):
+    if tab.open:
+        with tab, metricas.medir("pestana", etiqueta.strip()):
+            mostrar()
+
 # ===================================
 # SIDEBAR
 # ===================================
@@ -682,59 +1157,82 @@ with tab4:
 with st.sidebar:
     st.header(" Conexión y Respaldo AWS")
 
-    if st.button(" Probar conexión S3", use_container_width=True):
-        r = probar_conexion()
+    # Backend de tareas (ALMACENAMIENTO) y destino de respaldos (RESPALDO_DESTINO)
+    base = get_almacenamiento().nombre
+    destino = respaldo.get_destino().nombre
+
+    if st.button(f" Probar conexión {destino}", width="stretch"):
+        r = respaldo.probar_conexion()
         if r is True:
-            st.success(" Conectado correctamente a S3")
+            st.success(f" Conectado correctamente a {destino}")
         else:
             st.error(f" Error: {r}")
 
     st.divider()
 
-    # Botones de backup / restore entre MySQL y S3
+    # Botones de backup / restore entre la base y el destino: cada uno lanza un
+    # trabajo en segundo plano; la sesión sigue usable mientras corre
     st.subheader(" Respaldo de Tareas")
+    registro = get_registro()
 
-    if st.button("Respaldar tareas en S3", use_container_width=True):
-        tareas_mysql = cargar_tareas_mysql()
-        guardar_tareas_s3(tareas_mysql)
-        st.success("Respaldo guardado en S3 correctamente")
-
-    if st.button("Restaurar desde S3 a MySQL", use_container_width=True):
-        tareas_s3 = cargar_tareas_s3()
-        if tareas_s3:
-            for t in tareas_s3:
-                try:
-                    # Normalizar campos
-                    tarea_restore = {
-                        "id": t.get("id", str(uuid.uuid4())),
-                        "titulo": t.get("titulo", "Sin título"),
-                        "descripcion": t.get("descripcion", ""),
-                        "fecha": datetime.fromisoformat(t["fecha"]).date() if isinstance(t.get("fecha"), str) else date.today(),
-                        "importancia": t.get("importancia", "🟢 Baja"),
-                        "completada": bool(t.get("completada", False)),
-                        "creada": datetime.fromisoformat(t["creada"]) if isinstance(t.get("creada"), str) else datetime.now()
-                    }
-                    guardar_tarea_mysql(tarea_restore)
-                except Exception as e:
-                    st.error(f"Error restaurando una tarea: {e}")
-            st.success("Tareas restauradas desde S3 hacia MySQL")
-        else:
-            st.info("No se encontraron tareas en S3 para restaurar.")
+    def lanzar(clave, descripcion, funcion):
+        trabajo, nuevo = registro.lanzar(clave, descripcion, funcion)
+        if not nuevo:
+            st.warning(f"Ya hay un trabajo en curso: {trabajo.descripcion}")
 
-    st.divider()
+    respaldando = registro.activo("respaldo") is not None
+    if st.button(f"Respaldar tareas en {destino}", width="stretch", disabled=respaldando):
+        lanzar("respaldo", f"Respaldo completo en {destino}", trabajo_respaldo(respaldo.respaldar_tareas))
 
-    # Métricas rápidas desde MySQL
-    tareas_sidebar = cargar_tareas_mysql()
-    for t in tareas_sidebar:
-        t["completada"] = bool(t["completada"])
+    if st.button(f"Respaldo incremental en {destino}", width="stretch", disabled=respaldando,
+                 help="Sube sólo las tareas creadas, modificadas o eliminadas desde el último respaldo"):
+        lanzar("respaldo", f"Respaldo incremental en {destino}", trabajo_respaldo(respaldo.respaldar_incremental))
 
-    if tareas_sidebar:
-        st.metric("Total de tareas", len(tareas_sidebar))
-        st.metric("Tareas activas", sum(1 for t in tareas_sidebar if not t["completada"]))
-    else:
-        st.metric("Total de tareas", 0)
-        st.metric("Tareas activas", 0)
+    # Punto de restauración: la base o cualquiera de sus deltas
+    try:
+        puntos = respaldo.puntos_restauracion(cargar_manifiesto())
+    except Exception:
+        puntos = []
+    punto = None
+    if len(puntos) > 1:
+        opciones = ["Último respaldo"] + puntos[::-1]
+        eleccion = st.selectbox(
+            "Restaurar hasta", opciones,
+            help="El último respaldo se fusiona con las tareas actuales. Un punto anterior deja la "
+                 "tabla como estaba entonces: borra las tareas creadas después y deshace sus cambios."
+        )
+        punto = None if eleccion == opciones[0] else eleccion
+
+    if st.button(f"Restaurar desde {destino} a {base}", width="stretch",
+                 disabled=registro.activo("restauracion") is not None):
+        lanzar("restauracion", f"Restauración desde {destino} a {base}", trabajo_restauracion(punto))
+
+    # Sólo se refresca solo mientras hay trabajos activos
+    hay_activos = bool(registro.activos())
+    st.session_state["trabajos_activos"] = hay_activos
+    st.fragment(mostrar_trabajos, key="trabajos", run_every=REFRESCO_TRABAJOS if hay_activos else None)()
+
+    st.divider()
+
+    # Métricas rápidas desde la base (fragmento: las filas lo refrescan al cambiar)
+    mostrar_kpis()
     
     st.divider()
     st.caption(" Universidad Autónoma de Occidente")
     st.caption(" Proyecto AWS 2025")
+
+# ===================================
+# DIAGNÓSTICO (METRICAS=1)
+# ===================================
+
+resumen_rerun = metricas.terminar_rerun(get_sesion_id())
+if resumen_rerun:
+    with st.sidebar.expander("🩺 Diagnóstico del rerun"):
+        st.caption(f"Rerun completo: {resumen_rerun['rerun_ms']:.1f} ms")
+        st.dataframe(
+            resumen_rerun["operaciones"],
+            hide_index=True,
+            width="stretch"
+        )
+        st.download_button("Métricas del proceso (Prometheus)", metricas.texto_prometheus(),
+                           file_name="metrics.txt", mime="text/plain", width="stretch")
@@ -0,0 +1,155 @@
+"""Arranque en frío y costo fijo por rerun de app.py, sin red.
+
+Cada arranque corre en un proceso nuevo (como una instancia recién creada
+por Auto Scaling): se mide el tiempo total del proceso, la importación de
+Streamlit, el primer rerun de la app (que importa sus módulos) y luego la
+mediana de varios reruns sin interacción, que es el costo fijo que paga
+cada clic. También se informa qué dependencias pesadas quedaron cargadas.
+La base es SQLite con tareas sintéticas y los respaldos van a un
+directorio local.
+
+Uso, desde la raíz del repositorio:
+
+    python -m benchmarks.arranque --arranques 5 --reruns 30 --salida arranque.json
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+
+# Dependencias cuyo costo de importación interesa seguir
+PESADAS = ["pandas", "altair", "boto3", "mysql.connector", "pyarrow"]
+
+
+# ============================
+#  PROCESO HIJO (UN ARRANQUE)
+# ============================
+
+def _arranque(reruns, pestana):
+    """Mide un arranque en este proceso y retorna sus tiempos en ms."""
+    inicio = time.perf_counter()
+    from streamlit.testing.v1 import AppTest
+    importar = time.perf_counter() - inicio
+
+    at = AppTest.from_file(APP, default_timeout=60)
+    at.session_state["tab_activa"] = pestana
+    inicio = time.perf_counter()
+    at.run()
+    primero = time.perf_counter() - inicio
+    if at.exception:
+        raise SystemExit(f"La app falló en el primer rerun: {at.exception[0].value}")
+    cargadas = [m for m in PESADAS if m in sys.modules]
+
+    tiempos = []
+    for _ in range(reruns):
+        at.session_state["tab_activa"] = pestana
+        inicio = time.perf_counter()
+        at.run()
+        tiempos.append(time.perf_counter() - inicio)
+
+    return {
+        "importar_streamlit_ms": importar * 1000,
+        "primer_rerun_ms": primero * 1000,
+        "rerun_p50_ms": statistics.median(tiempos) * 1000 if tiempos else None,
+        "elementos": len(at.main) + len(at.sidebar),
+        "pesadas_cargadas": cargadas,
+    }
+
+
+# ============================
+#  PROCESO PADRE
+# ============================
+
+def _preparar_base(directorio, tareas):
+    """Crea una base SQLite con `tareas` tareas sintéticas para los hijos."""
+    import almacenamiento
+    from benchmarks.datos_sinteticos import cargar_tareas
+
+    ruta = os.path.join(directorio, "tareas.db")
+    alm = almacenamiento.AlmacenamientoSQLite(ruta)
+    almacenamiento.usar_almacenamiento(alm)
+    try:
+        cargar_tareas(tareas)
+    finally:
+        alm.cerrar()
+    return ruta
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--arranques", type=int, default=5, help="procesos nuevos a medir")
+    parser.add_argument("--reruns", type=int, default=30, help="reruns sin interacción por arranque")
+    parser.add_argument("--tareas", type=int, default=1000)
+    parser.add_argument("--pestana", default="Descipcion proyecto", help="pestaña abierta al arrancar")
+    parser.add_argument("--salida", help="archivo JSON de resultados (por defecto, stdout)")
+    parser.add_argument("--hijo", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.hijo:
+        print(json.dumps(_arranque(args.reruns, args.pestana)))
+        return
+
+    directorio = tempfile.mkdtemp(prefix="benchmark-arranque-")
+    try:
+        entorno = dict(
+            os.environ,
+            ALMACENAMIENTO="sqlite",
+            SQLITE_RUTA=_preparar_base(directorio, args.tareas),
+            RESPALDO_DESTINO="local",
+            RESPALDO_DIR=os.path.join(directorio, "respaldos"),
+        )
+        comando = [sys.executable, "-m", "benchmarks.arranque", "--hijo",
+                   "--reruns", str(args.reruns), "--pestana", args.pestana]
+        corridas = []
+        for i in range(args.arranques):
+            print(f"Arranque {i + 1} de {args.arranques}...", file=sys.stderr)
+            inicio = time.perf_counter()
+            salida = subprocess.run(comando, env=entorno, capture_output=True, text=True,
+                                    cwd=os.path.dirname(APP), check=True).stdout
+            corrida = json.loads(salida.strip().splitlines()[-1])
+            corrida["proceso_ms"] = (time.perf_counter() - inicio) * 1000
+            corridas.append(corrida)
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+
+    def mediana(clave):
+        return statistics.median(c[clave] for c in corridas)
+
+    informe = {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "tareas": args.tareas,
+        "pestana": args.pestana,
+        "proceso_ms": mediana("proceso_ms"),
+        "importar_streamlit_ms": mediana("importar_streamlit_ms"),
+        "primer_rerun_ms": mediana("primer_rerun_ms"),
+        "rerun_p50_ms": mediana("rerun_p50_ms"),
+        "pesadas_cargadas": corridas[-1]["pesadas_cargadas"],
+        "corridas": corridas,
+    }
+    texto = json.dumps(informe, indent=2, ensure_ascii=False)
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            f.write(texto + "\n")
+    else:
+        print(texto)
+    print(
+        f"proceso {informe['proceso_ms']:.0f} ms | streamlit {informe['importar_streamlit_ms']:.0f} ms | "
+        f"primer rerun {informe['primer_rerun_ms']:.0f} ms | rerun p50 {informe['rerun_p50_ms']:.1f} ms | "
+        f"cargadas: {', '.join(informe['pesadas_cargadas']) or '-'}",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
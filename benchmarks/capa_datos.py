@@ -0,0 +1,267 @@
+"""Benchmark de la capa de datos, sin red.
+
+Carga tareas sintéticas en un backend local (SQLite en archivo o en memoria),
+mide paginación, filtros, estadísticas, escrituras y el par respaldo /
+restauración contra un destino local (directorio o S3 simulado con moto), y
+escribe los resultados en JSON para comparar corridas.
+
+Uso, desde la raíz del repositorio:
+
+    python -m benchmarks.capa_datos --tamanos 1000,10000,100000 --salida base.json
+"""
+import argparse
+import json
+import math
+import pickle
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import ExitStack
+from datetime import datetime
+
+import almacenamiento
+import estadisticas
+import repositorio
+import respaldo
+import tabla_tareas
+from benchmarks.datos_sinteticos import cargar_tareas
+
+
+# ============================
+#  MEDICIÓN
+# ============================
+
+def percentil(muestras, p):
+    """Percentil `p` (0-100) por rango más cercano de una lista ordenada."""
+    if not muestras:
+        return None
+    indice = max(0, min(len(muestras) - 1, math.ceil(p * len(muestras) / 100) - 1))
+    return muestras[indice]
+
+
+def medir(nombre, funcion, repeticiones, filas=None, preparar=None):
+    """Ejecuta `funcion` `repeticiones` veces y una más bajo tracemalloc.
+
+    `preparar`, si se da, se llama antes de cada ejecución fuera del tiempo
+    medido y su resultado se pasa a `funcion`. `filas` es cuántas filas
+    procesa cada ejecución, para reportar filas por segundo.
+    """
+    def una_vez():
+        argumento = preparar() if preparar else None
+        inicio = time.perf_counter()
+        funcion(argumento) if preparar else funcion()
+        return time.perf_counter() - inicio
+
+    tiempos = sorted(una_vez() for _ in range(repeticiones))
+
+    # La memoria se mide aparte: tracemalloc distorsiona los tiempos
+    tracemalloc.start()
+    try:
+        una_vez()
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    total = sum(tiempos)
+    resultado = {
+        "operacion": nombre,
+        "repeticiones": repeticiones,
+        "p50_ms": percentil(tiempos, 50) * 1000,
+        "p90_ms": percentil(tiempos, 90) * 1000,
+        "p99_ms": percentil(tiempos, 99) * 1000,
+        "max_ms": tiempos[-1] * 1000,
+        "ops_s": repeticiones / total if total else None,
+        "memoria_pico_kib": pico / 1024,
+    }
+    if filas is not None:
+        resultado["filas_s"] = filas * repeticiones / total if total else None
+    return resultado
+
+
+# ============================
+#  ESCENARIOS
+# ============================
+
+def _nuevo_almacenamiento(backend, directorio):
+    if backend == "memoria":
+        return almacenamiento.AlmacenamientoMemoria()
+    ruta = tempfile.mktemp(suffix=".db", dir=directorio)
+    return almacenamiento.AlmacenamientoSQLite(ruta)
+
+
+def _nuevo_destino(destino, pila, directorio):
+    if destino == "local":
+        return respaldo.DestinoLocal(tempfile.mkdtemp(dir=directorio))
+    try:
+        import boto3
+        from moto import mock_aws
+    except ImportError:
+        sys.exit("--destino moto requiere el paquete moto (pip install moto)")
+    pila.enter_context(mock_aws())
+    s3 = boto3.client("s3", region_name="us-east-1")
+    s3.create_bucket(Bucket="benchmark-respaldos")
+    return respaldo.DestinoS3(s3, "benchmark-respaldos")
+
+
+def _ancla_en(alm, posicion):
+    """Clave (creada, id) de la fila en `posicion` del orden de paginación."""
+    fila = alm.consultar(
+        "SELECT creada, id FROM tareas ORDER BY creada DESC, id DESC LIMIT 1 OFFSET %s", (posicion,)
+    )[0]
+    return fila["creada"], fila["id"]
+
+
+def correr_tamano(tamano, args, directorio):
+    """Mide todas las operaciones sobre una base recién cargada con `tamano` tareas."""
+    resultados = []
+    with ExitStack() as pila:
+        alm = _nuevo_almacenamiento(args.backend, directorio)
+        pila.callback(alm.cerrar)
+        almacenamiento.usar_almacenamiento(alm)
+        destino = _nuevo_destino(args.destino, pila, directorio)
+
+        inicio = time.perf_counter()
+        cargar_tareas(tamano, semilla=args.semilla)
+        carga = time.perf_counter() - inicio
+        resultados.append({"operacion": "carga", "repeticiones": 1, "max_ms": carga * 1000,
+                           "filas_s": tamano / carga})
+
+        r = args.repeticiones
+        limite = args.tamano_pagina
+        medio = _ancla_en(alm, min(tamano - 1, tamano // 2))
+        una_id = medio[1]
+
+        resultados += [
+            medir("pagina_primera", lambda: repositorio.cargar_pagina("Todas", "Todas", None, None, limite),
+                  r, filas=limite),
+            medir("pagina_intermedia", lambda: repositorio.cargar_pagina("Todas", "Todas", medio, "sig", limite),
+                  r, filas=limite),
+            medir("pagina_filtrada",
+                  lambda: repositorio.cargar_pagina("Pendientes", "🔴 Alta", None, None, limite),
+                  r, filas=limite),
+            medir("pagina_filtrada_anterior",
+                  lambda: repositorio.cargar_pagina("Completadas", "🟢 Baja", medio, "ant", limite),
+                  r, filas=limite),
+            medir("resumen", estadisticas.resumen_tareas, r, filas=tamano),
+            medir("conteo_por_importancia", estadisticas.conteo_por_importancia, r, filas=tamano),
+            medir("linea_tiempo_auto", estadisticas.linea_tiempo, r, filas=tamano),
+            medir("linea_tiempo_dia", lambda: estadisticas.linea_tiempo("dia"), r, filas=tamano),
+            medir("busqueda_prefijo", lambda: repositorio.buscar_tareas("revis inform", limite=limite),
+                  r, filas=limite),
+            medir("busqueda_filtrada",
+                  lambda: repositorio.buscar_tareas("cliente", "Pendientes", "🔴 Alta", limite=limite),
+                  r, filas=limite),
+        ]
+
+        estado = [False]
+
+        def alternar():
+            estado[0] = not estado[0]
+            repositorio.actualizar_estado(una_id, estado[0])
+
+        resultados.append(medir("actualizar_estado", alternar, r))
+
+        lentas = max(1, r // 10)
+        resultados.append(medir(
+            "respaldo_completo", lambda: respaldo.respaldar_tareas(destino), lentas, filas=tamano
+        ))
+
+        def base_vacia():
+            vacia = _nuevo_almacenamiento(args.backend, directorio)
+            almacenamiento.usar_almacenamiento(vacia)
+            return vacia
+
+        def restaurar(vacia):
+            total, tareas = respaldo.abrir_respaldo(destino)
+            try:
+                respaldo.restaurar_tareas(tareas, total=total)
+            finally:
+                vacia.cerrar()
+
+        resultados.append(medir("restauracion", restaurar, lentas, filas=tamano, preparar=base_vacia))
+        almacenamiento.usar_almacenamiento(alm)
+
+        # Tareas en memoria: lista de dicts frente a la tabla columnar. El
+        # tamaño serializado es lo que st.cache_data guarda por entrada.
+        tareas = list(repositorio.iterar_tareas())
+        tabla = tabla_tareas.desde_registros(tareas)
+        resultados += [
+            medir("tabla_desde_registros", lambda: tabla_tareas.desde_registros(tareas), lentas, filas=tamano),
+            medir("filtrar_registros",
+                  lambda: [t for t in tareas if not t["completada"] and t["importancia"] == "🔴 Alta"],
+                  r, filas=tamano),
+            medir("filtrar_tabla", lambda: tabla_tareas.filtrar(tabla, "Pendientes", "🔴 Alta"), r, filas=tamano),
+            medir("contar_registros", lambda: Counter(t["importancia"] for t in tareas), r, filas=tamano),
+            medir("contar_tabla", lambda: tabla["importancia"].value_counts(sort=False), r, filas=tamano),
+            {"operacion": "cache_registros", "bytes_por_tarea": len(pickle.dumps(tareas)) / tamano},
+            {"operacion": "cache_tabla", "bytes_por_tarea": len(pickle.dumps(tabla)) / tamano},
+        ]
+
+    for resultado in resultados:
+        resultado["tamano"] = tamano
+    return resultados
+
+
+def _resumen_texto(resultados):
+    lineas = [f"{'tamaño':>9} {'operación':<26} {'p50 ms':>10} {'p99 ms':>10} {'ops/s':>10} {'filas/s':>12} {'KiB':>10} {'B/tarea':>8}"]
+    for r in resultados:
+        def celda(clave, ancho, formato="{:.2f}"):
+            valor = r.get(clave)
+            return (formato.format(valor) if valor is not None else "-").rjust(ancho)
+        lineas.append(
+            f"{r['tamano']:>9} {r['operacion']:<26} {celda('p50_ms', 10)} {celda('p99_ms', 10)} "
+            f"{celda('ops_s', 10, '{:.1f}')} {celda('filas_s', 12, '{:.0f}')} {celda('memoria_pico_kib', 10, '{:.0f}')} "
+            f"{celda('bytes_por_tarea', 8, '{:.0f}')}"
+        )
+    return "\n".join(lineas)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tamanos", default="1000,10000,100000",
+                        help="cantidades de tareas separadas por coma (hasta 1000000)")
+    parser.add_argument("--backend", choices=["sqlite", "memoria"], default="sqlite")
+    parser.add_argument("--destino", choices=["local", "moto"], default="local",
+                        help="directorio temporal o S3 simulado en proceso")
+    parser.add_argument("--repeticiones", type=int, default=50)
+    parser.add_argument("--tamano-pagina", type=int, default=25)
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--salida", help="archivo JSON de resultados (por defecto, stdout)")
+    args = parser.parse_args(argv)
+
+    tamanos = [int(t) for t in args.tamanos.split(",")]
+    directorio = tempfile.mkdtemp(prefix="benchmark-tareas-")
+    try:
+        resultados = []
+        for tamano in tamanos:
+            print(f"Midiendo {tamano} tareas...", file=sys.stderr)
+            resultados += correr_tamano(tamano, args, directorio)
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+
+    informe = {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "backend": args.backend,
+        "destino": args.destino,
+        "repeticiones": args.repeticiones,
+        "tamano_pagina": args.tamano_pagina,
+        "semilla": args.semilla,
+        "resultados": resultados,
+    }
+    texto = json.dumps(informe, indent=2, ensure_ascii=False)
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            f.write(texto + "\n")
+    else:
+        print(texto)
+    print(_resumen_texto(resultados), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,366 @@
+"""Prueba de carga con varias sesiones concurrentes de app.py, sin red.
+
+Cada sesión simulada (AppTest de Streamlit, en su propio hilo) recorre el
+flujo típico: abrir, crear una tarea, listar, filtrar, completar, eliminar,
+ver estadísticas y respaldar. Todo corre contra SQLite y un directorio de
+respaldos locales. Por cada cantidad de sesiones se reporta la latencia de
+cada rerun, las consultas y préstamos de conexión por interacción y la
+memoria por sesión, en JSON.
+
+AppTest no admite ejecuciones simultáneas en un proceso, así que los reruns
+de las sesiones se turnan con un lock: la latencia reportada es la espera
+en cola más el tiempo de ejecución, como en un proceso limitado por el GIL.
+
+Uso, desde la raíz del repositorio:
+
+    python -m benchmarks.carga_sesiones --sesiones 1,4,16 --tareas 10000 --salida carga.json
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from streamlit.testing.v1 import AppTest
+
+import almacenamiento
+import respaldo
+import trabajos
+from benchmarks.capa_datos import percentil
+from benchmarks.datos_sinteticos import cargar_tareas
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+
+TAB_INICIO = "Descipcion proyecto"
+TAB_NUEVA = "➕ Nueva Tarea"
+TAB_TAREAS = "📋 Todas las Tareas"
+TAB_ESTADISTICAS = "📊 Estadísticas"
+
+# Un solo rerun de AppTest a la vez en el proceso
+_turno = threading.Lock()
+
+
+# ============================
+#  CONTEO DE CONSULTAS POR SESIÓN
+# ============================
+
+class AlmacenamientoContado(almacenamiento.AlmacenamientoEnvuelto):
+    """Envuelve un backend y cuenta sentencias y préstamos de conexión por sesión.
+
+    La sesión se identifica por el `sesion_id` que la app guarda en
+    session_state; lo que corre fuera de un script (hilos de fondo) se
+    cuenta como "fondo". Con MySQL cada préstamo es un obtener() del pool.
+    """
+
+    def __init__(self, interno):
+        super().__init__(interno)
+        self._conteos = defaultdict(lambda: {"consultas": 0, "conexiones": 0})
+        self._lock = threading.Lock()
+
+    def _sesion(self):
+        ctx = get_script_run_ctx(suppress_warning=True)
+        if ctx is None:
+            return "fondo"
+        try:
+            return ctx.session_state["sesion_id"]
+        except KeyError:
+            return "sin_sesion"
+
+    def _contar(self, consultas=0, conexiones=0):
+        sesion = self._sesion()
+        with self._lock:
+            conteo = self._conteos[sesion]
+            conteo["consultas"] += consultas
+            conteo["conexiones"] += conexiones
+
+    def conteo(self, sesion):
+        with self._lock:
+            return dict(self._conteos[sesion])
+
+    def consultar(self, sql, params=(), preparada=False):
+        self._contar(1, 1)
+        return self._interno.consultar(sql, params, preparada)
+
+    def valor(self, sql, params=(), preparada=False):
+        self._contar(1, 1)
+        return self._interno.valor(sql, params, preparada)
+
+    @contextmanager
+    def transaccion(self):
+        self._contar(conexiones=1)
+        with self._interno.transaccion() as tx:
+            yield _TransaccionContada(self, tx)
+
+    def iterar(self, sql, params=(), tamano=almacenamiento.LOTE_LECTURA):
+        self._contar(1, 1)
+        return self._interno.iterar(sql, params, tamano)
+
+    def ahora(self):
+        self._contar(1, 1)
+        return self._interno.ahora()
+
+
+class _TransaccionContada:
+    def __init__(self, contado, tx):
+        self._contado = contado
+        self._tx = tx
+
+    def ejecutar(self, sql, params=(), preparada=False):
+        self._contado._contar(consultas=1)
+        return self._tx.ejecutar(sql, params, preparada)
+
+    def consultar(self, sql, params=()):
+        self._contado._contar(consultas=1)
+        return self._tx.consultar(sql, params)
+
+
+# ============================
+#  SESIÓN SIMULADA
+# ============================
+
+class SesionSimulada:
+    """Una sesión de navegador: un AppTest que se reejecuta en cada interacción."""
+
+    def __init__(self, nombre, contado, timeout):
+        self.nombre = nombre
+        self.contado = contado
+        self.at = AppTest.from_file(APP, default_timeout=timeout)
+        self.at.session_state["sesion_id"] = nombre
+        self.mediciones = []
+        self.errores = []
+
+    def _medir(self, interaccion, tab, accion=None):
+        # AppTest no conserva la pestaña abierta entre ejecuciones
+        self.at.session_state["tab_activa"] = tab
+        antes = self.contado.conteo(self.nombre)
+        inicio = time.perf_counter()
+        with _turno:
+            turno = time.perf_counter()
+            try:
+                (accion() if accion else self.at).run()
+            except Exception as e:
+                self.errores.append(f"{interaccion}: {e}")
+                return
+            fin = time.perf_counter()
+        despues = self.contado.conteo(self.nombre)
+        self.mediciones.append({
+            "interaccion": interaccion,
+            "ms": (fin - inicio) * 1000,
+            "espera_ms": (turno - inicio) * 1000,
+            "consultas": despues["consultas"] - antes["consultas"],
+            "conexiones": despues["conexiones"] - antes["conexiones"],
+        })
+        if self.at.exception:
+            self.errores.append(f"{interaccion}: {self.at.exception[0].message}")
+
+    def _boton(self, prefijo, en_sidebar=False):
+        botones = self.at.sidebar.button if en_sidebar else self.at.button
+        for boton in botones:
+            if (boton.key or "").startswith(prefijo) or boton.label.strip().startswith(prefijo):
+                return boton
+        return None
+
+    def abrir(self):
+        self._medir("abrir", TAB_INICIO)
+
+    def crear(self, numero):
+        self._medir("abrir_nueva", TAB_NUEVA)
+        titulo = next((t for t in self.at.text_input if "Título" in t.label), None)
+        boton = self._boton("Crear Tarea")
+        if titulo is None or boton is None:
+            self.errores.append("crear: formulario no encontrado")
+            return
+        titulo.set_value(f"{self.nombre} tarea {numero}")
+        self._medir("crear", TAB_NUEVA, boton.click)
+
+    def listar_y_filtrar(self):
+        self._medir("listar", TAB_TAREAS)
+        filtro = next((s for s in self.at.selectbox if "estado" in s.label), None)
+        if filtro is None:
+            self.errores.append("filtrar: selector no encontrado")
+            return
+        self._medir("filtrar", TAB_TAREAS, lambda: filtro.select("Pendientes"))
+
+    def alternar_y_eliminar(self):
+        boton = self._boton("comp_")
+        if boton is None:
+            self.errores.append("alternar: no hay filas")
+            return
+        self._medir("alternar", TAB_TAREAS, boton.click)
+
+        # Tras un rerun de fragmento el árbol es parcial: se vuelve a pintar la página
+        self._medir("listar", TAB_TAREAS)
+        boton = self._boton("elim_")
+        if boton is None:
+            self.errores.append("eliminar: no hay filas")
+            return
+        self._medir("pedir_eliminar", TAB_TAREAS, boton.click)
+        boton = self._boton("conf_si_")
+        if boton is None:
+            self.errores.append("eliminar: sin confirmación")
+            return
+        self._medir("eliminar", TAB_TAREAS, boton.click)
+
+    def estadisticas(self):
+        self._medir("estadisticas", TAB_ESTADISTICAS)
+
+    def respaldar(self):
+        boton = self._boton("Respaldo incremental", en_sidebar=True)
+        if boton is None:
+            self.errores.append("respaldar: botón no encontrado")
+            return
+        self._medir("respaldar", TAB_ESTADISTICAS, boton.click)
+
+    def recorrer(self, ciclos):
+        self.abrir()
+        for ciclo in range(ciclos):
+            self.crear(ciclo)
+            self.listar_y_filtrar()
+            self.alternar_y_eliminar()
+            self.estadisticas()
+            self.respaldar()
+        return self
+
+
+# ============================
+#  ESCENARIOS
+# ============================
+
+def _esperar_trabajos(timeout):
+    """Espera a que terminen los respaldos lanzados en segundo plano por las sesiones."""
+    limite = time.perf_counter() + timeout
+    while trabajos.get_registro().activos() and time.perf_counter() < limite:
+        time.sleep(0.05)
+
+
+def _memoria_por_sesion(n, contado, timeout):
+    """KiB asignados por sesión abierta (tracemalloc, asignaciones de Python)."""
+    st.cache_data.clear()
+    tracemalloc.start()
+    try:
+        antes, _ = tracemalloc.get_traced_memory()
+        sesiones = [SesionSimulada(f"memoria-{n}-{i}", contado, timeout) for i in range(n)]
+        for sesion in sesiones:
+            sesion.abrir()
+            sesion.listar_y_filtrar()
+        despues, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return (despues - antes) / n / 1024
+
+
+def correr_nivel(n, args, contado):
+    """Corre `n` sesiones a la vez y resume latencias y consultas por interacción."""
+    st.cache_data.clear()
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=n, thread_name_prefix="sesion") as ejecutor:
+        futuros = [
+            ejecutor.submit(SesionSimulada(f"carga-{n}-{i}", contado, args.timeout).recorrer, args.ciclos)
+            for i in range(n)
+        ]
+        sesiones = [f.result() for f in futuros]
+    duracion = time.perf_counter() - inicio
+    _esperar_trabajos(args.timeout)
+
+    mediciones = [m for s in sesiones for m in s.mediciones]
+    por_interaccion = defaultdict(list)
+    for m in mediciones:
+        por_interaccion[m["interaccion"]].append(m)
+
+    def resumir(ms):
+        tiempos = sorted(x["ms"] for x in ms)
+        return {
+            "reruns": len(ms),
+            "p50_ms": percentil(tiempos, 50),
+            "p95_ms": percentil(tiempos, 95),
+            "max_ms": tiempos[-1] if tiempos else None,
+            "espera_media_ms": sum(x["espera_ms"] for x in ms) / len(ms) if ms else None,
+            "consultas_media": sum(x["consultas"] for x in ms) / len(ms) if ms else None,
+            "conexiones_media": sum(x["conexiones"] for x in ms) / len(ms) if ms else None,
+        }
+
+    return {
+        "sesiones": n,
+        "duracion_s": duracion,
+        "reruns_s": len(mediciones) / duracion,
+        **{f"rerun_{k}": v for k, v in resumir(mediciones).items() if k != "reruns"},
+        "memoria_por_sesion_kib": _memoria_por_sesion(n, contado, args.timeout),
+        "interacciones": {nombre: resumir(ms) for nombre, ms in por_interaccion.items()},
+        "errores": [e for s in sesiones for e in s.errores][:20],
+    }
+
+
+def _resumen_texto(niveles):
+    lineas = [f"{'sesiones':>8} {'reruns/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9} {'espera ms':>9} "
+              f"{'consultas':>9} {'conexiones':>10} {'KiB/sesión':>11} {'errores':>7}"]
+    for r in niveles:
+        lineas.append(
+            f"{r['sesiones']:>8} {r['reruns_s']:>9.1f} {r['rerun_p50_ms']:>9.1f} {r['rerun_p95_ms']:>9.1f} "
+            f"{r['rerun_max_ms']:>9.1f} {r['rerun_espera_media_ms']:>9.1f} {r['rerun_consultas_media']:>9.2f} {r['rerun_conexiones_media']:>10.2f} "
+            f"{r['memoria_por_sesion_kib']:>11.0f} {len(r['errores']):>7}"
+        )
+    return "\n".join(lineas)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sesiones", default="1,2,4,8", help="cantidades de sesiones concurrentes")
+    parser.add_argument("--tareas", type=int, default=10000, help="tareas precargadas")
+    parser.add_argument("--backend", choices=["sqlite", "memoria"], default="sqlite")
+    parser.add_argument("--ciclos", type=int, default=1, help="veces que cada sesión repite el flujo")
+    parser.add_argument("--timeout", type=float, default=60, help="segundos máximos por rerun")
+    parser.add_argument("--salida", help="archivo JSON del informe (por defecto, stdout)")
+    args = parser.parse_args(argv)
+
+    directorio = tempfile.mkdtemp(prefix="carga-sesiones-")
+    try:
+        if args.backend == "memoria":
+            interno = almacenamiento.AlmacenamientoMemoria()
+        else:
+            interno = almacenamiento.AlmacenamientoSQLite(os.path.join(directorio, "tareas.db"))
+        contado = AlmacenamientoContado(interno)
+        almacenamiento.usar_almacenamiento(contado)
+        respaldo.usar_destino(respaldo.DestinoLocal(os.path.join(directorio, "respaldos")))
+
+        print(f"Cargando {args.tareas} tareas...", file=sys.stderr)
+        cargar_tareas(args.tareas)
+
+        niveles = []
+        for n in (int(x) for x in args.sesiones.split(",")):
+            print(f"Corriendo {n} sesiones...", file=sys.stderr)
+            niveles.append(correr_nivel(n, args, contado))
+        contado.cerrar()
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+
+    informe = {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "streamlit": st.__version__,
+        "backend": args.backend,
+        "tareas": args.tareas,
+        "ciclos": args.ciclos,
+        "niveles": niveles,
+    }
+    texto = json.dumps(informe, indent=2, ensure_ascii=False)
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            f.write(texto + "\n")
+    else:
+        print(texto)
+    print(_resumen_texto(niveles), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
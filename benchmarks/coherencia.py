@@ -0,0 +1,190 @@
+"""Coherencia de cachés entre instancias: dos procesos de app.py y una base SQLite.
+
+Cada instancia corre en un proceso aparte (AppTest) con la caché de tareas
+de larga duración y hace reruns continuos, anotando cuándo cambia el total
+de tareas que muestra el sidebar. Mientras tanto este proceso escribe en la
+misma base, como lo haría otra instancia detrás del ALB. Por cada escritura
+se informa cuánto tardó cada instancia en verla (o si nunca la vio) y
+cuántas consultas de versión hizo. Con --sin-coherencia las instancias no
+vuelven a consultar la versión: muestra el dato viejo que sirve la caché.
+
+Uso, desde la raíz del repositorio:
+
+    python -m benchmarks.coherencia --escrituras 10 --cada 1.5 --salida coherencia.json
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+INSTANCIAS = 2
+
+
+# ============================
+#  PROCESO HIJO (UNA INSTANCIA)
+# ============================
+
+def _instancia(duracion, pausa):
+    """Reruns continuos; imprime una línea JSON cuando cambia el total o se consulta la versión."""
+    from streamlit.testing.v1 import AppTest
+
+    import coherencia
+
+    at = AppTest.from_file(APP, default_timeout=60)
+    anterior = None
+    fin = time.time() + duracion
+    while time.time() < fin:
+        at.session_state["tab_activa"] = "Descipcion proyecto"
+        at.run()
+        if at.exception:
+            raise SystemExit(f"La app falló: {at.exception[0].value}")
+        total = int(next(m.value for m in at.sidebar.metric if m.label == "Total de tareas"))
+        estado = (total, coherencia.get_coherencia().consultas)
+        if estado != anterior:
+            linea = {"t": time.time(), "total": total, "consultas": estado[1]}
+            if anterior is None:
+                linea["listo"] = True
+            print(json.dumps(linea), flush=True)
+            anterior = estado
+        time.sleep(pausa)
+
+
+# ============================
+#  PROCESO PADRE (ESCRITOR)
+# ============================
+
+def _leer_lineas(proceso, lineas, listo):
+    for texto in proceso.stdout:
+        try:
+            linea = json.loads(texto)
+        except ValueError:
+            continue
+        lineas.append(linea)
+        if linea.get("listo"):
+            listo.set()
+
+
+def _retrasos(escrituras, lineas):
+    """Segundos desde cada escritura hasta que la instancia mostró su total (None si nunca)."""
+    vistas = [linea for linea in lineas if "total" in linea]
+    retrasos = []
+    for momento, esperado in escrituras:
+        vista = next((v for v in vistas if v["t"] >= momento and v["total"] >= esperado), None)
+        retrasos.append(vista["t"] - momento if vista else None)
+    return retrasos
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tareas", type=int, default=1000)
+    parser.add_argument("--escrituras", type=int, default=10)
+    parser.add_argument("--cada", type=float, default=1.5, help="segundos entre escrituras")
+    parser.add_argument("--intervalo", type=float, default=2.0, help="COHERENCIA_INTERVALO de las instancias")
+    parser.add_argument("--pausa", type=float, default=0.1, help="segundos entre reruns de cada instancia")
+    parser.add_argument("--sin-coherencia", action="store_true", help="las instancias no consultan la versión")
+    parser.add_argument("--salida", help="archivo JSON de resultados (por defecto, stdout)")
+    parser.add_argument("--hijo", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--duracion", type=float, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.hijo:
+        _instancia(args.duracion, args.pausa)
+        return
+
+    import almacenamiento
+    import repositorio
+    from benchmarks.datos_sinteticos import cargar_tareas, generar_tareas
+
+    directorio = tempfile.mkdtemp(prefix="benchmark-coherencia-")
+    procesos = []
+    try:
+        ruta = os.path.join(directorio, "tareas.db")
+        alm = almacenamiento.AlmacenamientoSQLite(ruta)
+        almacenamiento.usar_almacenamiento(alm)
+        cargar_tareas(args.tareas)
+
+        entorno = dict(
+            os.environ,
+            ALMACENAMIENTO="sqlite",
+            SQLITE_RUTA=ruta,
+            RESPALDO_DESTINO="local",
+            RESPALDO_DIR=os.path.join(directorio, "respaldos"),
+            # Sin coherencia, sólo el TTL haría ver las escrituras ajenas
+            CACHE_TAREAS_TTL="3600",
+            COHERENCIA_INTERVALO="inf" if args.sin_coherencia else str(args.intervalo),
+        )
+        duracion = 30 + args.escrituras * args.cada + args.intervalo
+        comando = [sys.executable, "-m", "benchmarks.coherencia", "--hijo",
+                   "--duracion", str(duracion), "--pausa", str(args.pausa)]
+        lecturas = []
+        for _ in range(INSTANCIAS):
+            proceso = subprocess.Popen(comando, env=entorno, stdout=subprocess.PIPE, text=True,
+                                       cwd=os.path.dirname(APP))
+            lineas, listo = [], threading.Event()
+            threading.Thread(target=_leer_lineas, args=(proceso, lineas, listo), daemon=True).start()
+            procesos.append(proceso)
+            lecturas.append((lineas, listo))
+        for _, listo in lecturas:
+            if not listo.wait(120):
+                raise SystemExit("Una instancia no arrancó a tiempo")
+
+        print(f"Escribiendo {args.escrituras} tareas...", file=sys.stderr)
+        escrituras = []
+        total = repositorio.contar_tareas()
+        for tarea in generar_tareas(args.escrituras, semilla=1):
+            repositorio.guardar_tarea(tarea)
+            total += 1
+            escrituras.append((time.time(), total))
+            time.sleep(args.cada)
+        time.sleep(args.intervalo + 1)
+    finally:
+        for proceso in procesos:
+            proceso.terminate()
+        for proceso in procesos:
+            proceso.wait()
+        shutil.rmtree(directorio, ignore_errors=True)
+
+    instancias = []
+    for lineas, _ in lecturas:
+        retrasos = _retrasos(escrituras, lineas)
+        vistas = [r for r in retrasos if r is not None]
+        instancias.append({
+            "vistas": len(vistas),
+            "sin_ver": len(retrasos) - len(vistas),
+            "retraso_p50_s": statistics.median(vistas) if vistas else None,
+            "retraso_max_s": max(vistas) if vistas else None,
+            "consultas_version": max((l.get("consultas", 0) for l in lineas), default=0),
+            "retrasos_s": retrasos,
+        })
+
+    informe = {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "tareas": args.tareas,
+        "escrituras": args.escrituras,
+        "cada_s": args.cada,
+        "intervalo_s": None if args.sin_coherencia else args.intervalo,
+        "instancias": instancias,
+    }
+    texto = json.dumps(informe, indent=2, ensure_ascii=False)
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            f.write(texto + "\n")
+    else:
+        print(texto)
+    for i, r in enumerate(instancias, 1):
+        p50 = f"{r['retraso_p50_s']:.2f} s" if r["retraso_p50_s"] is not None else "-"
+        maximo = f"{r['retraso_max_s']:.2f} s" if r["retraso_max_s"] is not None else "-"
+        print(f"instancia {i}: vistas {r['vistas']}/{args.escrituras} | retraso p50 {p50} max {maximo} | "
+              f"consultas de versión {r['consultas_version']}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
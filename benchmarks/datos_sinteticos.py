@@ -0,0 +1,62 @@
+import random
+import uuid
+from datetime import datetime, timedelta
+
+import repositorio
+
+# ============================
+#  GENERADOR DE TAREAS SINTÉTICAS
+# ============================
+
+# Proporciones aproximadas de un tablero real: pocas tareas urgentes
+IMPORTANCIAS = ["🟢 Baja", "🟡 Media", "🔴 Alta"]
+PESOS_IMPORTANCIA = [0.5, 0.35, 0.15]
+
+# Días hacia atrás en que se reparten las fechas de creación
+HISTORIA_DIAS = 365
+
+LOTE_CARGA = 1000
+
+_PALABRAS = (
+    "revisar informe preparar entrega reunión cliente presupuesto diseño "
+    "base datos respaldo servidor despliegue pruebas documentar corregir "
+    "error migrar instancia red seguridad factura proveedor inventario"
+).split()
+
+
+def generar_tareas(cantidad, semilla=0, ahora=None):
+    """Genera `cantidad` tareas con distribuciones realistas, de a una.
+
+    La creación se concentra en los últimos meses; la fecha límite cae entre
+    unos días antes y unas semanas después de creada; las tareas viejas
+    tienen más probabilidad de estar completadas. Con la misma semilla se
+    obtienen siempre las mismas tareas.
+    """
+    azar = random.Random(semilla)
+    ahora = ahora or datetime(2025, 6, 1, 12, 0, 0)
+    for _ in range(cantidad):
+        # Más tareas recientes que antiguas
+        edad = HISTORIA_DIAS * azar.random() ** 2
+        creada = ahora - timedelta(days=edad, seconds=azar.randrange(86400))
+        fecha = (creada + timedelta(days=round(azar.gauss(10, 12)))).date()
+        yield {
+            "id": str(uuid.UUID(int=azar.getrandbits(128), version=4)),
+            "titulo": " ".join(azar.choices(_PALABRAS, k=azar.randint(2, 5))).capitalize(),
+            "descripcion": " ".join(azar.choices(_PALABRAS, k=azar.randint(0, 25))),
+            "fecha": fecha,
+            "importancia": azar.choices(IMPORTANCIAS, PESOS_IMPORTANCIA)[0],
+            "completada": azar.random() < min(0.9, 0.2 + edad / HISTORIA_DIAS),
+            "creada": creada.replace(microsecond=0),
+        }
+
+
+def cargar_tareas(cantidad, semilla=0, lote=LOTE_CARGA):
+    """Inserta `cantidad` tareas sintéticas en el backend actual, por lotes."""
+    pendientes = []
+    for tarea in generar_tareas(cantidad, semilla):
+        pendientes.append(tarea)
+        if len(pendientes) >= lote:
+            repositorio.escribir_cambios(pendientes, {}, [])
+            pendientes = []
+    if pendientes:
+        repositorio.escribir_cambios(pendientes, {}, [])
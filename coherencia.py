@@ -0,0 +1,67 @@
+import os
+import threading
+import time
+
+import repositorio
+
+# ============================
+#  COHERENCIA DE CACHÉS ENTRE INSTANCIAS
+# ============================
+
+# Segundos mínimos entre consultas de la versión: una por proceso, no por
+# sesión ni por rerun. Es también el retraso máximo con que una instancia ve
+# una escritura hecha en otra
+INTERVALO = float(os.environ.get("COHERENCIA_INTERVALO", "2"))
+
+
+class Coherencia:
+    """Detecta escrituras de cualquier instancia comparando la versión de los datos.
+
+    Cada escritura de repositorio.py sube una fila de versión en su misma
+    transacción; comprobar() la lee con una consulta de una fila y, si
+    cambió desde la última lectura, llama a `al_cambiar` (que descarta las
+    cachés del proceso). Con réplica de lectura la versión se lee de la
+    réplica: cambia recién cuando la réplica ya tiene la escritura, así las
+    cachés no se recargan con datos viejos.
+    """
+
+    def __init__(self, intervalo=INTERVALO, al_cambiar=None):
+        self.intervalo = intervalo
+        self.al_cambiar = al_cambiar
+        self.version = None
+        self.consultas = 0
+        self._consultada = float("-inf")
+        self._lock = threading.Lock()
+
+    def comprobar(self):
+        """Lee la versión si pasó el intervalo; retorna True si cambió (y se avisó)."""
+        if time.monotonic() - self._consultada < self.intervalo:
+            return False
+        with self._lock:
+            # Otra sesión pudo consultarla mientras se esperaba el lock
+            if time.monotonic() - self._consultada < self.intervalo:
+                return False
+            version = repositorio.version_datos()
+            self._consultada = time.monotonic()
+            self.consultas += 1
+            anterior, self.version = self.version, version
+        # La primera lectura sólo fija la referencia: antes no había nada cacheado que invalidar
+        if anterior is None or version == anterior:
+            return False
+        if self.al_cambiar:
+            self.al_cambiar()
+        return True
+
+
+_coherencia = None
+_coherencia_lock = threading.Lock()
+
+
+def get_coherencia():
+    """Comprobador único del proceso, compartido por todas las sesiones."""
+    global _coherencia
+    if _coherencia is None:
+        with _coherencia_lock:
+            if _coherencia is None:
+                _coherencia = Coherencia()
+    return _coherencia
@@ -0,0 +1,167 @@
+import argparse
+import sys
+from collections import defaultdict
+from contextlib import contextmanager
+
+from almacenamiento import get_almacenamiento
+
+# ============================
+#  CONTADORES MATERIALIZADOS
+# ============================
+
+# Tareas por (importancia, completada) y por fecha límite. Cada escritura de
+# repositorio.py los ajusta en su misma transacción, así los KPIs y las
+# gráficas leen unas pocas filas en vez de recorrer tareas.
+
+SQL_RECONSTRUIR = (
+    "DELETE FROM tareas_contadores",
+    """
+    INSERT INTO tareas_contadores (importancia, completada, n)
+    SELECT importancia, completada, COUNT(*) FROM tareas GROUP BY importancia, completada
+    """,
+    "DELETE FROM tareas_por_fecha",
+    "INSERT INTO tareas_por_fecha (fecha, n) SELECT fecha, COUNT(*) FROM tareas GROUP BY fecha",
+)
+
+SQL_CONTADORES = "SELECT importancia, completada, n FROM tareas_contadores"
+SQL_CONTADORES_REALES = "SELECT importancia, completada, COUNT(*) AS n FROM tareas GROUP BY importancia, completada"
+SQL_POR_FECHA = "SELECT fecha, n FROM tareas_por_fecha"
+SQL_POR_FECHA_REALES = "SELECT fecha, COUNT(*) AS n FROM tareas GROUP BY fecha"
+
+
+def _marcas(n):
+    return ", ".join(["%s"] * n)
+
+
+def _clave(fila):
+    return fila["importancia"], int(fila["completada"]), fila["fecha"]
+
+
+def _sumar(alm, tx, diferencia):
+    """Suma `diferencia` ({(importancia, completada, fecha): n}) a ambas tablas."""
+    por_clase = defaultdict(int)
+    por_fecha = defaultdict(int)
+    for (importancia, completada, fecha), n in diferencia.items():
+        por_clase[(importancia, completada)] += n
+        por_fecha[fecha] += n
+
+    # Siempre en el mismo orden: dos escrituras concurrentes no se bloquean en cruz
+    clases = sorted((c, n) for c, n in por_clase.items() if n)
+    if clases:
+        sql = alm.sql_upsert("tareas_contadores", ("importancia", "completada", "n"), len(clases),
+                             sumar=("n",), clave=("importancia", "completada"))
+        tx.ejecutar(sql, [v for (importancia, completada), n in clases for v in (importancia, completada, n)],
+                    preparada=len(clases) <= 2)
+    fechas = sorted((f, n) for f, n in por_fecha.items() if n)
+    if fechas:
+        sql = alm.sql_upsert("tareas_por_fecha", ("fecha", "n"), len(fechas), sumar=("n",), clave=("fecha",))
+        tx.ejecutar(sql, [v for fila in fechas for v in fila], preparada=len(fechas) == 1)
+
+
+def sumar_nuevas(alm, tx, tareas):
+    """Cuenta tareas recién insertadas en `tx` (sin leerlas de la base)."""
+    diferencia = defaultdict(int)
+    for t in tareas:
+        diferencia[(t["importancia"], int(bool(t["completada"])), t["fecha"])] += 1
+    _sumar(alm, tx, diferencia)
+
+
+@contextmanager
+def ajustar(alm, tx, ids, antes=True, despues=True):
+    """Mantiene los contadores de las filas `ids` que el bloque escribe dentro de `tx`.
+
+    Lee su aporte antes (bloqueándolas en MySQL) y después del bloque y
+    suma la diferencia. Entrega el conjunto de ids que existían antes.
+    `despues=False` ahorra la segunda lectura en los borrados.
+    """
+    ids = list(ids)
+    previo = defaultdict(int)
+    existentes = set()
+    if antes and ids:
+        filas = tx.consultar(
+            f"SELECT id, importancia, completada, fecha FROM tareas WHERE id IN ({_marcas(len(ids))})"
+            + alm.bloqueo, ids
+        )
+        for f in filas:
+            existentes.add(f["id"])
+            previo[_clave(f)] += 1
+    yield existentes
+
+    diferencia = defaultdict(int)
+    if despues and ids:
+        filas = tx.consultar(
+            f"SELECT importancia, completada, fecha FROM tareas WHERE id IN ({_marcas(len(ids))})", ids
+        )
+        for f in filas:
+            diferencia[_clave(f)] += 1
+    for clave, n in previo.items():
+        diferencia[clave] -= n
+    _sumar(alm, tx, diferencia)
+
+
+# ----------------------------
+# Reconstrucción y verificación
+# ----------------------------
+
+def reconstruir(alm=None):
+    """Recalcula ambas tablas desde tareas, en una transacción.
+
+    Sube también la versión de los datos, para que todas las instancias
+    descarten los KPIs cacheados con los contadores anteriores.
+    """
+    # repositorio importa este módulo
+    import repositorio
+
+    alm = alm or get_almacenamiento()
+    with alm.transaccion() as tx:
+        for sql in SQL_RECONSTRUIR:
+            tx.ejecutar(sql)
+        tx.ejecutar(repositorio.SQL_SUBIR_VERSION, preparada=True)
+
+
+def verificar(alm=None):
+    """Compara los contadores con un recuento real.
+
+    Retorna las diferencias como [(tabla, clave, guardado, real)]; vacía si
+    no hay deriva.
+    """
+    alm = alm or get_almacenamiento()
+    # Una transacción: ambas lecturas ven el mismo estado de tareas
+    with alm.transaccion() as tx:
+        pares = [
+            ("tareas_contadores", SQL_CONTADORES, SQL_CONTADORES_REALES,
+             lambda f: (f["importancia"], int(f["completada"]))),
+            ("tareas_por_fecha", SQL_POR_FECHA, SQL_POR_FECHA_REALES, lambda f: f["fecha"]),
+        ]
+        diferencias = []
+        for tabla, sql_guardado, sql_real, clave in pares:
+            guardado = {clave(f): int(f["n"]) for f in tx.consultar(sql_guardado)}
+            real = {clave(f): int(f["n"]) for f in tx.consultar(sql_real)}
+            for k in sorted(set(guardado) | set(real), key=str):
+                if guardado.get(k, 0) != real.get(k, 0):
+                    diferencias.append((tabla, k, guardado.get(k, 0), real.get(k, 0)))
+    return diferencias
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Verifica o reconstruye los contadores materializados de tareas.")
+    parser.add_argument("accion", choices=["verificar", "reconstruir"])
+    args = parser.parse_args(argv)
+
+    if args.accion == "reconstruir":
+        reconstruir()
+        print("Contadores reconstruidos")
+        return 0
+
+    diferencias = verificar()
+    for tabla, clave, guardado, real in diferencias:
+        print(f"{tabla} {clave}: guardado {guardado}, real {real}")
+    if diferencias:
+        print(f"{len(diferencias)} diferencias; corregir con: python -m contadores reconstruir")
+        return 1
+    print("Contadores al día")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,227 @@
+import os
+import threading
+import time
+import zlib
+
+import mysql.connector
+
+# ============================
+#  CONFIGURACIÓN MYSQL (RDS)
+# ============================
+
+MYSQL_HOST = os.environ.get("MYSQL_HOST", "proyectoaws-db.ckiyq9fa3mxc.us-east-1.rds.amazonaws.com")
+MYSQL_USER = os.environ.get("MYSQL_USER", "admin")
+MYSQL_PASS = os.environ.get("MYSQL_PASS", "Camilo9408")
+MYSQL_DB   = os.environ.get("MYSQL_DB", "proyectoaws")
+# Réplicas de lectura "host[:puerto]" separadas por coma; vacío: todo va al escritor
+MYSQL_LECTORES = [h.strip() for h in os.environ.get("MYSQL_READER_HOSTS", "").split(",") if h.strip()]
+
+# Tamaño máximo del pool por proceso (cota de conexiones por instancia EC2)
+POOL_TAMANO = int(os.environ.get("MYSQL_POOL_SIZE", "5"))
+# Segundos que se espera por una conexión libre antes de fallar
+POOL_ESPERA = float(os.environ.get("MYSQL_POOL_TIMEOUT", "10"))
+# Segundos de inactividad tras los que una conexión libre se cierra
+POOL_INACTIVIDAD = float(os.environ.get("MYSQL_POOL_IDLE", "300"))
+# Segundos de inactividad tras los que se hace ping antes de prestarla
+POOL_PING = float(os.environ.get("MYSQL_POOL_PING", "10"))
+# Tamaño del pool propio del lector (además del pool del escritor)
+POOL_LECTOR_TAMANO = int(os.environ.get("MYSQL_READER_POOL_SIZE", str(POOL_TAMANO)))
+
+
+class PoolAgotado(Exception):
+    """No se obtuvo una conexión libre dentro del tiempo de espera."""
+
+
+class ConexionPool:
+    """Conexión prestada por el pool; close() la devuelve en vez de cerrarla."""
+
+    def __init__(self, pool, conn):
+        self._pool = pool
+        self._conn = conn
+        self._preparados = {}
+        self.ultimo_uso = time.monotonic()
+        self.prestada = False
+
+    def __getattr__(self, nombre):
+        return getattr(self._conn, nombre)
+
+    def preparado(self, sql, dictionary=False):
+        """Cursor con la sentencia preparada, reutilizado entre préstamos.
+
+        `sql` debe ser siempre el mismo objeto str (una constante del módulo)
+        para que el conector no vuelva a preparar la sentencia.
+        """
+        clave = (sql, dictionary)
+        cursor = self._preparados.get(clave)
+        if cursor is None:
+            cursor = self._conn.cursor(prepared=True, dictionary=dictionary)
+            self._preparados[clave] = cursor
+        return cursor
+
+    def close(self):
+        self._pool.devolver(self)
+
+    def cerrar_fisica(self):
+        """Cierra los cursores preparados y la conexión real."""
+        for cursor in self._preparados.values():
+            try:
+                cursor.close()
+            except mysql.connector.Error:
+                pass
+        self._preparados.clear()
+        try:
+            self._conn.close()
+        except mysql.connector.Error:
+            pass
+
+
+class PoolMySQL:
+    """Pool de conexiones acotado, con verificación al prestar y expulsión por inactividad."""
+
+    def __init__(self, tamano=POOL_TAMANO, espera=POOL_ESPERA,
+                 inactividad=POOL_INACTIVIDAD, ping=POOL_PING, **params):
+        self.tamano = tamano
+        self.espera = espera
+        self.inactividad = inactividad
+        self.ping = ping
+        self._params = params
+        self._libres = []
+        self._cupos = threading.BoundedSemaphore(tamano)
+        self._lock = threading.Lock()
+        self.abiertas = 0
+
+    def _abrir(self):
+        conn = ConexionPool(self, mysql.connector.connect(**self._params))
+        with self._lock:
+            self.abiertas += 1
+        return conn
+
+    def _descartar(self, conn):
+        conn.cerrar_fisica()
+        with self._lock:
+            self.abiertas -= 1
+
+    def _expulsar_inactivas(self, ahora):
+        """Saca de la lista de libres las conexiones inactivas demasiado tiempo."""
+        with self._lock:
+            viejas = [c for c in self._libres if ahora - c.ultimo_uso > self.inactividad]
+            if viejas:
+                self._libres = [c for c in self._libres if c not in viejas]
+        for conn in viejas:
+            self._descartar(conn)
+
+    def _sana(self, conn, ahora):
+        if ahora - conn.ultimo_uso <= self.ping:
+            return True
+        try:
+            conn._conn.ping(reconnect=False)
+            return True
+        except mysql.connector.Error:
+            return False
+
+    def obtener(self):
+        """Presta una conexión; bloquea hasta `espera` segundos si el pool está lleno."""
+        if not self._cupos.acquire(timeout=self.espera):
+            raise PoolAgotado(f"Sin conexiones MySQL libres tras {self.espera}s (pool de {self.tamano})")
+        try:
+            ahora = time.monotonic()
+            self._expulsar_inactivas(ahora)
+            while True:
+                with self._lock:
+                    # LIFO: la conexión usada más recientemente sigue caliente
+                    conn = self._libres.pop() if self._libres else None
+                if conn is None:
+                    conn = self._abrir()
+                    break
+                if self._sana(conn, ahora):
+                    break
+                self._descartar(conn)
+        except BaseException:
+            self._cupos.release()
+            raise
+        conn.prestada = True
+        return conn
+
+    def devolver(self, conn):
+        if not conn.prestada:
+            return
+        conn.prestada = False
+        try:
+            # Deja la sesión sin transacción abierta para el siguiente préstamo
+            conn._conn.rollback()
+        except mysql.connector.Error:
+            self._descartar(conn)
+        else:
+            conn.ultimo_uso = time.monotonic()
+            with self._lock:
+                self._libres.append(conn)
+        finally:
+            self._cupos.release()
+
+    def cerrar(self):
+        """Cierra todas las conexiones libres (las prestadas se cierran al devolverse)."""
+        with self._lock:
+            libres, self._libres = self._libres, []
+        for conn in libres:
+            self._descartar(conn)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Pool único del proceso, compartido por todas las sesiones de Streamlit."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = PoolMySQL(
+                    host=MYSQL_HOST,
+                    user=MYSQL_USER,
+                    password=MYSQL_PASS,
+                    database=MYSQL_DB
+                )
+    return _pool
+
+
+_pool_lector = None
+
+
+def lector_del_proceso(lectores=MYSQL_LECTORES, instancia=None):
+    """Réplica fija de este proceso, o None si no hay réplicas.
+
+    Todas las lecturas de un proceso van a la misma réplica, así sus cachés
+    no mezclan réplicas con distinto retraso; con varias instancias la carga
+    se reparte entre todas.
+    """
+    if not lectores:
+        return None
+    instancia = instancia or f"{os.uname().nodename}:{os.getpid()}"
+    return lectores[zlib.crc32(instancia.encode()) % len(lectores)]
+
+
+def get_pool_lector():
+    """Pool de la réplica de este proceso (None sin MYSQL_READER_HOSTS)."""
+    global _pool_lector
+    lector = lector_del_proceso()
+    if lector is None:
+        return None
+    if _pool_lector is None:
+        with _pool_lock:
+            if _pool_lector is None:
+                host, _, puerto = lector.partition(":")
+                _pool_lector = PoolMySQL(
+                    tamano=POOL_LECTOR_TAMANO,
+                    host=host,
+                    port=int(puerto or 3306),
+                    user=MYSQL_USER,
+                    password=MYSQL_PASS,
+                    database=MYSQL_DB
+                )
+    return _pool_lector
+
+
+def get_mysql_conn():
+    """Presta una conexión del pool; llamar close() la devuelve."""
+    return get_pool().obtener()
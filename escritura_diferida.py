@@ -0,0 +1,299 @@
+import atexit
+import logging
+import os
+import threading
+
+import repositorio
+from almacenamiento import get_almacenamiento
+
+# ============================
+#  ESCRITURA DIFERIDA (WRITE-BEHIND)
+# ============================
+
+# Activa el modo: las mutaciones se encolan y un hilo las escribe por lotes.
+# Al salir el proceso se vacía la cola; si muere sin salir (SIGKILL, caída de
+# la instancia) se pierde lo encolado en el último INTERVALO, o hasta
+# MAX_PENDIENTES ids
+ACTIVA = os.environ.get("ESCRITURA_DIFERIDA", "0") == "1"
+# Segundos entre vaciados de la cola
+INTERVALO = float(os.environ.get("ESCRITURA_DIFERIDA_INTERVALO", "1"))
+# Ids pendientes que fuerzan un vaciado sin esperar el intervalo
+MAX_PENDIENTES = int(os.environ.get("ESCRITURA_DIFERIDA_MAX", "500"))
+
+log = logging.getLogger("tareas.escritura_diferida")
+
+class _Pendiente:
+    """Estado acumulado de las operaciones encoladas sobre un mismo id."""
+
+    __slots__ = ("crear", "estado", "original", "eliminar", "sesiones")
+
+    def __init__(self):
+        self.crear = None
+        self.estado = None
+        self.original = None
+        self.eliminar = False
+        self.sesiones = set()
+
+    def vacio(self):
+        return self.crear is None and self.estado is None and not self.eliminar
+
+    def encadenar(self, nuevo):
+        """Aplica encima las operaciones de `nuevo`, encoladas después que las de este."""
+        self.sesiones |= nuevo.sesiones
+        if nuevo.eliminar:
+            if self.crear is not None:
+                self.crear = None
+            else:
+                self.eliminar = True
+            self.estado = None
+        elif nuevo.crear is not None:
+            self.crear = nuevo.crear
+            self.eliminar = False
+            self.estado = None
+        elif nuevo.estado is not None and not self.eliminar:
+            if self.crear is not None:
+                self.crear["completada"] = nuevo.estado
+                return
+            if self.estado is None:
+                self.original = nuevo.original
+            self.estado = nuevo.estado
+            if self.original is not None and self.estado == self.original:
+                self.estado = None
+
+
+class ColaEscritura:
+    """Cola de mutaciones que se fusionan por id y se escriben en la base por lotes.
+
+    Fusiones: crear + eliminar no escribe nada, crear + cambiar estado inserta
+    con el estado final, y cambiar estado hasta volver al original no escribe
+    (sólo si quien encoló el primer cambio informó el estado anterior).
+    Cada vaciado es una sola transacción. Si la base rechaza el lote, se
+    reintenta en mitades hasta aislar los ids que fallan: sólo esos se
+    descartan y se reportan a las sesiones que los encolaron. Si la base no
+    está disponible, el lote vuelve a la cola y se reintenta en el próximo
+    vaciado.
+    """
+
+    def __init__(self, intervalo=INTERVALO, max_pendientes=MAX_PENDIENTES, al_escribir=None):
+        self.intervalo = intervalo
+        self.max_pendientes = max_pendientes
+        # Se llama tras cada vaciado exitoso (p. ej. para invalidar cachés)
+        self.al_escribir = al_escribir
+        self._pendientes = {}
+        self._en_vuelo = {}
+        self._errores = {}
+        self._lock = threading.Lock()
+        self._vaciado = threading.Lock()
+        self._despertar = threading.Event()
+        self._hilo = None
+
+    # ----------------------------
+    # Encolar
+    # ----------------------------
+
+    def _encolar(self, tarea_id, sesion, aplicar):
+        with self._lock:
+            p = self._pendientes.get(tarea_id) or _Pendiente()
+            aplicar(p)
+            if p.vacio():
+                self._pendientes.pop(tarea_id, None)
+            else:
+                p.sesiones.add(sesion)
+                self._pendientes[tarea_id] = p
+            lleno = len(self._pendientes) >= self.max_pendientes
+        self._arrancar()
+        if lleno:
+            self._despertar.set()
+
+    def crear(self, tarea, sesion=None):
+        def aplicar(p):
+            p.crear = dict(tarea)
+            p.eliminar = False
+        self._encolar(tarea["id"], sesion, aplicar)
+
+    def cambiar_estado(self, tarea_id, estado, sesion=None, anterior=None):
+        """Encola el nuevo estado; `anterior` es el que veía quien llama (None si no lo sabe)."""
+        def aplicar(p):
+            if p.eliminar:
+                return
+            if p.crear is not None:
+                p.crear["completada"] = estado
+                return
+            if p.estado is None:
+                # Sin cambios pendientes, lo que veía quien llama es lo que hay en la base
+                p.original = anterior
+            p.estado = estado
+            if p.original is not None and p.estado == p.original:
+                p.estado = None
+        self._encolar(tarea_id, sesion, aplicar)
+
+    def eliminar(self, tarea_id, sesion=None):
+        def aplicar(p):
+            if p.crear is not None:
+                # Nunca llegó a la base: basta con olvidarla
+                p.crear = None
+                return
+            p.estado = None
+            p.eliminar = True
+        self._encolar(tarea_id, sesion, aplicar)
+
+    # ----------------------------
+    # Vista optimista
+    # ----------------------------
+
+    def _fusion(self):
+        with self._lock:
+            fusion = dict(self._en_vuelo)
+            fusion.update(self._pendientes)
+        return fusion
+
+    def superponer(self, tabla):
+        """Aplica a una tabla de tareas leída de la base los cambios aún no escritos.
+
+        Las eliminadas y las recién creadas (que van aparte, ver
+        creadas_pendientes) se quitan; los cambios de estado se aplican sobre
+        la columna completada.
+        """
+        fusion = self._fusion()
+        if not fusion:
+            return tabla
+        ocultas = [i for i, p in fusion.items() if p.eliminar or p.crear is not None]
+        estados = {i: p.estado for i, p in fusion.items() if p.estado is not None}
+        tabla = tabla[~tabla["id"].isin(ocultas)]
+        if estados:
+            nuevos = tabla["id"].map(estados)
+            tabla = tabla.assign(completada=nuevos.where(nuevos.notna(), tabla["completada"]).astype(bool))
+        return tabla
+
+    def superponer_registros(self, tareas):
+        """Como superponer(), sobre una lista de dicts (la vista fila por fila)."""
+        fusion = self._fusion()
+        if not fusion:
+            return tareas
+        resultado = []
+        for t in tareas:
+            p = fusion.get(t["id"])
+            if p is None:
+                resultado.append(t)
+            elif not p.eliminar and p.crear is None:
+                if p.estado is not None:
+                    t = dict(t, completada=p.estado)
+                resultado.append(t)
+        return resultado
+
+    def creadas_pendientes(self):
+        """Tareas creadas que todavía no están en la base, más recientes primero."""
+        creadas = [dict(p.crear) for p in self._fusion().values() if p.crear is not None]
+        return sorted(creadas, key=lambda t: t["creada"], reverse=True)
+
+    def pendientes(self):
+        with self._lock:
+            return len(self._pendientes) + len(self._en_vuelo)
+
+    def errores(self, sesion):
+        """Retorna y descarta los errores de escritura reportados a `sesion`."""
+        with self._lock:
+            return self._errores.pop(sesion, [])
+
+    # ----------------------------
+    # Vaciado
+    # ----------------------------
+
+    def _arrancar(self):
+        if self._hilo is None:
+            with self._lock:
+                if self._hilo is None:
+                    self._hilo = threading.Thread(target=self._bucle, name="escritura-diferida", daemon=True)
+                    self._hilo.start()
+
+    def _bucle(self):
+        while True:
+            self._despertar.wait(self.intervalo)
+            self._despertar.clear()
+            self.vaciar()
+
+    def vaciar(self):
+        """Escribe todo lo pendiente (una transacción si la base acepta el lote); retorna cuántos ids se escribieron."""
+        with self._vaciado:
+            with self._lock:
+                if not self._pendientes:
+                    return 0
+                self._en_vuelo, self._pendientes = self._pendientes, {}
+                lote = self._en_vuelo
+            escritos, sin_base = self._aplicar(lote, get_almacenamiento())
+            with self._lock:
+                self._en_vuelo = {}
+                # Lo encolado mientras tanto sobre los mismos ids va después
+                for tarea_id, p in sin_base.items():
+                    nuevo = self._pendientes.get(tarea_id)
+                    if nuevo is not None:
+                        p.encadenar(nuevo)
+                    if p.vacio():
+                        self._pendientes.pop(tarea_id, None)
+                    else:
+                        self._pendientes[tarea_id] = p
+            if sin_base:
+                log.warning("Base no disponible: %d cambios quedan en la cola", len(sin_base))
+            if escritos and self.al_escribir:
+                self.al_escribir()
+            return escritos
+
+    def _aplicar(self, lote, alm):
+        """Escribe `lote` partiéndolo si la base lo rechaza.
+
+        Retorna (ids escritos, {id: pendiente} que no se escribieron porque la
+        base no estaba disponible).
+        """
+        try:
+            _escribir(lote)
+            return len(lote), {}
+        except alm.no_disponible:
+            return 0, lote
+        except alm.errores as e:
+            if len(lote) == 1:
+                self._reportar(lote, f"No se guardó el cambio de la tarea {next(iter(lote))}: {e}")
+                return 0, {}
+        except Exception as e:
+            self._reportar(lote, f"No se guardaron {len(lote)} cambios: {e}")
+            return 0, {}
+        ids = list(lote)
+        mitad = len(ids) // 2
+        escritos, sin_base = self._aplicar({i: lote[i] for i in ids[:mitad]}, alm)
+        if sin_base:
+            # Se cayó la base: la otra mitad esperaría su propio timeout
+            sin_base.update((i, lote[i]) for i in ids[mitad:])
+            return escritos, sin_base
+        escritos_resto, sin_base = self._aplicar({i: lote[i] for i in ids[mitad:]}, alm)
+        return escritos + escritos_resto, sin_base
+
+    def _reportar(self, lote, mensaje):
+        with self._lock:
+            for sesion in set().union(*(p.sesiones for p in lote.values())):
+                self._errores.setdefault(sesion, []).append(mensaje)
+
+
+def _escribir(lote):
+    """Aplica un lote fusionado de operaciones en una sola transacción."""
+    creadas = [p.crear for p in lote.values() if p.crear is not None]
+    eliminadas = [i for i, p in lote.items() if p.eliminar]
+    por_estado = {True: [], False: []}
+    for i, p in lote.items():
+        if p.crear is None and p.estado is not None:
+            por_estado[bool(p.estado)].append(i)
+    repositorio.escribir_cambios(creadas, por_estado, eliminadas)
+
+
+_cola = None
+_cola_lock = threading.Lock()
+
+
+def get_cola():
+    """Cola única del proceso, compartida por todas las sesiones."""
+    global _cola
+    if _cola is None:
+        with _cola_lock:
+            if _cola is None:
+                _cola = ColaEscritura()
+                # El hilo es daemon: sin esto, lo encolado se pierde al detener el proceso
+                atexit.register(_cola.vaciar)
+    return _cola
@@ -0,0 +1,125 @@
+import os
+from datetime import date
+from functools import lru_cache
+
+from almacenamiento import get_almacenamiento
+
+# ============================
+#  CONSULTAS DE ESTADÍSTICAS
+# ============================
+
+# Se leen los contadores materializados (contadores.py), no la tabla tareas:
+# el resumen y las importancias salen de a lo sumo seis filas
+SQL_RESUMEN = """
+    SELECT COALESCE(SUM(n), 0) AS total,
+           COALESCE(SUM(CASE WHEN completada = 1 THEN n ELSE 0 END), 0) AS completadas
+    FROM tareas_contadores
+"""
+SQL_POR_IMPORTANCIA = """
+    SELECT importancia, SUM(n) AS cantidad
+    FROM tareas_contadores
+    GROUP BY importancia
+    HAVING SUM(n) > 0
+"""
+SQL_RANGO_FECHAS = """
+    SELECT MIN(fecha) AS desde, MAX(fecha) AS hasta
+    FROM tareas_por_fecha
+    WHERE n > 0
+"""
+# Los periodos más recientes primero: si aun así sobran, se corta por los viejos
+SQL_LINEA_TIEMPO = """
+    SELECT {periodo} AS periodo, SUM(n) AS cantidad
+    FROM tareas_por_fecha
+    WHERE n > 0
+    GROUP BY periodo
+    ORDER BY periodo DESC
+    LIMIT %s
+"""
+
+# Puntos máximos de la línea de tiempo que se envían al navegador
+MAX_PUNTOS = int(os.environ.get("ESTADISTICAS_MAX_PUNTOS", "120"))
+
+# De la más fina a la más gruesa
+GRANULARIDADES = ("dia", "semana", "mes", "trimestre")
+
+
+def _consultar(sql):
+    return get_almacenamiento().consultar(sql, preparada=True)
+
+
+def resumen_tareas():
+    """Retorna {'total', 'completadas', 'pendientes'} desde los contadores."""
+    fila = _consultar(SQL_RESUMEN)[0]
+    total = int(fila["total"])
+    completadas = int(fila["completadas"])
+    return {"total": total, "completadas": completadas, "pendientes": total - completadas}
+
+
+def conteo_por_importancia():
+    """Retorna [{'importancia', 'cantidad'}] agrupado en la base."""
+    return [
+        {"importancia": f["importancia"], "cantidad": int(f["cantidad"])}
+        for f in _consultar(SQL_POR_IMPORTANCIA)
+    ]
+
+
+# ----------------------------
+# Línea de tiempo por periodos
+# ----------------------------
+
+def _fecha(valor):
+    # Según el backend, el inicio de periodo llega como DATE o como texto ISO
+    return valor if isinstance(valor, date) else date.fromisoformat(str(valor)[:10])
+
+
+def contar_periodos(desde, hasta, granularidad):
+    """Cuántos periodos de `granularidad` abarca el rango [desde, hasta]."""
+    if granularidad == "dia":
+        return (hasta - desde).days + 1
+    if granularidad == "semana":
+        return (hasta.toordinal() - hasta.weekday() - desde.toordinal() + desde.weekday()) // 7 + 1
+    if granularidad == "mes":
+        return (hasta.year - desde.year) * 12 + hasta.month - desde.month + 1
+    return (hasta.year - desde.year) * 4 + (hasta.month - 1) // 3 - (desde.month - 1) // 3 + 1
+
+
+def elegir_granularidad(desde, hasta, pedida=None, max_puntos=MAX_PUNTOS):
+    """La `pedida` (o la más fina si no se pide) o, si da más de `max_puntos`
+    periodos, la primera más gruesa que no los supera.
+    """
+    candidatas = GRANULARIDADES[GRANULARIDADES.index(pedida):] if pedida else GRANULARIDADES
+    for granularidad in candidatas:
+        if contar_periodos(desde, hasta, granularidad) <= max_puntos:
+            return granularidad
+    return GRANULARIDADES[-1]
+
+
+@lru_cache(maxsize=None)
+def _sql_linea_tiempo(periodo):
+    # Un único str por expresión: la sentencia preparada se reutiliza
+    return SQL_LINEA_TIEMPO.format(periodo=periodo)
+
+
+def linea_tiempo(granularidad=None, max_puntos=MAX_PUNTOS):
+    """Tareas por fecha límite agrupadas por periodo en la base.
+
+    Con `granularidad` None se elige según el rango de fechas; si la pedida
+    daría más de `max_puntos` puntos se usa una más gruesa. Nunca se
+    devuelven más de `max_puntos` (los periodos más recientes).
+    Retorna {'granularidad', 'puntos': [{'fecha', 'cantidad'}], 'recortada'},
+    con `fecha` el inicio de cada periodo, en orden cronológico.
+    """
+    alm = get_almacenamiento()
+    rango = _consultar(SQL_RANGO_FECHAS)[0]
+    if rango["desde"] is None:
+        return {"granularidad": granularidad or GRANULARIDADES[0], "puntos": [], "recortada": False}
+    granularidad = elegir_granularidad(_fecha(rango["desde"]), _fecha(rango["hasta"]), granularidad, max_puntos)
+
+    sql = _sql_linea_tiempo(alm.periodos[granularidad].format(c="fecha"))
+    filas = alm.consultar(sql, (max_puntos + 1,), preparada=True)
+    recortada = len(filas) > max_puntos
+    puntos = [
+        {"fecha": _fecha(f["periodo"]), "cantidad": int(f["cantidad"])}
+        for f in reversed(filas[:max_puntos])
+    ]
+    return {"granularidad": granularidad, "puntos": puntos, "recortada": recortada}
@@ -0,0 +1,199 @@
+import json
+import logging
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# ============================
+#  MÉTRICAS DEL CAMINO CRÍTICO
+# ============================
+
+# Sin METRICAS=1 no se instala ningún envoltorio y medir() es un contexto vacío
+ACTIVAS = os.environ.get("METRICAS", "0") == "1"
+# Puerto del endpoint Prometheus (/metrics); vacío para no abrirlo
+PUERTO = os.environ.get("METRICAS_PUERTO", "")
+# Una línea JSON por rerun en este logger
+LOG_RERUN = os.environ.get("METRICAS_LOG", "1") == "1"
+
+log = logging.getLogger("tareas.metricas")
+
+_local = threading.local()
+_lock = threading.Lock()
+# (categoria, nombre) -> [llamadas, segundos, filas, bytes], acumulado del proceso
+_totales = {}
+_reruns = [0, 0.0]
+
+
+class _Medicion:
+    """Mide el bloque y lo registra al salir; `filas` y `bytes` se pueden asignar dentro."""
+
+    __slots__ = ("categoria", "nombre", "filas", "bytes", "_inicio")
+
+    def __init__(self, categoria, nombre):
+        self.categoria = categoria
+        self.nombre = nombre
+        self.filas = 0
+        self.bytes = 0
+
+    def __enter__(self):
+        self._inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        registrar(self.categoria, self.nombre, time.perf_counter() - self._inicio, self.filas, self.bytes)
+
+
+class _MedicionNula:
+    """Contexto vacío de cuando las métricas están apagadas; ignora asignaciones."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __setattr__(self, nombre, valor):
+        pass
+
+
+_NULA = _MedicionNula()
+
+
+def medir(categoria, nombre):
+    """Context manager que cronometra un bloque (db, s3, grafica, pestana, ...)."""
+    if not ACTIVAS:
+        return _NULA
+    return _Medicion(categoria, nombre)
+
+
+def _sumar(tabla, clave, segundos, filas, bytes_):
+    fila = tabla.get(clave)
+    if fila is None:
+        tabla[clave] = [1, segundos, filas, bytes_]
+    else:
+        fila[0] += 1
+        fila[1] += segundos
+        fila[2] += filas
+        fila[3] += bytes_
+
+
+def registrar(categoria, nombre, segundos, filas=0, bytes_=0):
+    """Suma una operación al rerun en curso de este hilo y a los totales del proceso."""
+    clave = (categoria, nombre)
+    rerun = getattr(_local, "rerun", None)
+    if rerun is not None:
+        _sumar(rerun, clave, segundos, filas, bytes_)
+    with _lock:
+        _sumar(_totales, clave, segundos, filas, bytes_)
+
+
+# ----------------------------
+# Por rerun
+# ----------------------------
+
+def iniciar_rerun():
+    if ACTIVAS:
+        _local.rerun = {}
+        _local.inicio = time.perf_counter()
+
+
+def terminar_rerun(sesion=None):
+    """Cierra el rerun del hilo actual; retorna su resumen (o None si no se medía)."""
+    rerun = getattr(_local, "rerun", None)
+    if rerun is None:
+        return None
+    _local.rerun = None
+    segundos = time.perf_counter() - _local.inicio
+    with _lock:
+        _reruns[0] += 1
+        _reruns[1] += segundos
+    resumen = {
+        "sesion": sesion,
+        "rerun_ms": round(segundos * 1000, 3),
+        "operaciones": [
+            {"categoria": c, "nombre": n, "llamadas": v[0], "ms": round(v[1] * 1000, 3), "filas": v[2], "bytes": v[3]}
+            for (c, n), v in sorted(rerun.items(), key=lambda kv: -kv[1][1])
+        ],
+    }
+    if LOG_RERUN:
+        log.info(json.dumps(resumen, ensure_ascii=False))
+    return resumen
+
+
+# ----------------------------
+# Exportación Prometheus
+# ----------------------------
+
+def _etiqueta(valor):
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+
+def texto_prometheus():
+    """Totales del proceso en el formato de texto de Prometheus."""
+    with _lock:
+        totales = {k: list(v) for k, v in _totales.items()}
+        reruns, segundos_reruns = _reruns
+    lineas = [
+        "# HELP tareas_rerun_segundos Duración de los reruns completos del script.",
+        "# TYPE tareas_rerun_segundos summary",
+        f"tareas_rerun_segundos_count {reruns}",
+        f"tareas_rerun_segundos_sum {segundos_reruns:.6f}",
+        "# HELP tareas_operacion_segundos Duración de las operaciones instrumentadas.",
+        "# TYPE tareas_operacion_segundos summary",
+    ]
+    for (categoria, nombre), (llamadas, segundos, _, _) in sorted(totales.items()):
+        etiquetas = f'categoria="{_etiqueta(categoria)}",nombre="{_etiqueta(nombre)}"'
+        lineas.append(f"tareas_operacion_segundos_count{{{etiquetas}}} {llamadas}")
+        lineas.append(f"tareas_operacion_segundos_sum{{{etiquetas}}} {segundos:.6f}")
+    for metrica, indice, ayuda in (("filas", 2, "Filas leídas o escritas."), ("bytes", 3, "Bytes transferidos.")):
+        lineas.append(f"# HELP tareas_{metrica}_total {ayuda}")
+        lineas.append(f"# TYPE tareas_{metrica}_total counter")
+        for (categoria, nombre), valores in sorted(totales.items()):
+            if valores[indice]:
+                etiquetas = f'categoria="{_etiqueta(categoria)}",nombre="{_etiqueta(nombre)}"'
+                lineas.append(f"tareas_{metrica}_total{{{etiquetas}}} {valores[indice]}")
+    return "\n".join(lineas) + "\n"
+
+
+class _ManejadorMetricas(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        cuerpo = texto_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, formato, *args):
+        pass
+
+
+_servidor = None
+# Si abrir el puerto falló no se reintenta: el error se registra una sola vez
+_servidor_fallido = False
+
+
+def servir_prometheus(puerto=PUERTO):
+    """Abre (una vez por proceso) el endpoint /metrics en un hilo aparte.
+
+    Si el puerto está ocupado (p. ej. otro proceso de la app en la misma
+    instancia) sólo se registra una advertencia: la app sigue sin /metrics.
+    """
+    global _servidor, _servidor_fallido
+    if not ACTIVAS or not puerto or _servidor is not None or _servidor_fallido:
+        return
+    with _lock:
+        if _servidor is None and not _servidor_fallido:
+            try:
+                _servidor = ThreadingHTTPServer(("0.0.0.0", int(puerto)), _ManejadorMetricas)
+            except (OSError, ValueError) as e:
+                _servidor_fallido = True
+                log.warning("No se pudo abrir /metrics en el puerto %s: %s", puerto, e)
+                return
+            threading.Thread(target=_servidor.serve_forever, name="metricas-http", daemon=True).start()
@@ -0,0 +1,332 @@
+import re
+
+import contadores
+from almacenamiento import get_almacenamiento
+
+# ============================
+#  ACCESO A DATOS DE TAREAS
+# ============================
+
+COLUMNAS = ("id", "titulo", "descripcion", "fecha", "importancia", "completada", "creada")
+
+# Sentencias como constantes: el backend reutiliza su versión preparada
+SQL_INSERTAR = """
+    INSERT INTO tareas (id, titulo, descripcion, fecha, importancia, completada, creada)
+    VALUES (%s, %s, %s, %s, %s, %s, %s)
+"""
+SQL_ACTUALIZAR_ESTADO = "UPDATE tareas SET completada=%s WHERE id=%s"
+SQL_ELIMINAR = "DELETE FROM tareas WHERE id=%s"
+
+SQL_CONTAR = "SELECT COUNT(*) FROM tareas"
+SQL_EXPORTAR = "SELECT * FROM tareas"
+SQL_IDS = "SELECT id FROM tareas"
+SQL_CONTAR_CAMBIADAS = "SELECT COUNT(*) FROM tareas WHERE modificada > %s"
+SQL_CAMBIADAS = "SELECT * FROM tareas WHERE modificada > %s"
+SQL_CONTAR_ELIMINADAS = "SELECT COUNT(*) FROM tareas_eliminadas WHERE eliminada > %s"
+SQL_ELIMINADAS = "SELECT id, eliminada FROM tareas_eliminadas WHERE eliminada > %s"
+SQL_PURGAR_ELIMINADAS = "DELETE FROM tareas_eliminadas WHERE eliminada < %s"
+SQL_VERSION = "SELECT version FROM tareas_version WHERE id = 1"
+SQL_SUBIR_VERSION = "UPDATE tareas_version SET version = version + 1 WHERE id = 1"
+
+
+def _marcas(n):
+    return ", ".join(["%s"] * n)
+
+
+# ----------------------------
+# Lectura paginada
+# ----------------------------
+
+_SQL_PAGINAS = {}
+
+
+def _condiciones_filtro(estado, con_importancia):
+    """Condiciones de los filtros de estado e importancia (esta última con un parámetro)."""
+    condiciones = []
+    if estado == "Pendientes":
+        condiciones.append("completada = 0")
+    elif estado == "Completadas":
+        condiciones.append("completada = 1")
+    if con_importancia:
+        condiciones.append("importancia = %s")
+    return tuple(condiciones)
+
+
+def _sql_pagina(estado, con_importancia, direccion):
+    """Arma (una sola vez por combinación) el SELECT filtrado y paginado.
+
+    Se devuelve siempre el mismo objeto str para que el backend reutilice la
+    sentencia preparada. `direccion` es None (primera página), "sig" o "ant".
+    """
+    clave = (estado, con_importancia, direccion)
+    if clave not in _SQL_PAGINAS:
+        condiciones = list(_condiciones_filtro(estado, con_importancia))
+        if direccion == "sig":
+            condiciones.append("(creada < %s OR (creada = %s AND id < %s))")
+        elif direccion == "ant":
+            condiciones.append("(creada > %s OR (creada = %s AND id > %s))")
+
+        orden = "ASC" if direccion == "ant" else "DESC"
+        sql = "SELECT * FROM tareas"
+        if condiciones:
+            sql += " WHERE " + " AND ".join(condiciones)
+        sql += f" ORDER BY creada {orden}, id {orden} LIMIT %s"
+        _SQL_PAGINAS[clave] = sql
+    return _SQL_PAGINAS[clave]
+
+
+def cargar_pagina(estado="Todas", importancia="Todas", ancla=None, direccion=None, limite=25):
+    """Lee una página de tareas filtrando y paginando (keyset) en la base.
+
+    `ancla` es la clave (creada, id) de la última fila de la página actual si
+    `direccion` es "sig", o de la primera si es "ant". Retorna
+    (tareas, hay_anterior, hay_siguiente) con las tareas en orden creada DESC.
+    """
+    if ancla is None:
+        direccion = None
+    con_importancia = importancia != "Todas"
+    sql = _sql_pagina(estado, con_importancia, direccion)
+
+    params = []
+    if con_importancia:
+        params.append(importancia)
+    if direccion:
+        params.extend([ancla[0], ancla[0], ancla[1]])
+    # Una fila de más indica si existe otra página en esa dirección
+    params.append(limite + 1)
+
+    tareas = get_almacenamiento().consultar(sql, params, preparada=True)
+
+    hay_mas = len(tareas) > limite
+    tareas = tareas[:limite]
+    for t in tareas:
+        t["completada"] = bool(t["completada"])
+
+    if direccion == "ant":
+        tareas.reverse()
+        return tareas, hay_mas, True
+    return tareas, direccion == "sig", hay_mas
+
+
+# ----------------------------
+# Búsqueda de texto
+# ----------------------------
+
+# Palabras de la búsqueda que se usan como máximo
+MAX_TERMINOS = 8
+
+
+def terminos_busqueda(texto):
+    """Palabras buscables de `texto`, en minúsculas y sin repetir (sin operadores)."""
+    terminos = dict.fromkeys(re.findall(r"\w+", texto.lower()))
+    return list(terminos)[:MAX_TERMINOS]
+
+
+def buscar_tareas(texto, estado="Todas", importancia="Todas", pagina=0, limite=25):
+    """Busca en títulos y descripciones con el índice de texto completo.
+
+    Cada palabra debe aparecer, completa o como comienzo de otra. Combina
+    los filtros de estado e importancia, ordena por relevancia y pagina por
+    número de página. Retorna (tareas, hay_siguiente); sin palabras
+    buscables retorna ([], False).
+    """
+    terminos = terminos_busqueda(texto)
+    if not terminos:
+        return [], False
+    alm = get_almacenamiento()
+    con_importancia = importancia != "Todas"
+    sql = alm.sql_busqueda(_condiciones_filtro(estado, con_importancia))
+
+    params = list(alm.params_busqueda(terminos))
+    if con_importancia:
+        params.append(importancia)
+    # Una fila de más indica si existe otra página
+    params.extend([limite + 1, pagina * limite])
+
+    tareas = alm.consultar(sql, params, preparada=True)
+    for t in tareas:
+        t["completada"] = bool(t["completada"])
+    return tareas[:limite], len(tareas) > limite
+
+
+# ----------------------------
+# Escrituras
+# ----------------------------
+
+def _marcar_eliminadas(alm, tx, ids):
+    """Deja las marcas de borrado que leen los respaldos incrementales."""
+    sql = alm.sql_upsert("tareas_eliminadas", ("id",), len(ids), ahora=("eliminada",))
+    tx.ejecutar(sql, ids, preparada=len(ids) == 1)
+
+
+def _publicar_cambio(tx):
+    # Al final de la transacción: en MySQL la fila queda bloqueada hasta el COMMIT
+    tx.ejecutar(SQL_SUBIR_VERSION, preparada=True)
+
+
+# Toda escritura ajusta los contadores materializados y sube la versión de los
+# datos en su misma transacción
+
+def guardar_tarea(tarea):
+    """Inserta una tarea nueva."""
+    alm = get_almacenamiento()
+    with alm.transaccion() as tx:
+        tx.ejecutar(SQL_INSERTAR, [tarea[c] for c in COLUMNAS], preparada=True)
+        contadores.sumar_nuevas(alm, tx, [tarea])
+        _publicar_cambio(tx)
+
+
+def actualizar_estado(tarea_id, estado):
+    """Actualiza el estado completada de una tarea."""
+    alm = get_almacenamiento()
+    with alm.transaccion() as tx:
+        with contadores.ajustar(alm, tx, [tarea_id]):
+            tx.ejecutar(SQL_ACTUALIZAR_ESTADO, (estado, tarea_id), preparada=True)
+        _publicar_cambio(tx)
+
+
+def eliminar_tarea(tarea_id):
+    """Elimina una tarea por id (y deja la marca para el respaldo incremental)."""
+    alm = get_almacenamiento()
+    with alm.transaccion() as tx:
+        with contadores.ajustar(alm, tx, [tarea_id], despues=False):
+            tx.ejecutar(SQL_ELIMINAR, (tarea_id,), preparada=True)
+        _marcar_eliminadas(alm, tx, [tarea_id])
+        _publicar_cambio(tx)
+
+
+def actualizar_estado_lote(ids, estado):
+    """Marca varias tareas como completadas/pendientes en una sola transacción."""
+    if not ids:
+        return 0
+    alm = get_almacenamiento()
+    with alm.transaccion() as tx:
+        with contadores.ajustar(alm, tx, ids):
+            afectadas = tx.ejecutar(f"UPDATE tareas SET completada=%s WHERE id IN ({_marcas(len(ids))})", (estado, *ids))
+        _publicar_cambio(tx)
+    return afectadas
+
+
+def actualizar_importancia_lote(ids, importancia):
+    """Cambia la importancia de varias tareas en una sola transacción."""
+    if not ids:
+        return 0
+    alm = get_almacenamiento()
+    with alm.transaccion() as tx:
+        with contadores.ajustar(alm, tx, ids):
+            afectadas = tx.ejecutar(
+                f"UPDATE tareas SET importancia=%s WHERE id IN ({_marcas(len(ids))})", (importancia, *ids)
+            )
+        _publicar_cambio(tx)
+    return afectadas
+
+
+def eliminar_tareas_lote(ids):
+    """Elimina varias tareas (y deja sus marcas de borrado) en una sola transacción."""
+    if not ids:
+        return 0
+    ids = list(ids)
+    alm = get_almacenamiento()
+    with alm.transaccion() as tx:
+        with contadores.ajustar(alm, tx, ids, despues=False):
+            afectadas = tx.ejecutar(f"DELETE FROM tareas WHERE id IN ({_marcas(len(ids))})", ids)
+        _marcar_eliminadas(alm, tx, ids)
+        _publicar_cambio(tx)
+    return afectadas
+
+
+def escribir_cambios(creadas, por_estado, eliminadas):
+    """Aplica en una transacción altas, cambios de estado ({estado: [ids]}) y bajas."""
+    alm = get_almacenamiento()
+    with alm.transaccion() as tx:
+        if creadas:
+            fila = "(" + _marcas(len(COLUMNAS)) + ")"
+            tx.ejecutar(
+                f"INSERT INTO tareas ({', '.join(COLUMNAS)}) VALUES " + ", ".join([fila] * len(creadas)),
+                [t[c] for t in creadas for c in COLUMNAS]
+            )
+            contadores.sumar_nuevas(alm, tx, creadas)
+        cambiadas = [i for ids in por_estado.values() for i in ids]
+        with contadores.ajustar(alm, tx, cambiadas):
+            for estado, ids in por_estado.items():
+                if ids:
+                    tx.ejecutar(f"UPDATE tareas SET completada=%s WHERE id IN ({_marcas(len(ids))})", (estado, *ids))
+        if eliminadas:
+            with contadores.ajustar(alm, tx, eliminadas, despues=False):
+                tx.ejecutar(f"DELETE FROM tareas WHERE id IN ({_marcas(len(eliminadas))})", eliminadas)
+            _marcar_eliminadas(alm, tx, eliminadas)
+        _publicar_cambio(tx)
+
+
+def aplicar_respaldo(tareas, borradas):
+    """Upsert de tareas restauradas y borrado de `borradas`, en una transacción.
+
+    Retorna (ids que ya existían, tareas eliminadas).
+    """
+    alm = get_almacenamiento()
+    with alm.transaccion() as tx:
+        existentes = set()
+        if tareas:
+            with contadores.ajustar(alm, tx, [t["id"] for t in tareas]) as existentes:
+                sql = alm.sql_upsert("tareas", COLUMNAS, len(tareas), nuevas=COLUMNAS[1:])
+                tx.ejecutar(sql, [t[c] for t in tareas for c in COLUMNAS])
+
+        eliminadas = 0
+        if borradas:
+            with contadores.ajustar(alm, tx, borradas, despues=False):
+                eliminadas = tx.ejecutar(f"DELETE FROM tareas WHERE id IN ({_marcas(len(borradas))})", borradas)
+            _marcar_eliminadas(alm, tx, borradas)
+        _publicar_cambio(tx)
+    return existentes, eliminadas
+
+
+# ----------------------------
+# Exportación (respaldos)
+# ----------------------------
+
+def ahora():
+    return get_almacenamiento().ahora()
+
+
+def contar_tareas():
+    return int(get_almacenamiento().valor(SQL_CONTAR, preparada=True))
+
+
+def iterar_tareas():
+    """Genera todas las tareas sin cargar la tabla en memoria."""
+    return get_almacenamiento().iterar(SQL_EXPORTAR)
+
+
+def iterar_ids():
+    """Genera los ids de todas las tareas."""
+    for fila in get_almacenamiento().iterar(SQL_IDS):
+        yield fila["id"]
+
+
+def contar_cambios(desde):
+    """Retorna (tareas modificadas, tareas borradas) después de `desde`."""
+    alm = get_almacenamiento()
+    return (
+        int(alm.valor(SQL_CONTAR_CAMBIADAS, (desde,), preparada=True)),
+        int(alm.valor(SQL_CONTAR_ELIMINADAS, (desde,), preparada=True)),
+    )
+
+
+def iterar_cambiadas(desde):
+    return get_almacenamiento().iterar(SQL_CAMBIADAS, (desde,))
+
+
+def iterar_eliminadas(desde):
+    """Genera marcas {'id', 'eliminada'} de las tareas borradas después de `desde`."""
+    for fila in get_almacenamiento().iterar(SQL_ELIMINADAS, (desde,)):
+        yield {"id": fila["id"], "eliminada": fila["eliminada"]}
+
+
+def version_datos():
+    """Versión actual de los datos; cambia con cada escritura de cualquier instancia."""
+    return int(get_almacenamiento().valor(SQL_VERSION, preparada=True))
+
+
+def purgar_eliminadas(antes):
+    """Borra las marcas de borrado anteriores a `antes`."""
+    get_almacenamiento().ejecutar(SQL_PURGAR_ELIMINADAS, (antes,), preparada=True)
@@ -0,0 +1,734 @@
+import gzip
+import io
+import json
+import os
+import queue
+import threading
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, date, timedelta
+from itertools import chain
+
+import metricas
+import repositorio
+from almacenamiento import get_almacenamiento
+
+# ============================
+#  CONFIGURAR S3 (BACKUP)
+# ============================
+
+BUCKET = os.environ.get("S3_BUCKET", "proyecto-aws-camilo")
+# Respaldos completos (base) e incrementales (delta), listados en el manifiesto
+PREFIJO = "respaldos/"
+MANIFIESTO = PREFIJO + "manifiesto.json"
+# Formatos anteriores; sólo se leen si no hay manifiesto
+ARCHIVO = "tareas.ndjson.gz"
+ARCHIVO_JSON = "tareas.json"
+
+# Destino de los respaldos: "s3" (el bucket, o un S3 local con S3_ENDPOINT_URL)
+# o "local" (un directorio del disco, con la misma estructura de keys)
+DESTINO = os.environ.get("RESPALDO_DESTINO", "s3")
+DIRECTORIO = os.environ.get("RESPALDO_DIR", "respaldos_locales")
+
+# Filas exportadas entre llamadas a progreso()
+LOTE_EXPORTACION = int(os.environ.get("LOTE_EXPORTACION", "5000"))
+# Tamaño de cada parte de la subida multiparte (S3 exige al menos 5 MiB salvo la última)
+TAMANO_PARTE = int(os.environ.get("S3_TAMANO_PARTE", str(8 * 1024 * 1024)))
+# Segundos que cada delta se solapa con el anterior, para no perder escrituras
+# confirmadas justo al cortar (reaplicar una fila es inofensivo)
+MARGEN_DELTA = float(os.environ.get("MARGEN_DELTA", "5"))
+
+_s3 = None
+_s3_lock = threading.Lock()
+
+
+def get_s3():
+    """Cliente S3 único del proceso; S3_ENDPOINT_URL permite apuntar a un S3 local."""
+    global _s3
+    if _s3 is None:
+        with _s3_lock:
+            if _s3 is None:
+                # boto3 tarda en importarse: se paga al primer uso de S3, no al arrancar
+                import boto3
+
+                _s3 = boto3.client(
+                    "s3",
+                    region_name=os.environ.get("AWS_REGION", "us-east-1"),
+                    endpoint_url=os.environ.get("S3_ENDPOINT_URL") or None
+                )
+    return _s3
+
+
+def probar_conexion(destino=None):
+    """Prueba si el destino de los respaldos es accesible."""
+    destino = destino or get_destino()
+    try:
+        destino.probar()
+        return True
+    except Exception as e:
+        return str(e)
+
+
+# ============================
+#  DESTINOS DE RESPALDO
+# ============================
+
+class SubidaMultiparte(io.RawIOBase):
+    """Archivo de sólo escritura que sube a S3 por partes de `tamano_parte` bytes.
+
+    Sólo mantiene en memoria la parte en curso. close() completa la subida;
+    abortar() la cancela y S3 descarta las partes ya enviadas.
+    """
+
+    def __init__(self, s3, bucket, key, tamano_parte=TAMANO_PARTE, **extra):
+        super().__init__()
+        self._s3 = s3
+        self._bucket = bucket
+        self._key = key
+        self._tamano_parte = tamano_parte
+        self._buffer = bytearray()
+        self._partes = []
+        self.bytes_subidos = 0
+        self._id = s3.create_multipart_upload(Bucket=bucket, Key=key, **extra)["UploadId"]
+
+    def writable(self):
+        return True
+
+    def write(self, datos):
+        self._buffer.extend(datos)
+        while len(self._buffer) >= self._tamano_parte:
+            self._subir_parte(bytes(self._buffer[:self._tamano_parte]))
+            del self._buffer[:self._tamano_parte]
+        return len(datos)
+
+    def _subir_parte(self, datos):
+        numero = len(self._partes) + 1
+        r = self._s3.upload_part(
+            Bucket=self._bucket, Key=self._key, UploadId=self._id,
+            PartNumber=numero, Body=datos
+        )
+        self._partes.append({"PartNumber": numero, "ETag": r["ETag"]})
+        self.bytes_subidos += len(datos)
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            if self._buffer or not self._partes:
+                self._subir_parte(bytes(self._buffer))
+                self._buffer.clear()
+            self._s3.complete_multipart_upload(
+                Bucket=self._bucket, Key=self._key, UploadId=self._id,
+                MultipartUpload={"Parts": self._partes}
+            )
+        except BaseException:
+            # Una subida sin completar ni abortar deja sus partes cobrándose en el bucket
+            self.abortar()
+            raise
+        finally:
+            super().close()
+
+    def abortar(self):
+        if self.closed:
+            return
+        try:
+            self._s3.abort_multipart_upload(Bucket=self._bucket, Key=self._key, UploadId=self._id)
+        finally:
+            super().close()
+
+
+class DestinoS3:
+    """Respaldos en un bucket S3 (o un S3 local compatible)."""
+
+    nombre = "S3"
+
+    def __init__(self, s3=None, bucket=BUCKET):
+        self._s3 = s3
+        self.bucket = bucket
+
+    @property
+    def s3(self):
+        # El cliente del proceso se crea recién al primer acceso
+        if self._s3 is None:
+            self._s3 = get_s3()
+        return self._s3
+
+    def probar(self):
+        self.s3.list_objects_v2(Bucket=self.bucket, MaxKeys=1)
+
+    def leer(self, key):
+        """Contenido completo del objeto, o None si no existe."""
+        try:
+            return self.s3.get_object(Bucket=self.bucket, Key=key)["Body"].read()
+        except self.s3.exceptions.NoSuchKey:
+            return None
+
+    def escribir(self, key, datos, tipo):
+        self.s3.put_object(Bucket=self.bucket, Key=key, Body=datos, ContentType=tipo)
+
+    def abrir_subida(self, key, tipo, metadatos):
+        return SubidaMultiparte(self.s3, self.bucket, key, ContentType=tipo, Metadata=metadatos)
+
+    def tamano(self, key):
+        """Retorna (tamaño, metadatos) del objeto, o None si no existe."""
+        from botocore.exceptions import ClientError
+
+        try:
+            cabecera = self.s3.head_object(Bucket=self.bucket, Key=key)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+        return cabecera["ContentLength"], cabecera.get("Metadata", {})
+
+    def leer_rango(self, key, inicio, fin):
+        obj = self.s3.get_object(Bucket=self.bucket, Key=key, Range=f"bytes={inicio}-{fin}")
+        return obj["Body"].read()
+
+
+class SubidaLocal(io.RawIOBase):
+    """Archivo de sólo escritura que aparece en su ruta final recién al cerrarse."""
+
+    def __init__(self, ruta, metadatos):
+        super().__init__()
+        self._ruta = ruta
+        self._metadatos = metadatos
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        self._archivo = open(ruta + ".parcial", "wb")
+        self.bytes_subidos = 0
+
+    def writable(self):
+        return True
+
+    def write(self, datos):
+        self._archivo.write(datos)
+        self.bytes_subidos += len(datos)
+        return len(datos)
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            self._archivo.close()
+            with open(self._ruta + ".meta.json", "w", encoding="utf-8") as f:
+                json.dump(self._metadatos, f)
+            os.replace(self._ruta + ".parcial", self._ruta)
+        finally:
+            super().close()
+
+    def abortar(self):
+        if self.closed:
+            return
+        try:
+            self._archivo.close()
+            os.remove(self._ruta + ".parcial")
+        finally:
+            super().close()
+
+
+class DestinoLocal:
+    """Respaldos en un directorio local; las keys de S3 son rutas relativas."""
+
+    nombre = "disco local"
+
+    def __init__(self, directorio=DIRECTORIO):
+        self.directorio = directorio
+
+    def _ruta(self, key):
+        return os.path.join(self.directorio, *key.split("/"))
+
+    def probar(self):
+        os.makedirs(self.directorio, exist_ok=True)
+        if not os.access(self.directorio, os.W_OK):
+            raise PermissionError(f"Sin permiso de escritura en {self.directorio}")
+
+    def leer(self, key):
+        try:
+            with open(self._ruta(key), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def escribir(self, key, datos, tipo):
+        ruta = self._ruta(key)
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        with open(ruta + ".parcial", "wb") as f:
+            f.write(datos)
+        os.replace(ruta + ".parcial", ruta)
+
+    def abrir_subida(self, key, tipo, metadatos):
+        return SubidaLocal(self._ruta(key), metadatos)
+
+    def tamano(self, key):
+        ruta = self._ruta(key)
+        try:
+            tamano = os.path.getsize(ruta)
+        except FileNotFoundError:
+            return None
+        try:
+            with open(ruta + ".meta.json", encoding="utf-8") as f:
+                metadatos = json.load(f)
+        except FileNotFoundError:
+            metadatos = {}
+        return tamano, metadatos
+
+    def leer_rango(self, key, inicio, fin):
+        with open(self._ruta(key), "rb") as f:
+            f.seek(inicio)
+            return f.read(fin - inicio + 1)
+
+
+class DestinoMedido:
+    """Envuelve un destino y registra tiempo y bytes de cada operación (METRICAS=1)."""
+
+    def __init__(self, interno, categoria):
+        self._interno = interno
+        self._categoria = categoria
+        self.nombre = interno.nombre
+
+    def probar(self):
+        with metricas.medir(self._categoria, "probar"):
+            self._interno.probar()
+
+    def leer(self, key):
+        with metricas.medir(self._categoria, "leer") as m:
+            datos = self._interno.leer(key)
+            m.bytes = len(datos) if datos is not None else 0
+        return datos
+
+    def escribir(self, key, datos, tipo):
+        with metricas.medir(self._categoria, "escribir") as m:
+            m.bytes = len(datos)
+            self._interno.escribir(key, datos, tipo)
+
+    def abrir_subida(self, key, tipo, metadatos):
+        with metricas.medir(self._categoria, "abrir_subida"):
+            return self._interno.abrir_subida(key, tipo, metadatos)
+
+    def tamano(self, key):
+        with metricas.medir(self._categoria, "tamano"):
+            return self._interno.tamano(key)
+
+    def leer_rango(self, key, inicio, fin):
+        with metricas.medir(self._categoria, "leer_rango") as m:
+            datos = self._interno.leer_rango(key, inicio, fin)
+            m.bytes = len(datos)
+        return datos
+
+
+DESTINOS = {"s3": DestinoS3, "local": DestinoLocal}
+
+_destino = None
+_destino_lock = threading.Lock()
+
+
+def get_destino():
+    """Destino único del proceso, elegido con la variable RESPALDO_DESTINO."""
+    global _destino
+    if _destino is None:
+        with _destino_lock:
+            if _destino is None:
+                if DESTINO not in DESTINOS:
+                    raise ValueError(f"RESPALDO_DESTINO desconocido: {DESTINO!r} (use {', '.join(DESTINOS)})")
+                destino = DESTINOS[DESTINO]()
+                _destino = DestinoMedido(destino, DESTINO) if metricas.ACTIVAS else destino
+    return _destino
+
+
+def usar_destino(destino):
+    """Reemplaza el destino del proceso (scripts y herramientas fuera de la app)."""
+    global _destino
+    with _destino_lock:
+        _destino = destino
+
+
+# ============================
+#  RESPALDO EN STREAMING
+# ============================
+
+def _subir_ndjson(destino, key, filas, total, progreso=None):
+    """Sube `filas` como NDJSON comprimido con gzip en una subida por partes.
+
+    La memoria usada es constante: un lote del cursor más una parte de la
+    subida. Retorna (filas escritas, bytes subidos).
+    """
+    subida = destino.abrir_subida(key, "application/gzip", {"tareas": str(total)})
+    escritas = 0
+    with metricas.medir("respaldo", "subir_ndjson") as m:
+        try:
+            with gzip.GzipFile(fileobj=subida, mode="wb") as gz:
+                for fila in filas:
+                    gz.write(json.dumps(fila, default=str, ensure_ascii=False).encode("utf-8") + b"\n")
+                    escritas += 1
+                    if progreso and escritas % LOTE_EXPORTACION == 0:
+                        progreso(escritas, total)
+        except BaseException:
+            subida.abortar()
+            raise
+        subida.close()
+        m.filas = escritas
+        m.bytes = subida.bytes_subidos
+    if progreso:
+        progreso(escritas, total)
+    return escritas, subida.bytes_subidos
+
+
+def leer_manifiesto(destino=None):
+    """Retorna el manifiesto de respaldos ({'base', 'deltas'}) o None si no existe."""
+    destino = destino or get_destino()
+    datos = destino.leer(MANIFIESTO)
+    return json.loads(datos) if datos is not None else None
+
+
+def _guardar_manifiesto(destino, manifiesto):
+    destino.escribir(MANIFIESTO, json.dumps(manifiesto, indent=2).encode("utf-8"), "application/json")
+
+
+def _key_respaldo(tipo, hasta):
+    return f"{PREFIJO}{tipo}-{hasta:%Y%m%dT%H%M%S%f}.ndjson.gz"
+
+
+def respaldar_tareas(destino=None, progreso=None):
+    """Respaldo completo: exporta la tabla como nueva base e inicia un manifiesto.
+
+    `progreso(exportadas, total)` se llama cada lote.
+    Retorna {'tipo', 'tareas', 'bytes', 'key'}.
+    """
+    destino = destino or get_destino()
+    hasta = repositorio.ahora()
+    total = repositorio.contar_tareas()
+    key = _key_respaldo("base", hasta)
+    exportadas, subidos = _subir_ndjson(destino, key, repositorio.iterar_tareas(), total, progreso)
+
+    _guardar_manifiesto(destino, {
+        "base": {"key": key, "hasta": hasta.isoformat(), "tareas": exportadas, "bytes": subidos},
+        "deltas": []
+    })
+
+    # Las marcas de borrado anteriores a la base ya no las necesita ningún delta
+    repositorio.purgar_eliminadas(hasta - timedelta(seconds=MARGEN_DELTA))
+
+    return {"tipo": "base", "tareas": exportadas, "bytes": subidos, "key": key}
+
+
+def respaldar_incremental(destino=None, progreso=None):
+    """Respaldo incremental: sube sólo las tareas cambiadas o borradas desde el último respaldo.
+
+    Escribe un objeto delta con las marcas de borrado seguidas de las tareas
+    modificadas y lo agrega al manifiesto. Si no hay base hace un respaldo
+    completo; si no hubo cambios no sube nada.
+    Retorna {'tipo', 'tareas', 'bytes', 'key'}.
+    """
+    destino = destino or get_destino()
+    manifiesto = leer_manifiesto(destino)
+    if manifiesto is None:
+        return respaldar_tareas(destino, progreso)
+
+    ultimo = manifiesto["deltas"][-1] if manifiesto["deltas"] else manifiesto["base"]
+    desde = datetime.fromisoformat(ultimo["hasta"]) - timedelta(seconds=MARGEN_DELTA)
+    hasta = repositorio.ahora()
+
+    cambiadas, eliminadas = repositorio.contar_cambios(desde)
+    if cambiadas == 0 and eliminadas == 0:
+        return {"tipo": "delta", "tareas": 0, "bytes": 0, "key": None}
+
+    # Primero los borrados: si una tarea se borró y volvió a crearse, gana la fila
+    filas = chain(repositorio.iterar_eliminadas(desde), repositorio.iterar_cambiadas(desde))
+    key = _key_respaldo("delta", hasta)
+    escritas, subidos = _subir_ndjson(destino, key, filas, cambiadas + eliminadas, progreso)
+
+    manifiesto["deltas"].append({
+        "key": key,
+        "desde": desde.isoformat(),
+        "hasta": hasta.isoformat(),
+        "cambiadas": cambiadas,
+        "eliminadas": eliminadas,
+        "tareas": escritas,
+        "bytes": subidos
+    })
+    _guardar_manifiesto(destino, manifiesto)
+    return {"tipo": "delta", "tareas": escritas, "bytes": subidos, "key": key}
+
+
+def puntos_restauracion(manifiesto):
+    """Instantes (ISO) a los que se puede restaurar: la base y cada delta."""
+    if not manifiesto:
+        return []
+    return [manifiesto["base"]["hasta"]] + [d["hasta"] for d in manifiesto["deltas"]]
+
+
+# ============================
+#  LECTURA EN STREAMING DEL RESPALDO
+# ============================
+
+# Tamaño de cada GET por rango y cuántos se descargan en paralelo
+TAMANO_RANGO = int(os.environ.get("S3_TAMANO_RANGO", str(8 * 1024 * 1024)))
+DESCARGAS_PARALELAS = int(os.environ.get("S3_DESCARGAS_PARALELAS", "4"))
+# Tareas decodificadas que pueden esperar al escritor de la base
+COLA_RESTAURACION = int(os.environ.get("COLA_RESTAURACION", "10000"))
+
+_FIN = object()
+
+
+class LectorRangos(io.RawIOBase):
+    """Archivo de sólo lectura sobre un objeto del destino descargado por rangos en paralelo.
+
+    Mantiene como máximo `paralelas` rangos en vuelo o en memoria, y los
+    entrega en orden, de modo que la memoria no depende del tamaño del objeto.
+    """
+
+    def __init__(self, destino, key, tamano, tamano_rango=TAMANO_RANGO, paralelas=DESCARGAS_PARALELAS):
+        super().__init__()
+        self._destino = destino
+        self._key = key
+        self._tamano = tamano
+        self._tamano_rango = tamano_rango
+        self._ejecutor = ThreadPoolExecutor(max_workers=paralelas, thread_name_prefix="respaldo-rango")
+        self._pendientes = deque()
+        self._siguiente = 0
+        self._actual = memoryview(b"")
+        for _ in range(paralelas):
+            self._pedir_rango()
+
+    def readable(self):
+        return True
+
+    def _pedir_rango(self):
+        if self._siguiente >= self._tamano:
+            return
+        inicio = self._siguiente
+        fin = min(inicio + self._tamano_rango, self._tamano) - 1
+        self._siguiente = fin + 1
+        self._pendientes.append(self._ejecutor.submit(self._destino.leer_rango, self._key, inicio, fin))
+
+    def readinto(self, destino):
+        while not self._actual:
+            if not self._pendientes:
+                return 0
+            self._actual = memoryview(self._pendientes.popleft().result())
+            self._pedir_rango()
+        n = min(len(destino), len(self._actual))
+        destino[:n] = self._actual[:n]
+        self._actual = self._actual[n:]
+        return n
+
+    def close(self):
+        if not self.closed:
+            for futuro in self._pendientes:
+                futuro.cancel()
+            self._ejecutor.shutdown(wait=False)
+        super().close()
+
+
+def _leer_ndjson(archivo):
+    """Genera las tareas de un NDJSON comprimido, decodificando de a una línea."""
+    with gzip.GzipFile(fileobj=archivo, mode="rb") as gz:
+        for linea in gz:
+            if linea.strip():
+                yield json.loads(linea)
+
+
+def _por_cola(tareas, tamano=COLA_RESTAURACION):
+    """Consume `tareas` en un hilo aparte y las entrega a través de una cola acotada.
+
+    Así la descarga y decodificación se solapan con las escrituras en la base, y
+    la cola acota cuántas tareas pueden acumularse si el escritor es más lento.
+    """
+    cola = queue.Queue(maxsize=tamano)
+    detener = threading.Event()
+
+    def poner(item):
+        while not detener.is_set():
+            try:
+                cola.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def productor():
+        try:
+            for tarea in tareas:
+                if not poner(tarea):
+                    return
+            poner(_FIN)
+        except BaseException as e:
+            poner(e)
+        finally:
+            cerrar = getattr(tareas, "close", None)
+            if cerrar:
+                cerrar()
+
+    hilo = threading.Thread(target=productor, name="respaldo-restauracion", daemon=True)
+    hilo.start()
+    try:
+        while True:
+            item = cola.get()
+            if item is _FIN:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        detener.set()
+
+
+def _leer_objetos(destino, objetos):
+    """Encadena la lectura en streaming de varios objetos NDJSON [(key, tamaño)]."""
+    for key, tamano in objetos:
+        with LectorRangos(destino, key, tamano) as lector:
+            yield from _leer_ndjson(lector)
+
+
+def abrir_respaldo(destino=None, hasta=None):
+    """Abre el respaldo para leerlo en streaming.
+
+    Con manifiesto, lee la base y los deltas en orden hasta el instante ISO
+    `hasta` (todos si es None); las marcas de borrado llegan como
+    {'id', 'eliminada'}. Retorna (total, tareas), donde `tareas` es un
+    iterador de dicts y `total` la cantidad esperada (None si no se conoce);
+    o None si no hay respaldo. Los objetos se descargan por rangos en
+    paralelo y se decodifican en un hilo que alimenta una cola acotada. Sin
+    manifiesto se leen los formatos anteriores.
+    """
+    destino = destino or get_destino()
+    manifiesto = leer_manifiesto(destino)
+    if manifiesto is not None:
+        partes = [manifiesto["base"]] + [
+            d for d in manifiesto["deltas"] if hasta is None or d["hasta"] <= hasta
+        ]
+        total = sum(p["tareas"] for p in partes)
+        objetos = [(p["key"], p["bytes"]) for p in partes]
+        return total, _por_cola(_leer_objetos(destino, objetos))
+
+    objeto = destino.tamano(ARCHIVO)
+    if objeto is not None:
+        tamano, metadatos = objeto
+        total = metadatos.get("tareas")
+        return (int(total) if total else None), _por_cola(_leer_objetos(destino, [(ARCHIVO, tamano)]))
+
+    datos = destino.leer(ARCHIVO_JSON)
+    if datos is None:
+        return None
+    tareas = json.loads(datos.decode("utf-8"))
+    return len(tareas), iter(tareas)
+
+
+# ============================
+#  RESTAURACIÓN MASIVA
+# ============================
+
+# Filas por INSERT multi-fila (y por transacción)
+LOTE_RESTAURACION = int(os.environ.get("LOTE_RESTAURACION", "1000"))
+
+# Máximo de mensajes de error que se conservan en el resumen
+MAX_ERRORES = 20
+
+def normalizar_tarea(t):
+    """Convierte una tarea del respaldo al formato de la tabla (lanza ValueError si no es válida)."""
+    if not isinstance(t, dict):
+        raise ValueError(f"registro no es un objeto: {t!r}")
+    return {
+        "id": t.get("id") or str(uuid.uuid4()),
+        "titulo": t.get("titulo", "Sin título"),
+        "descripcion": t.get("descripcion", ""),
+        "fecha": datetime.fromisoformat(t["fecha"]).date() if isinstance(t.get("fecha"), str) else date.today(),
+        "importancia": t.get("importancia", "🟢 Baja"),
+        "completada": bool(t.get("completada", False)),
+        "creada": datetime.fromisoformat(t["creada"]) if isinstance(t.get("creada"), str) else datetime.now()
+    }
+
+
+def _registrar_error(resumen, mensaje):
+    if len(resumen["errores"]) < MAX_ERRORES:
+        resumen["errores"].append(mensaje)
+
+
+def _escribir_lote(lote, resumen):
+    """Aplica un lote en una transacción: upsert de las tareas y borrado de las marcadas.
+
+    En `lote` cada id apunta a la tarea normalizada o a None si fue borrada.
+    Si la base rechaza el lote, se reintenta en mitades hasta aislar las
+    tareas que fallan: sólo esas cuentan como rechazadas. Si la base no está
+    disponible el error se propaga y la restauración se detiene.
+    """
+    tareas = [t for t in lote.values() if t is not None]
+    borradas = [i for i, t in lote.items() if t is None]
+    alm = get_almacenamiento()
+    try:
+        existentes, eliminadas = repositorio.aplicar_respaldo(tareas, borradas)
+    except alm.no_disponible:
+        raise
+    except alm.errores as e:
+        if len(lote) == 1:
+            resumen["rechazadas"] += 1
+            _registrar_error(resumen, f"Tarea {next(iter(lote))} rechazada: {e}")
+            return
+        ids = list(lote)
+        mitad = len(ids) // 2
+        _escribir_lote({i: lote[i] for i in ids[:mitad]}, resumen)
+        _escribir_lote({i: lote[i] for i in ids[mitad:]}, resumen)
+        return
+
+    resumen["actualizadas"] += len(existentes)
+    resumen["insertadas"] += len(tareas) - len(existentes)
+    resumen["eliminadas"] += eliminadas
+
+
+def restaurar_tareas(tareas, tamano_lote=LOTE_RESTAURACION, progreso=None, total=None, exacta=False):
+    """Restaura tareas en la base con upserts multi-fila por lotes transaccionales.
+
+    `tareas` puede ser cualquier iterable de dicts del respaldo, incluidas
+    marcas de borrado {'id', 'eliminada'}. `progreso`, si se da, se llama
+    como progreso(procesadas, total) tras cada lote. Sin `exacta` el respaldo
+    se fusiona con la tabla; con `exacta` además se borran al final las
+    tareas que el respaldo no trae, y la tabla queda como en ese punto.
+    Retorna {'insertadas', 'actualizadas', 'eliminadas', 'rechazadas', 'errores'}.
+    """
+    if total is None and hasattr(tareas, "__len__"):
+        total = len(tareas)
+
+    resumen = {"insertadas": 0, "actualizadas": 0, "eliminadas": 0, "rechazadas": 0, "errores": []}
+    procesadas = 0
+    lote = {}
+    # Ids que quedan en el punto restaurado (sólo con `exacta`)
+    conservadas = set()
+
+    with metricas.medir("respaldo", "restaurar") as m:
+        for t in tareas:
+            procesadas += 1
+            if isinstance(t, dict) and t.get("eliminada") and t.get("id"):
+                # Marca de borrado de un respaldo incremental
+                lote[t["id"]] = None
+                conservadas.discard(t["id"])
+            else:
+                try:
+                    tarea = normalizar_tarea(t)
+                except (KeyError, TypeError, ValueError) as e:
+                    resumen["rechazadas"] += 1
+                    _registrar_error(resumen, f"Tarea inválida ({e})")
+                    continue
+                # Un id repetido dentro del lote se queda con la última versión
+                lote[tarea["id"]] = tarea
+                if exacta:
+                    conservadas.add(tarea["id"])
+
+            if len(lote) >= tamano_lote:
+                _escribir_lote(lote, resumen)
+                lote = {}
+                if progreso:
+                    progreso(procesadas, total)
+
+        if lote:
+            _escribir_lote(lote, resumen)
+        if exacta:
+            # Creadas después del punto: se leen todos los ids antes de empezar a borrar
+            sobrantes = [i for i in repositorio.iterar_ids() if i not in conservadas]
+            for inicio in range(0, len(sobrantes), tamano_lote):
+                resumen["eliminadas"] += repositorio.eliminar_tareas_lote(sobrantes[inicio:inicio + tamano_lote])
+        if progreso:
+            progreso(procesadas, total)
+        m.filas = procesadas
+
+    return resumen
@@ -0,0 +1,72 @@
+-- Esquema de la base de datos proyectoaws (Amazon RDS MySQL)
+
+CREATE TABLE IF NOT EXISTS tareas (
+    id          VARCHAR(36)  NOT NULL PRIMARY KEY,
+    titulo      VARCHAR(255) NOT NULL,
+    descripcion TEXT,
+    fecha       DATE         NOT NULL,
+    importancia VARCHAR(20)  NOT NULL,
+    completada  BOOLEAN      NOT NULL DEFAULT FALSE,
+    creada      DATETIME     NOT NULL,
+    -- Última escritura de la fila; los respaldos incrementales suben lo modificado después del anterior
+    modificada  DATETIME(6)  NOT NULL DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6),
+    -- Paginación keyset de "Todas las Tareas" (ORDER BY creada, id)
+    INDEX idx_tareas_creada (creada, id),
+    -- Filtros por estado / importancia combinados con la paginación
+    INDEX idx_tareas_estado (completada, creada, id),
+    INDEX idx_tareas_filtros (completada, importancia, creada, id),
+    INDEX idx_tareas_importancia (importancia, creada, id),
+    -- Línea de tiempo de estadísticas (GROUP BY fecha)
+    INDEX idx_tareas_fecha (fecha),
+    INDEX idx_tareas_modificada (modificada),
+    -- Búsqueda de texto en "Todas las Tareas" (MATCH ... AGAINST en modo booleano)
+    FULLTEXT INDEX ft_tareas_texto (titulo, descripcion)
+);
+
+-- Marcas de borrado para los respaldos incrementales (se purgan en cada respaldo completo)
+CREATE TABLE IF NOT EXISTS tareas_eliminadas (
+    id        VARCHAR(36)  NOT NULL PRIMARY KEY,
+    eliminada DATETIME(6)  NOT NULL DEFAULT CURRENT_TIMESTAMP(6),
+    INDEX idx_eliminadas_eliminada (eliminada)
+);
+
+-- Contadores materializados: tareas por (importancia, completada) y por fecha límite.
+-- Los mantiene repositorio.py en la misma transacción que cada escritura (contadores.py);
+-- tras crearlos en una base con datos: python -m contadores reconstruir
+CREATE TABLE IF NOT EXISTS tareas_contadores (
+    importancia VARCHAR(20) NOT NULL,
+    completada  BOOLEAN     NOT NULL,
+    n           BIGINT      NOT NULL DEFAULT 0,
+    PRIMARY KEY (importancia, completada)
+);
+
+CREATE TABLE IF NOT EXISTS tareas_por_fecha (
+    fecha DATE   NOT NULL PRIMARY KEY,
+    n     BIGINT NOT NULL DEFAULT 0
+);
+
+-- Versión de los datos: cada escritura la incrementa al final de su transacción
+-- y cada instancia la consulta para saber si sus cachés quedaron viejas (coherencia.py)
+CREATE TABLE IF NOT EXISTS tareas_version (
+    id      TINYINT NOT NULL PRIMARY KEY,
+    version BIGINT  NOT NULL DEFAULT 0
+);
+INSERT IGNORE INTO tareas_version (id, version) VALUES (1, 0);
+
+-- Migración de una tabla tareas creada antes de la paginación keyset y los filtros en SQL:
+-- ALTER TABLE tareas
+--     ADD INDEX idx_tareas_creada (creada, id),
+--     ADD INDEX idx_tareas_estado (completada, creada, id),
+--     ADD INDEX idx_tareas_filtros (completada, importancia, creada, id),
+--     ADD INDEX idx_tareas_importancia (importancia, creada, id);
+
+-- Migración de una tabla tareas creada antes de las estadísticas en SQL:
+-- ALTER TABLE tareas ADD INDEX idx_tareas_fecha (fecha);
+
+-- Migración de una tabla tareas creada antes de los respaldos incrementales:
+-- ALTER TABLE tareas
+--     ADD COLUMN modificada DATETIME(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6),
+--     ADD INDEX idx_tareas_modificada (modificada);
+
+-- Migración de una tabla tareas creada antes de la búsqueda de texto:
+-- ALTER TABLE tareas ADD FULLTEXT INDEX ft_tareas_texto (titulo, descripcion);
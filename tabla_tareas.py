@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+# ============================
+#  TABLA COLUMNAR DE TAREAS
+# ============================
+
+# Textos y fechas en buffers Arrow (sin un objeto Python por celda), importancia
+# como categoría ordenada y completada como bool de un byte
+IMPORTANCIA = pd.CategoricalDtype(["🟢 Baja", "🟡 Media", "🔴 Alta"], ordered=True)
+
+COLUMNAS = ("id", "titulo", "descripcion", "fecha", "importancia", "completada", "creada")
+
+_ARROW = {
+    "id": pa.string(),
+    "titulo": pa.string(),
+    "descripcion": pa.string(),
+    "fecha": pa.date32(),
+    "creada": pa.timestamp("us"),
+}
+
+
+def _tipo_importancia(valores):
+    """IMPORTANCIA, más al final las etiquetas que no conoce (la columna es texto libre)."""
+    otras = set(valores) - set(IMPORTANCIA.categories) - {None}
+    if not otras:
+        return IMPORTANCIA
+    return pd.CategoricalDtype([*IMPORTANCIA.categories, *sorted(otras)], ordered=True)
+
+
+def desde_registros(tareas):
+    """Convierte filas (dicts de la base o de la cola) a la tabla columnar."""
+    columnas = {}
+    for columna in COLUMNAS:
+        valores = [t[columna] for t in tareas]
+        if columna == "importancia":
+            columnas[columna] = pd.Categorical(valores, dtype=_tipo_importancia(valores))
+        elif columna == "completada":
+            # Los backends devuelven 0/1 o bool según el driver
+            columnas[columna] = np.array(valores, dtype=bool)
+        else:
+            columnas[columna] = pd.arrays.ArrowExtensionArray(pa.array(valores, type=_ARROW[columna]))
+    return pd.DataFrame(columnas)
+
+
+def registros(tabla):
+    """Filas de la tabla como dicts, para las vistas que dibujan tarea por tarea."""
+    return tabla.to_dict("records")
+
+
+def filtrar(tabla, estado="Todas", importancia="Todas"):
+    """Filtra por estado ("Todas", "Pendientes", "Completadas") e importancia."""
+    mascara = pd.Series(True, index=tabla.index)
+    if estado != "Todas":
+        mascara &= tabla["completada"] == (estado == "Completadas")
+    if importancia != "Todas":
+        mascara &= tabla["importancia"] == importancia
+    return tabla[mascara]
+
+
+def unir(*tablas):
+    """Concatena tablas en orden, renumerando el índice."""
+    return pd.concat(tablas, ignore_index=True)
+
+
+def clave(tabla, posicion):
+    """Clave de paginación (creada, id) de la fila en `posicion`, en tipos Python."""
+    return tabla["creada"].iloc[posicion].to_pydatetime(), tabla["id"].iloc[posicion]
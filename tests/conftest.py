@@ -0,0 +1,29 @@
+import os
+import sys
+from datetime import date, datetime
+
+import pytest
+
+# Los módulos de la app están en la raíz del repositorio
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import almacenamiento  # noqa: E402
+
+
+@pytest.fixture
+def memoria():
+    """Backend SQLite en memoria como backend del proceso durante la prueba."""
+    alm = almacenamiento.AlmacenamientoMemoria()
+    almacenamiento.usar_almacenamiento(alm)
+    yield alm
+    almacenamiento.usar_almacenamiento(None)
+
+
+def tarea(tarea_id, **cambios):
+    """Tarea con el formato de la tabla; `cambios` pisa cualquier columna."""
+    t = {
+        "id": tarea_id, "titulo": f"Tarea {tarea_id}", "descripcion": "", "fecha": date(2024, 2, 1),
+        "importancia": "🟢 Baja", "completada": False, "creada": datetime(2024, 1, 1),
+    }
+    t.update(cambios)
+    return t
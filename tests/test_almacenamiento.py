@@ -0,0 +1,76 @@
+import sqlite3
+
+import pytest
+
+import almacenamiento
+
+
+@pytest.fixture
+def ruteado(tmp_path):
+    escritor = almacenamiento.AlmacenamientoSQLite(str(tmp_path / "escritor.db"))
+    lector = almacenamiento.AlmacenamientoSQLite(str(tmp_path / "lector.db"))
+    escritor.ejecutar("UPDATE tareas_version SET version = 7")
+    lector.ejecutar("UPDATE tareas_version SET version = 3")
+    return almacenamiento.AlmacenamientoRuteado(escritor, lector)
+
+
+def _version(alm):
+    return alm.valor("SELECT version FROM tareas_version")
+
+
+def test_lee_del_lector(ruteado):
+    assert _version(ruteado) == 3
+
+
+def test_lector_caido_pasa_al_escritor_y_espera_la_pausa(ruteado, monkeypatch):
+    ruteado._lector._conn.execute("ALTER TABLE tareas_version RENAME TO otra")
+    llamadas = []
+    original = ruteado._lector.valor
+    monkeypatch.setattr(ruteado._lector, "valor", lambda *a: llamadas.append(a) or original(*a))
+
+    assert _version(ruteado) == 7
+    assert _version(ruteado) == 7
+    assert len(llamadas) == 1
+
+    ruteado._pausado_hasta = float("-inf")
+    ruteado._lector._conn.execute("ALTER TABLE otra RENAME TO tareas_version")
+    assert _version(ruteado) == 3
+
+
+def test_error_de_la_sentencia_no_se_repite_en_el_escritor(ruteado):
+    with pytest.raises(sqlite3.ProgrammingError):
+        ruteado.valor("SELECT version FROM tareas_version WHERE id = %s", (1, 2))
+    assert ruteado._pausado_hasta == float("-inf")
+
+
+def test_envoltorios_delegan_los_atributos_del_dialecto(ruteado):
+    medido = almacenamiento.AlmacenamientoMedido(ruteado)
+    assert medido.con_lector is True
+    assert medido.nombre == "SQLite"
+    assert medido.periodos is ruteado._escritor.periodos
+    assert medido.errores == (sqlite3.Error,)
+    assert _version(medido) == 3
+
+
+def _insertar(tx, tarea_id):
+    tx.ejecutar(
+        "INSERT INTO tareas (id, titulo, descripcion, fecha, importancia, completada, creada) "
+        "VALUES (%s, 't', '', '2024-02-01', '🟢 Baja', 0, '2024-01-01 00:00:00')",
+        (tarea_id,)
+    )
+
+
+def test_iterar_no_ve_transacciones_sin_confirmar(tmp_path):
+    alm = almacenamiento.AlmacenamientoSQLite(str(tmp_path / "tareas.db"))
+    with alm.transaccion() as tx:
+        _insertar(tx, "a")
+    with alm.transaccion() as tx:
+        _insertar(tx, "b")
+        assert [f["id"] for f in alm.iterar("SELECT id FROM tareas")] == ["a"]
+
+
+def test_iterar_en_memoria():
+    alm = almacenamiento.AlmacenamientoMemoria()
+    with alm.transaccion() as tx:
+        _insertar(tx, "a")
+    assert [f["id"] for f in alm.iterar("SELECT id FROM tareas", tamano=1)] == ["a"]
@@ -0,0 +1,12 @@
+from benchmarks.capa_datos import percentil
+
+
+def test_percentil_por_rango_mas_cercano():
+    diez = list(range(1, 11))
+    assert percentil(diez, 50) == 5
+    assert percentil(diez, 90) == 9
+    assert percentil(diez, 91) == 10
+    assert percentil(list(range(1, 101)), 99) == 99
+    assert percentil(list(range(1, 101)), 7) == 7
+    assert percentil([7], 0) == 7
+    assert percentil([], 50) is None
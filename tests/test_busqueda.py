@@ -0,0 +1,52 @@
+import repositorio
+import respaldo
+from conftest import tarea
+
+
+def _ids(texto, **filtros):
+    tareas, _ = repositorio.buscar_tareas(texto, **filtros)
+    return [t["id"] for t in tareas]
+
+
+def _cargar():
+    repositorio.guardar_tarea(tarea("a", titulo="Informe mensual", descripcion="para el cliente"))
+    repositorio.guardar_tarea(tarea("b", titulo="Llamar al cliente", descripcion="revisar informe", completada=True))
+    repositorio.guardar_tarea(tarea("c", titulo="Comprar café", descripcion=""))
+
+
+def test_terminos_busqueda():
+    assert repositorio.terminos_busqueda('Informe "cliente" OR -informe*') == ["informe", "cliente", "or"]
+    assert repositorio.terminos_busqueda("  ¿? ") == []
+
+
+def test_todas_las_palabras_completas_o_como_prefijo(memoria):
+    _cargar()
+    assert sorted(_ids("infor")) == ["a", "b"]
+    assert sorted(_ids("INFORME cliente")) == ["a", "b"]
+    assert _ids("informe café") == []
+    assert repositorio.buscar_tareas("¿?") == ([], False)
+
+
+def test_el_titulo_pesa_mas_que_la_descripcion(memoria):
+    _cargar()
+    assert _ids("informe") == ["a", "b"]
+    assert _ids("cliente") == ["b", "a"]
+
+
+def test_filtros_y_paginas(memoria):
+    _cargar()
+    assert _ids("informe", estado="Completadas") == ["b"]
+    assert _ids("informe", estado="Pendientes", importancia="🔴 Alta") == []
+    primera, hay_siguiente = repositorio.buscar_tareas("informe", limite=1)
+    segunda, hay_tercera = repositorio.buscar_tareas("informe", pagina=1, limite=1)
+    assert [t["id"] for t in primera + segunda] == ["a", "b"]
+    assert hay_siguiente and not hay_tercera
+
+
+def test_el_indice_sigue_a_las_escrituras(memoria):
+    _cargar()
+    repositorio.eliminar_tarea("a")
+    assert _ids("informe") == ["b"]
+    respaldo.restaurar_tareas([{"id": "c", "titulo": "Informe de gastos", "fecha": "2024-02-01"}])
+    assert sorted(_ids("informe")) == ["b", "c"]
+    assert _ids("café") == []
@@ -0,0 +1,60 @@
+from datetime import date
+
+import contadores
+import estadisticas
+import repositorio
+import respaldo
+from conftest import tarea
+
+
+def _sin_deriva():
+    assert contadores.verificar() == []
+
+
+def test_reconstruir_corrige_la_deriva_y_sube_la_version(memoria):
+    memoria.ejecutar("INSERT INTO tareas_contadores (importancia, completada, n) VALUES ('🟢 Baja', 0, 5)")
+    assert contadores.verificar()
+    version = repositorio.version_datos()
+
+    contadores.reconstruir()
+    _sin_deriva()
+    assert repositorio.version_datos() == version + 1
+
+
+def test_crear_actualizar_y_eliminar_mantienen_los_contadores(memoria):
+    repositorio.guardar_tarea(tarea("a"))
+    repositorio.guardar_tarea(tarea("b", importancia="🔴 Alta", fecha=date(2024, 3, 1)))
+    repositorio.guardar_tarea(tarea("c"))
+    _sin_deriva()
+
+    repositorio.actualizar_estado("a", True)
+    repositorio.actualizar_estado_lote(["b", "c"], True)
+    repositorio.actualizar_importancia_lote(["a", "c"], "🟡 Media")
+    _sin_deriva()
+    assert estadisticas.resumen_tareas() == {"total": 3, "completadas": 3, "pendientes": 0}
+
+    repositorio.eliminar_tarea("a")
+    repositorio.eliminar_tareas_lote(["b", "no-existe"])
+    _sin_deriva()
+    assert estadisticas.resumen_tareas() == {"total": 1, "completadas": 1, "pendientes": 0}
+    assert estadisticas.conteo_por_importancia() == [{"importancia": "🟡 Media", "cantidad": 1}]
+
+
+def test_escritura_diferida_mantiene_los_contadores(memoria):
+    repositorio.guardar_tarea(tarea("a"))
+    repositorio.guardar_tarea(tarea("b"))
+    repositorio.escribir_cambios([tarea("c")], {True: ["a"], False: []}, ["b"])
+    _sin_deriva()
+    assert estadisticas.resumen_tareas() == {"total": 2, "completadas": 1, "pendientes": 1}
+
+
+def test_restaurar_mantiene_los_contadores(memoria):
+    repositorio.guardar_tarea(tarea("a"))
+    repositorio.guardar_tarea(tarea("b"))
+    respaldo.restaurar_tareas([
+        {"id": "a", "titulo": "A", "fecha": "2024-05-01", "importancia": "🔴 Alta", "completada": True},
+        {"id": "c", "titulo": "C", "fecha": "2024-05-01"},
+        {"id": "b", "eliminada": "2024-05-02T00:00:00"},
+    ])
+    _sin_deriva()
+    assert estadisticas.resumen_tareas() == {"total": 2, "completadas": 1, "pendientes": 1}
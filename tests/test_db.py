@@ -0,0 +1,104 @@
+import mysql.connector
+import pytest
+
+import db
+
+
+class ConexionFalsa:
+    def __init__(self):
+        self.pings = 0
+        self.cerrada = False
+        self.caida = False
+
+    def ping(self, reconnect=False):
+        self.pings += 1
+        if self.caida:
+            raise mysql.connector.InterfaceError("MySQL server has gone away")
+
+    def rollback(self):
+        if self.caida:
+            raise mysql.connector.InterfaceError("MySQL server has gone away")
+
+    def close(self):
+        self.cerrada = True
+
+
+@pytest.fixture
+def abiertas(monkeypatch):
+    """Conexiones reales que abrió el pool, en orden."""
+    conexiones = []
+
+    def conectar(**params):
+        conexiones.append(ConexionFalsa())
+        return conexiones[-1]
+
+    monkeypatch.setattr(db.mysql.connector, "connect", conectar)
+    return conexiones
+
+
+def _pool(**opciones):
+    return db.PoolMySQL(**{"tamano": 2, "espera": 0.05, "inactividad": 300, "ping": 10, **opciones})
+
+
+def test_reutiliza_la_conexion_devuelta(abiertas):
+    pool = _pool()
+    conn = pool.obtener()
+    conn.close()
+    assert pool.obtener() is conn
+    assert len(abiertas) == 1 and pool.abiertas == 1
+
+
+def test_ping_solo_tras_estar_inactiva(abiertas):
+    pool = _pool()
+    conn = pool.obtener()
+    conn.close()
+    pool.obtener().close()
+    assert abiertas[0].pings == 0
+
+    conn.ultimo_uso -= 20
+    assert pool.obtener() is conn
+    assert abiertas[0].pings == 1
+
+
+def test_conexion_caida_se_descarta_al_prestar(abiertas):
+    pool = _pool()
+    conn = pool.obtener()
+    conn.close()
+    conn.ultimo_uso -= 20
+    abiertas[0].caida = True
+
+    nueva = pool.obtener()
+    assert nueva is not conn
+    assert abiertas[0].cerrada
+    assert pool.abiertas == 1
+
+
+def test_expulsa_las_inactivas(abiertas):
+    pool = _pool()
+    a, b = pool.obtener(), pool.obtener()
+    a.close()
+    b.close()
+    a.ultimo_uso -= 400
+
+    assert pool.obtener() is b
+    assert abiertas[0].cerrada and not abiertas[1].cerrada
+    assert pool.abiertas == 1
+
+
+def test_devolver_con_rollback_fallido_descarta(abiertas):
+    pool = _pool()
+    conn = pool.obtener()
+    abiertas[0].caida = True
+    conn.close()
+    assert abiertas[0].cerrada
+    assert pool.abiertas == 0
+    assert pool.obtener() is not conn
+
+
+def test_pool_agotado(abiertas):
+    pool = _pool(tamano=1)
+    conn = pool.obtener()
+    with pytest.raises(db.PoolAgotado):
+        pool.obtener()
+    conn.close()
+    assert pool.obtener() is conn
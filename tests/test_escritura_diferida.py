@@ -0,0 +1,109 @@
+import sqlite3
+from datetime import date, datetime
+
+import pytest
+
+import escritura_diferida
+import repositorio
+from escritura_diferida import ColaEscritura
+
+
+@pytest.fixture
+def cola():
+    # Intervalo largo: en las pruebas sólo se vacía a mano
+    return ColaEscritura(intervalo=3600, max_pendientes=10**6)
+
+
+def _tarea(tarea_id, completada=False):
+    return {
+        "id": tarea_id, "titulo": "t", "descripcion": "", "fecha": date(2024, 2, 1),
+        "importancia": "🟢 Baja", "completada": completada, "creada": datetime(2024, 1, 1),
+    }
+
+
+def test_alternar_dos_veces_no_escribe(cola):
+    cola.cambiar_estado("a", True, anterior=False)
+    cola.cambiar_estado("a", False, anterior=True)
+    assert cola.pendientes() == 0
+
+
+def test_crear_y_eliminar_no_escribe(cola):
+    cola.crear(_tarea("a"))
+    cola.eliminar("a")
+    assert cola.pendientes() == 0
+    assert cola.creadas_pendientes() == []
+
+
+def test_crear_y_cambiar_estado_inserta_con_el_final(cola):
+    cola.crear(_tarea("a"))
+    cola.cambiar_estado("a", True, anterior=False)
+    assert cola.creadas_pendientes()[0]["completada"] is True
+
+
+def test_fijar_sin_anterior_conserva_el_ultimo(cola):
+    cola.cambiar_estado("a", True)
+    cola.cambiar_estado("a", False, anterior=True)
+    assert cola.pendientes() == 1
+    assert cola._pendientes["a"].estado is False
+
+
+def test_fijar_dos_veces_el_mismo_estado(cola):
+    cola.cambiar_estado("a", True)
+    cola.cambiar_estado("a", True)
+    assert cola._pendientes["a"].estado is True
+
+
+def test_eliminar_descarta_el_cambio_de_estado(cola):
+    cola.cambiar_estado("a", True, anterior=False)
+    cola.eliminar("a")
+    cola.cambiar_estado("a", False)
+    p = cola._pendientes["a"]
+    assert p.eliminar and p.estado is None
+
+
+def test_completar_lote_y_reabrir_fila_llega_a_la_base(cola, memoria):
+    repositorio.guardar_tarea(_tarea("a", completada=True))
+    cola.cambiar_estado("a", True)
+    cola.cambiar_estado("a", False, anterior=True)
+    assert cola.vaciar() == 1
+    assert memoria.valor("SELECT completada FROM tareas WHERE id=%s", ("a",)) in (0, False)
+
+
+def test_un_id_rechazado_no_descarta_el_resto_del_lote(cola, memoria):
+    repositorio.guardar_tarea(_tarea("a"))
+    cola.cambiar_estado("a", True, sesion="s1", anterior=False)
+    cola.crear(_tarea("b"), sesion="s1")
+    cola.crear(dict(_tarea("c"), titulo=None), sesion="s2")
+    assert cola.vaciar() == 2
+    assert cola.pendientes() == 0
+    assert cola.errores("s1") == []
+    assert "c" in cola.errores("s2")[0]
+    assert repositorio.contar_tareas() == 2
+    assert memoria.valor("SELECT completada FROM tareas WHERE id=%s", ("a",)) in (1, True)
+
+
+def test_sin_base_el_lote_vuelve_a_la_cola(cola, memoria, monkeypatch):
+    def caida(lote):
+        # Otra sesión encola sobre el mismo id mientras se escribe
+        cola.cambiar_estado("a", True, anterior=False)
+        raise sqlite3.OperationalError("database is locked")
+
+    cola.crear(_tarea("a"))
+    monkeypatch.setattr(escritura_diferida, "_escribir", caida)
+    assert cola.vaciar() == 0
+    assert cola.pendientes() == 1
+    assert cola.creadas_pendientes()[0]["completada"] is True
+
+    monkeypatch.undo()
+    assert cola.vaciar() == 1
+    assert memoria.valor("SELECT completada FROM tareas WHERE id=%s", ("a",)) in (1, True)
+
+
+def test_superponer_registros(cola):
+    tareas = [_tarea("a"), _tarea("b"), _tarea("c")]
+    cola.cambiar_estado("a", True, anterior=False)
+    cola.eliminar("b")
+    vista = cola.superponer_registros(tareas)
+    assert [t["id"] for t in vista] == ["a", "c"]
+    assert vista[0]["completada"] is True
+    assert tareas[0]["completada"] is False
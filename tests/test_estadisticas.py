@@ -0,0 +1,65 @@
+from datetime import date
+
+import pytest
+
+import estadisticas
+import repositorio
+from conftest import tarea
+
+
+def _cargar(*fechas):
+    for i, fecha in enumerate(fechas):
+        repositorio.guardar_tarea(tarea(f"t{i}", fecha=fecha))
+
+
+def _puntos(linea):
+    return [(p["fecha"], p["cantidad"]) for p in linea["puntos"]]
+
+
+@pytest.mark.parametrize("granularidad, esperados", [
+    ("dia", [(date(2024, 1, 1), 1), (date(2024, 1, 3), 2), (date(2024, 2, 15), 1), (date(2024, 5, 1), 1)]),
+    # 2024-01-01 fue lunes; 2024-02-15, jueves
+    ("semana", [(date(2024, 1, 1), 3), (date(2024, 2, 12), 1), (date(2024, 4, 29), 1)]),
+    ("mes", [(date(2024, 1, 1), 3), (date(2024, 2, 1), 1), (date(2024, 5, 1), 1)]),
+    ("trimestre", [(date(2024, 1, 1), 4), (date(2024, 4, 1), 1)]),
+])
+def test_agrupa_por_inicio_de_periodo(memoria, granularidad, esperados):
+    _cargar(date(2024, 1, 1), date(2024, 1, 3), date(2024, 1, 3), date(2024, 2, 15), date(2024, 5, 1))
+    linea = estadisticas.linea_tiempo(granularidad, max_puntos=400)
+    assert linea["granularidad"] == granularidad
+    assert _puntos(linea) == esperados
+    assert not linea["recortada"]
+
+
+def test_automatico_elige_la_mas_fina_que_entra(memoria):
+    _cargar(date(2024, 1, 1), date(2024, 12, 31))
+    assert estadisticas.linea_tiempo(max_puntos=400)["granularidad"] == "dia"
+    assert estadisticas.linea_tiempo(max_puntos=60)["granularidad"] == "semana"
+    assert estadisticas.linea_tiempo(max_puntos=12)["granularidad"] == "mes"
+    assert estadisticas.linea_tiempo(max_puntos=4)["granularidad"] == "trimestre"
+
+
+def test_pedida_demasiado_fina_pasa_a_una_mas_gruesa(memoria):
+    _cargar(date(2024, 1, 1), date(2024, 12, 31))
+    assert estadisticas.linea_tiempo("dia", max_puntos=12)["granularidad"] == "mes"
+
+
+def test_recorta_a_los_periodos_mas_recientes(memoria):
+    _cargar(*(date(2020 + i // 4, 1 + 3 * (i % 4), 1) for i in range(12)))
+    linea = estadisticas.linea_tiempo("trimestre", max_puntos=5)
+    assert linea["recortada"]
+    assert [p["fecha"] for p in linea["puntos"]] == [
+        date(2021, 10, 1), date(2022, 1, 1), date(2022, 4, 1), date(2022, 7, 1), date(2022, 10, 1)
+    ]
+
+
+def test_sin_tareas(memoria):
+    assert estadisticas.linea_tiempo() == {"granularidad": "dia", "puntos": [], "recortada": False}
+
+
+def test_contar_periodos():
+    desde, hasta = date(2024, 1, 31), date(2024, 4, 1)
+    assert estadisticas.contar_periodos(desde, hasta, "dia") == 62
+    assert estadisticas.contar_periodos(desde, hasta, "semana") == 10
+    assert estadisticas.contar_periodos(desde, hasta, "mes") == 4
+    assert estadisticas.contar_periodos(desde, hasta, "trimestre") == 2
@@ -0,0 +1,17 @@
+import socket
+
+import metricas
+
+
+def test_puerto_ocupado_no_detiene_la_app(monkeypatch, caplog):
+    monkeypatch.setattr(metricas, "ACTIVAS", True)
+    monkeypatch.setattr(metricas, "_servidor", None)
+    monkeypatch.setattr(metricas, "_servidor_fallido", False)
+    with socket.socket() as ocupado:
+        ocupado.bind(("0.0.0.0", 0))
+        ocupado.listen()
+        puerto = ocupado.getsockname()[1]
+        metricas.servir_prometheus(puerto)
+        metricas.servir_prometheus(puerto)
+    assert metricas._servidor is None
+    assert len([r for r in caplog.records if "/metrics" in r.getMessage()]) == 1
@@ -0,0 +1,55 @@
+from datetime import datetime
+
+import repositorio
+from conftest import tarea
+
+MISMO_INSTANTE = datetime(2024, 1, 1, 12, 0)
+
+
+def _cargar(n):
+    # La mitad con la misma `creada`: el desempate es por id
+    for i in range(n):
+        creada = MISMO_INSTANTE if i % 2 else datetime(2024, 1, 1, 0, i)
+        repositorio.guardar_tarea(tarea(f"t{i:02d}", creada=creada, completada=i % 3 == 0))
+
+
+def _recorrer(estado="Todas", limite=3):
+    paginas = []
+    tareas, hay_anterior, hay_siguiente = repositorio.cargar_pagina(estado, limite=limite)
+    assert not hay_anterior
+    paginas.append(tareas)
+    while hay_siguiente:
+        ultima = tareas[-1]
+        tareas, hay_anterior, hay_siguiente = repositorio.cargar_pagina(
+            estado, ancla=(ultima["creada"], ultima["id"]), direccion="sig", limite=limite
+        )
+        assert hay_anterior
+        paginas.append(tareas)
+    return paginas
+
+
+def test_paginas_con_creada_repetida_no_pierden_ni_repiten_filas(memoria):
+    _cargar(11)
+    paginas = _recorrer()
+    ids = [t["id"] for pagina in paginas for t in pagina]
+    assert len(ids) == 11 and len(set(ids)) == 11
+    claves = [(t["creada"], t["id"]) for pagina in paginas for t in pagina]
+    assert claves == sorted(claves, reverse=True)
+    assert [len(p) for p in paginas] == [3, 3, 3, 2]
+
+
+def test_volver_atras_reproduce_la_pagina_anterior(memoria):
+    _cargar(11)
+    paginas = _recorrer()
+    primera = paginas[2][0]
+    tareas, hay_anterior, hay_siguiente = repositorio.cargar_pagina(
+        ancla=(primera["creada"], primera["id"]), direccion="ant", limite=3
+    )
+    assert tareas == paginas[1]
+    assert hay_anterior and hay_siguiente
+
+
+def test_filtro_de_estado_con_paginacion(memoria):
+    _cargar(11)
+    ids = [t["id"] for pagina in _recorrer("Completadas", limite=2) for t in pagina]
+    assert sorted(ids) == [f"t{i:02d}" for i in range(11) if i % 3 == 0]
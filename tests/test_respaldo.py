@@ -0,0 +1,64 @@
+import sqlite3
+from datetime import timedelta
+
+import pytest
+
+import repositorio
+import respaldo
+
+
+def _registro(i, **cambios):
+    registro = {
+        "id": f"t{i}", "titulo": f"Tarea {i}", "descripcion": "", "fecha": "2024-02-01",
+        "importancia": "🟢 Baja", "completada": False, "creada": "2024-01-01T00:00:00",
+    }
+    registro.update(cambios)
+    return registro
+
+
+def test_un_registro_malo_no_rechaza_su_lote(memoria):
+    registros = [_registro(i) for i in range(99)] + [_registro(99, titulo=None)]
+    resumen = respaldo.restaurar_tareas(registros, tamano_lote=50)
+    assert resumen["insertadas"] == 99
+    assert resumen["rechazadas"] == 1
+    assert "t99" in resumen["errores"][0]
+    assert repositorio.contar_tareas() == 99
+
+
+def test_sin_conexion_detiene_la_restauracion(memoria, monkeypatch):
+    llamadas = []
+
+    def caida(tareas, borradas):
+        llamadas.append(len(tareas))
+        raise sqlite3.OperationalError("unable to open database file")
+
+    monkeypatch.setattr(repositorio, "aplicar_respaldo", caida)
+    with pytest.raises(sqlite3.OperationalError):
+        respaldo.restaurar_tareas([_registro(i) for i in range(100)], tamano_lote=50)
+    assert llamadas == [50]
+
+
+def test_restaurar_a_un_punto_deja_la_tabla_como_entonces(memoria, tmp_path):
+    destino = respaldo.DestinoLocal(str(tmp_path))
+    respaldo.restaurar_tareas([_registro(i) for i in range(5)])
+    respaldo.respaldar_tareas(destino)
+    base = respaldo.leer_manifiesto(destino)["base"]["hasta"]
+
+    repositorio.actualizar_estado("t0", True)
+    repositorio.eliminar_tarea("t1")
+    respaldo.restaurar_tareas([_registro(5)])
+
+    total, tareas = respaldo.abrir_respaldo(destino, hasta=base)
+    resumen = respaldo.restaurar_tareas(tareas, total=total, exacta=True)
+    assert resumen["eliminadas"] == 1
+    filas = {t["id"]: t for t in repositorio.iterar_tareas()}
+    assert sorted(filas) == [f"t{i}" for i in range(5)]
+    assert not filas["t0"]["completada"]
+
+
+def test_las_marcas_de_borrado_restauradas_dejan_su_marca(memoria):
+    respaldo.restaurar_tareas([_registro(0), _registro(1)])
+    desde = repositorio.ahora() - timedelta(seconds=1)
+    resumen = respaldo.restaurar_tareas([{"id": "t0", "eliminada": "2024-03-01T00:00:00"}])
+    assert resumen["eliminadas"] == 1
+    assert [m["id"] for m in repositorio.iterar_eliminadas(desde)] == ["t0"]
@@ -0,0 +1,43 @@
+import pytest
+
+moto = pytest.importorskip("moto")
+boto3 = pytest.importorskip("boto3")
+
+import respaldo  # noqa: E402
+
+BUCKET = "respaldos"
+
+
+@pytest.fixture
+def s3(monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "prueba")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "prueba")
+    with moto.mock_aws():
+        cliente = boto3.client("s3", region_name="us-east-1")
+        cliente.create_bucket(Bucket=BUCKET)
+        yield cliente
+
+
+def test_subida_completa(s3):
+    # Partes de 5 MiB, el mínimo de S3 salvo la última
+    datos = b"x" * (5 * 1024 * 1024 + 10)
+    subida = respaldo.SubidaMultiparte(s3, BUCKET, "r.ndjson.gz", tamano_parte=5 * 1024 * 1024)
+    subida.write(datos)
+    subida.close()
+    assert s3.get_object(Bucket=BUCKET, Key="r.ndjson.gz")["Body"].read() == datos
+    assert subida.bytes_subidos == len(datos)
+    assert s3.list_multipart_uploads(Bucket=BUCKET).get("Uploads", []) == []
+
+
+def test_complete_fallido_aborta_la_subida(s3, monkeypatch):
+    subida = respaldo.SubidaMultiparte(s3, BUCKET, "r.ndjson.gz")
+    subida.write(b"datos")
+
+    def falla(**kwargs):
+        raise RuntimeError("sin red")
+
+    monkeypatch.setattr(s3, "complete_multipart_upload", falla)
+    with pytest.raises(RuntimeError):
+        subida.close()
+    assert subida.closed
+    assert s3.list_multipart_uploads(Bucket=BUCKET).get("Uploads", []) == []
@@ -0,0 +1,22 @@
+from datetime import date, datetime
+
+import tabla_tareas
+
+
+def _tarea(tarea_id, importancia):
+    return {
+        "id": tarea_id, "titulo": "t", "descripcion": "", "fecha": date(2024, 2, 1),
+        "importancia": importancia, "completada": False, "creada": datetime(2024, 1, 1),
+    }
+
+
+def test_importancia_desconocida_se_conserva():
+    tabla = tabla_tareas.desde_registros([_tarea("a", "🔴 Alta"), _tarea("b", "Alta")])
+    assert list(tabla["importancia"]) == ["🔴 Alta", "Alta"]
+    assert len(tabla_tareas.filtrar(tabla, importancia="Alta")) == 1
+    assert tabla_tareas.registros(tabla)[1]["importancia"] == "Alta"
+
+
+def test_importancia_conocida_usa_la_categoria_ordenada():
+    tabla = tabla_tareas.desde_registros([_tarea("a", "🟢 Baja")])
+    assert tabla["importancia"].dtype == tabla_tareas.IMPORTANCIA
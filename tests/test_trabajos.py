@@ -0,0 +1,90 @@
+import threading
+
+import pytest
+
+import trabajos
+
+
+@pytest.fixture
+def avisados():
+    return []
+
+
+@pytest.fixture
+def registro(avisados):
+    return trabajos.RegistroTrabajos(hilos=2, al_terminar=avisados.append)
+
+
+def _esperar(registro, trabajo):
+    # al_terminar corre antes de que el trabajo salga de los activos
+    for _ in range(500):
+        if registro.activo(trabajo.clave) is None:
+            return
+        threading.Event().wait(0.01)
+    raise AssertionError(f"{trabajo.descripcion} no terminó")
+
+
+def _bloqueado(liberar, pasos=100):
+    def funcion(trabajo):
+        for i in range(pasos):
+            trabajo.avance(i, pasos)
+            liberar.wait(1)
+        return "listo"
+    return funcion
+
+
+def test_termina_con_resultado_y_avisa(registro, avisados):
+    trabajo, nuevo = registro.lanzar("respaldo", "Respaldo", lambda t: t.avance(3, 3) or 42)
+    _esperar(registro, trabajo)
+    assert nuevo
+    assert trabajo.estado == trabajos.TERMINADO and trabajo.resultado == 42
+    assert trabajo.fraccion == 1.0
+    assert avisados == [trabajo]
+    assert registro.terminados() == [trabajo]
+
+
+def test_misma_clave_entrega_el_activo(registro):
+    liberar = threading.Event()
+    trabajo, _ = registro.lanzar("respaldo", "Respaldo", _bloqueado(liberar, pasos=2))
+    otro, nuevo = registro.lanzar("respaldo", "Respaldo", lambda t: None)
+    assert otro is trabajo and not nuevo
+    liberar.set()
+    _esperar(registro, trabajo)
+    assert trabajo.estado == trabajos.TERMINADO
+
+
+def test_cancelar_en_curso(registro):
+    liberar = threading.Event()
+    trabajo, _ = registro.lanzar("restauracion", "Restauración", _bloqueado(liberar))
+    while trabajo.estado != trabajos.EN_CURSO:
+        threading.Event().wait(0.01)
+    trabajo.cancelar()
+    liberar.set()
+    _esperar(registro, trabajo)
+    assert trabajo.estado == trabajos.CANCELADO
+    assert trabajo.resultado is None
+    assert 0 < trabajo.hechos < 100
+
+
+def test_cancelar_en_cola_no_lo_ejecuta():
+    registro = trabajos.RegistroTrabajos(hilos=1)
+    liberar = threading.Event()
+    primero, _ = registro.lanzar("a", "A", _bloqueado(liberar, pasos=2))
+    ejecutado = []
+    segundo, _ = registro.lanzar("b", "B", lambda t: ejecutado.append(t))
+    assert segundo.estado == trabajos.EN_COLA
+    segundo.cancelar()
+    liberar.set()
+    _esperar(registro, segundo)
+    assert segundo.estado == trabajos.CANCELADO and ejecutado == []
+    _esperar(registro, primero)
+
+
+def test_error_queda_registrado(registro):
+    def falla(trabajo):
+        raise RuntimeError("sin espacio")
+
+    trabajo, _ = registro.lanzar("respaldo", "Respaldo", falla)
+    _esperar(registro, trabajo)
+    assert trabajo.estado == trabajos.FALLIDO and trabajo.error == "sin espacio"
+    assert registro.obtener(trabajo.id) is trabajo
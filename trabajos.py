@@ -0,0 +1,183 @@
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# ============================
+#  TRABAJOS EN SEGUNDO PLANO
+# ============================
+
+# Hilos del pool que ejecuta respaldos y restauraciones
+HILOS = int(os.environ.get("TRABAJOS_HILOS", "2"))
+# Trabajos terminados que se conservan en el registro
+MAX_HISTORIAL = int(os.environ.get("TRABAJOS_HISTORIAL", "10"))
+
+log = logging.getLogger("tareas.trabajos")
+
+EN_COLA = "en cola"
+EN_CURSO = "en curso"
+TERMINADO = "terminado"
+FALLIDO = "fallido"
+CANCELADO = "cancelado"
+
+
+class TrabajoCancelado(Exception):
+    """Se lanza desde avance() cuando se pidió cancelar el trabajo."""
+
+
+class Trabajo:
+    """Estado de un trabajo: progreso, velocidad, resultado o error.
+
+    La función del trabajo recibe el propio Trabajo y usa avance() como
+    callback de progreso; ahí es donde se atiende la cancelación.
+    """
+
+    def __init__(self, clave, descripcion):
+        self.id = uuid.uuid4().hex[:8]
+        self.clave = clave
+        self.descripcion = descripcion
+        self.estado = EN_COLA
+        self.hechos = 0
+        self.total = None
+        self.creado = time.time()
+        self.inicio = None
+        self.fin = None
+        self.resultado = None
+        self.error = None
+        self._cancelar = threading.Event()
+
+    @property
+    def activo(self):
+        return self.estado in (EN_COLA, EN_CURSO)
+
+    @property
+    def fraccion(self):
+        """Avance entre 0 y 1, o None si no se conoce el total."""
+        if not self.total:
+            return None
+        return min(self.hechos / self.total, 1.0)
+
+    @property
+    def segundos(self):
+        if self.inicio is None:
+            return 0.0
+        return (self.fin or time.time()) - self.inicio
+
+    @property
+    def velocidad(self):
+        """Elementos procesados por segundo."""
+        segundos = self.segundos
+        return self.hechos / segundos if segundos > 0 else 0.0
+
+    def avance(self, hechos, total=None):
+        """Callback de progreso(hechos, total); lanza TrabajoCancelado si se pidió cancelar."""
+        self.hechos = hechos
+        if total is not None:
+            self.total = total
+        if self._cancelar.is_set():
+            raise TrabajoCancelado()
+
+    def cancelar(self):
+        """Pide cancelar; el trabajo se detiene en su próximo avance()."""
+        self._cancelar.set()
+
+    @property
+    def cancelado(self):
+        return self._cancelar.is_set()
+
+
+class RegistroTrabajos:
+    """Pool de hilos y registro de los trabajos del proceso.
+
+    Un trabajo se identifica por su `clave`: mientras haya uno activo con la
+    misma clave, lanzar() entrega ese en vez de crear otro.
+    """
+
+    def __init__(self, hilos=HILOS, max_historial=MAX_HISTORIAL, al_terminar=None):
+        # Se llama con cada Trabajo al terminar, en el hilo del pool (p. ej. para invalidar cachés)
+        self.al_terminar = al_terminar
+        self._activos = {}
+        self._historial = deque(maxlen=max_historial)
+        self._lock = threading.Lock()
+        self._hilos = hilos
+        self._pool = None
+
+    def lanzar(self, clave, descripcion, funcion):
+        """Encola funcion(trabajo) y retorna (trabajo, nuevo).
+
+        `nuevo` es False si ya había un trabajo activo con esa clave.
+        """
+        with self._lock:
+            existente = self._activos.get(clave)
+            if existente is not None:
+                return existente, False
+            trabajo = Trabajo(clave, descripcion)
+            self._activos[clave] = trabajo
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self._hilos, thread_name_prefix="trabajo")
+            self._pool.submit(self._ejecutar, trabajo, funcion)
+        return trabajo, True
+
+    def _ejecutar(self, trabajo, funcion):
+        trabajo.inicio = time.time()
+        trabajo.estado = EN_CURSO
+        try:
+            if trabajo.cancelado:
+                raise TrabajoCancelado()
+            trabajo.resultado = funcion(trabajo)
+            trabajo.estado = TERMINADO
+        except TrabajoCancelado:
+            trabajo.estado = CANCELADO
+        except Exception as e:
+            log.exception("Falló el trabajo %s (%s)", trabajo.descripcion, trabajo.id)
+            trabajo.error = str(e)
+            trabajo.estado = FALLIDO
+        finally:
+            trabajo.fin = time.time()
+            # Antes de dejar de figurar como activo: quien lo vea terminado ya encuentra las cachés invalidadas
+            if self.al_terminar:
+                try:
+                    self.al_terminar(trabajo)
+                except Exception:
+                    log.exception("Falló al_terminar del trabajo %s", trabajo.id)
+            with self._lock:
+                self._activos.pop(trabajo.clave, None)
+                self._historial.append(trabajo)
+
+    def activos(self):
+        with self._lock:
+            return sorted(self._activos.values(), key=lambda t: t.creado)
+
+    def activo(self, clave):
+        """Trabajo activo con esa clave, o None."""
+        with self._lock:
+            return self._activos.get(clave)
+
+    def terminados(self):
+        """Trabajos terminados que se conservan, más recientes primero."""
+        with self._lock:
+            return list(reversed(self._historial))
+
+    def obtener(self, trabajo_id):
+        with self._lock:
+            for trabajo in [*self._activos.values(), *self._historial]:
+                if trabajo.id == trabajo_id:
+                    return trabajo
+        return None
+
+
+_registro = None
+_registro_lock = threading.Lock()
+
+
+def get_registro():
+    """Registro único del proceso, compartido por todas las sesiones."""
+    global _registro
+    if _registro is None:
+        with _registro_lock:
+            if _registro is None:
+                _registro = RegistroTrabajos()
+    return _registro